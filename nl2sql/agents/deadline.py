@@ -0,0 +1,138 @@
+"""Request deadlines for the NL2SQL agent graph.
+
+A deadline is an absolute epoch timestamp carried in the graph config under
+`configurable.deadline`. Nodes read the remaining budget to size LLM client
+and database timeouts, and give up with a partial answer once it is spent.
+"""
+
+import functools
+import inspect
+import time
+from collections.abc import Callable
+
+from langchain_core.messages import AIMessage
+from langchain_core.runnables import RunnableConfig
+from loguru import logger
+
+from nl2sql.agents.state import State
+
+DEADLINE_KEY = "deadline"
+
+
+def deadline_config(timeout: float) -> dict:
+    """Build the configurable entry for a deadline `timeout` seconds from now."""
+    return {DEADLINE_KEY: time.time() + timeout}
+
+
+def get_deadline(config: RunnableConfig | None) -> float | None:
+    """Get the deadline from the graph config, if any."""
+    if not config:
+        return None
+    return config.get("configurable", {}).get(DEADLINE_KEY)
+
+
+def remaining_time(config: RunnableConfig | None) -> float | None:
+    """Seconds left before the deadline (never negative), or None if unbounded."""
+    deadline = get_deadline(config)
+    if deadline is None:
+        return None
+    return max(deadline - time.time(), 0.0)
+
+
+def deadline_exceeded(config: RunnableConfig | None) -> bool:
+    """Whether the deadline has passed."""
+    remaining = remaining_time(config)
+    return remaining is not None and remaining <= 0
+
+
+def llm_timeout(config: RunnableConfig | None) -> float | None:
+    """Per-call LLM timeout bounded by the remaining budget, if any."""
+    remaining = remaining_time(config)
+    if remaining is None:
+        return None
+    return max(remaining, 0.001)
+
+
+def timeout_message(stage: str, sql_query: str | None = None) -> AIMessage:
+    """Build the partial answer returned when the deadline is exceeded."""
+    content = f"⏱️ I ran out of time while {stage}."
+    if sql_query:
+        content += f"\n\nHere is the SQL generated so far:\n```sql\n{sql_query}\n```"
+    content += "\n\nPlease try again or simplify your request."
+    return AIMessage(content=content)
+
+
+def timeout_update(stage: str, sql_query: str | None = None) -> dict:
+    """State update that ends the graph run with a partial answer."""
+    return {
+        "deadline_exceeded": True,
+        "messages": [timeout_message(stage, sql_query)],
+    }
+
+
+def _guard_async_node(node: Callable, on_timeout: Callable) -> Callable:
+    """Wrap an async node with the deadline checks."""
+
+    @functools.wraps(node)
+    async def wrapper(
+        state: State,
+        *args: object,
+        config: RunnableConfig | None = None,
+        **kwargs: object,
+    ) -> dict:
+        if deadline_exceeded(config):
+            return on_timeout(state)
+        try:
+            return await node(state, *args, config=config, **kwargs)
+        except Exception:
+            if deadline_exceeded(config):
+                return on_timeout(state)
+            raise
+
+    return wrapper
+
+
+def _guard_sync_node(node: Callable, on_timeout: Callable) -> Callable:
+    """Wrap a sync node with the deadline checks."""
+
+    @functools.wraps(node)
+    def wrapper(
+        state: State,
+        *args: object,
+        config: RunnableConfig | None = None,
+        **kwargs: object,
+    ) -> dict:
+        if deadline_exceeded(config):
+            return on_timeout(state)
+        try:
+            return node(state, *args, config=config, **kwargs)
+        except Exception:
+            if deadline_exceeded(config):
+                return on_timeout(state)
+            raise
+
+    return wrapper
+
+
+def guard_deadline(stage: str, include_sql: bool = False) -> Callable:
+    """Decorate a node so it respects the request deadline.
+
+    The node is skipped when the deadline has already passed, and an error
+    raised after the deadline passed (e.g. an LLM client timeout) is turned
+    into a partial answer instead of failing the run.
+
+    Args:
+        stage: What the node does, used in the partial answer
+        include_sql: Whether to include the state's SQL query in the answer
+    """
+
+    def on_timeout(state: State) -> dict:
+        logger.warning(f"⏱️ Deadline exceeded while {stage}")
+        return timeout_update(stage, state.sql_query if include_sql else None)
+
+    def decorator(node: Callable) -> Callable:
+        if inspect.iscoroutinefunction(node):
+            return _guard_async_node(node, on_timeout)
+        return _guard_sync_node(node, on_timeout)
+
+    return decorator
@@ -2,6 +2,7 @@
 
 from functools import partial
 
+from langchain_core.runnables import RunnableLambda
 from langgraph.graph import END, START, StateGraph
 
 from nl2sql.agents import nodes
@@ -15,29 +16,62 @@ from nl2sql.knowledge_base.vector_store import VectorStore
 
 
 def create_graph(
-    db_connector: PostgreSQLConnector, vector_store: VectorStore
+    db_connector: PostgreSQLConnector,
+    vector_store: VectorStore,
+    speculative_retrieval: bool = False,
 ) -> StateGraph:
-    """Create the NL2SQL agent graph."""
+    """Create the NL2SQL agent graph.
+
+    LLM-bound nodes carry both a sync and an async implementation, so the
+    compiled graph can be driven with `invoke` (scripts, notebooks) as well as
+    `ainvoke` (API) without blocking the event loop.
+
+    Args:
+        db_connector: Database connector for SQL validation and execution
+        vector_store: Vector store holding the SQL examples and table documents
+        speculative_retrieval: Retrieve SQL examples and tables while the intent is
+            being classified, taking retrieval off the critical path of SQL requests.
+            The retrieval is discarded for chat messages. Applies to async runs.
+    """
     # State Workflow
     workflow = StateGraph(State)
 
     # Create agent nodes with dependencies
-    chat_agent_node = partial(nodes.chat_agent, vector_store=vector_store)
-    sql_generator_node = partial(nodes.sql_generator, vector_store=vector_store)
+    intent_classifier_node = RunnableLambda(
+        nodes.intent_classifier,
+        afunc=(
+            partial(nodes.aintent_classifier_speculative, vector_store=vector_store)
+            if speculative_retrieval
+            else nodes.aintent_classifier
+        ),
+    )
+    chat_agent_node = partial(
+        nodes.chat_agent,
+        agent_executor=nodes.create_chat_agent_executor(vector_store),
+    )
+    sql_generator_node = RunnableLambda(
+        partial(nodes.sql_generator, vector_store=vector_store),
+        afunc=partial(nodes.asql_generator, vector_store=vector_store),
+    )
     sql_syntax_validator_node = partial(
         nodes.sql_syntax_validator, db_connector=db_connector
     )
+    sql_cost_guard_node = partial(nodes.sql_cost_guard, db_connector=db_connector)
     sql_executor_node = partial(nodes.sql_executor, db_connector=db_connector)
+    sql_result_analyzer_node = RunnableLambda(
+        nodes.sql_result_analyzer, afunc=nodes.asql_result_analyzer
+    )
 
     # Add nodes
-    workflow.add_node("intent_classifier", nodes.intent_classifier)
+    workflow.add_node("intent_classifier", intent_classifier_node)
     workflow.add_node("chat_agent", chat_agent_node)
     workflow.add_node("sql_generator", sql_generator_node)
     workflow.add_node("sql_safety_validator", nodes.sql_safety_validator)
     workflow.add_node("sql_syntax_validator", sql_syntax_validator_node)
+    workflow.add_node("sql_cost_guard", sql_cost_guard_node)
     workflow.add_node("human_feedback", nodes.human_feedback)
     workflow.add_node("sql_executor", sql_executor_node)
-    workflow.add_node("sql_result_analyzer", nodes.sql_result_analyzer)
+    workflow.add_node("sql_result_analyzer", sql_result_analyzer_node)
 
     # Add Edges
     workflow.add_edge(START, "intent_classifier")
@@ -48,6 +82,7 @@ def create_graph(
         {
             "sql": "sql_generator",
             "chat": "chat_agent",
+            "timeout": END,
         },
     )
 
@@ -57,6 +92,7 @@ def create_graph(
         {
             "success": "sql_safety_validator",
             "failure": END,
+            "timeout": END,
         },
     )
 
@@ -73,8 +109,20 @@ def create_graph(
         "sql_syntax_validator",
         nodes.check_sql_syntax,
         {
-            "valid": "human_feedback",
+            "valid": "sql_cost_guard",
             "invalid": END,
+            "timeout": END,
+        },
+    )
+
+    workflow.add_conditional_edges(
+        "sql_cost_guard",
+        nodes.check_sql_cost,
+        {
+            "approved": "sql_executor",
+            "confirm": "human_feedback",
+            "rejected": END,
+            "timeout": END,
         },
     )
 
@@ -93,6 +141,7 @@ def create_graph(
         {
             "success": "sql_result_analyzer",
             "failure": END,
+            "timeout": END,
         },
     )
 
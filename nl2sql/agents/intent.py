@@ -0,0 +1,264 @@
+"""Local first-stage intent classifier.
+
+Obvious messages ("Hello!", "How many orders were delivered in 2018?") are
+classified without calling the LLM. The classifier combines:
+
+- a naive Bayes model over word unigrams and bigrams, trained on labelled
+  messages and on the SQL example questions
+- keyword rules: table and column names from the data dictionary, analytic
+  phrasing ("how many", "top 10", "average") and chat phrasing (greetings,
+  "explain", "examples")
+
+A message is classified locally only when the resulting probability clears
+the confidence threshold; otherwise the caller falls back to the LLM. Questions
+about the schema ("list the columns of the customers table") or how to compute
+something ("how do I calculate revenue per seller?") name the data much like
+data questions do, so they are never sent to the SQL agent locally.
+"""
+
+import itertools
+import math
+import re
+import threading
+from collections import Counter
+from pathlib import Path
+from typing import Literal
+
+import yaml
+
+from nl2sql.knowledge_base.data_dictionary import DataDictionary
+from nl2sql.knowledge_base.sql_examples import SQLExample
+
+Intent = Literal["sql", "chat"]
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9à-ÿ]+")
+
+# Schema name parts too generic to indicate a data question
+GENERIC_SCHEMA_TOKENS = {
+    "id",
+    "name",
+    "type",
+    "date",
+    "value",
+    "code",
+    "prefix",
+    "length",
+    "number",
+    "description",
+    "at",
+    "has",
+    "first",
+    "limit",
+    "unique",
+    "size",
+    "title",
+    "page",
+    "message",
+    "answer",
+    "creation",
+    "sequential",
+    "english",
+    "translation",
+    "qty",
+    "cm",
+    "g",
+}
+
+SQL_PATTERNS = [
+    re.compile(
+        r"^(how many|how much|show|list|find|give me|get|count|number of|which"
+        r"|what (is|are|was|were) the (total|average|number|top|most|sum|median))\b"
+    ),
+    re.compile(
+        r"\b(top \d+|average|avg|total|sum|count|per|by month|by year|distribution"
+        r"|percentage|median|highest|lowest|most|least)\b"
+    ),
+]
+
+CHAT_PATTERNS = [
+    re.compile(
+        r"^(hi|hello|hey|good (morning|afternoon|evening)|thanks|thank you|bye)"
+    ),
+    re.compile(r"\b(what can you do|who are you|how do you work|about yourself)\b"),
+    re.compile(r"\b(explain|clarify|mean|understand)\b"),
+    re.compile(r"\b(examples?|similar quer(y|ies)|schema|tables)\b"),
+]
+
+# Questions about the schema or how to compute something, for the chat agent
+META_PATTERNS = [
+    re.compile(
+        r"\b(columns?|fields?|data types?|primary keys?|foreign keys?"
+        r"|relationships?|related|describe)\b"
+    ),
+    re.compile(r"^how (do|can|could|should|would) (i|we|you)\b|\bhow to\b"),
+]
+
+# Words pointing back at the conversation; such follow-ups are left to the LLM
+REFERENCE_PATTERN = re.compile(
+    r"\b(this|that|it|these|those|them|above|previous|last|same)\b"
+)
+
+# Log-odds added per matched rule (schema terms count up to twice)
+SQL_RULE_WEIGHT = 2.0
+CHAT_RULE_WEIGHT = 3.0
+SCHEMA_TERM_WEIGHT = 1.5
+
+
+def tokenize(text: str) -> list[str]:
+    """Lowercase word tokens with a crude plural stemming."""
+    return [
+        token[:-1] if len(token) > 3 and token.endswith("s") else token
+        for token in TOKEN_PATTERN.findall(text.lower())
+    ]
+
+
+def ngrams(tokens: list[str]) -> list[str]:
+    """Unigrams and bigrams of a token list."""
+    return tokens + [f"{a} {b}" for a, b in itertools.pairwise(tokens)]
+
+
+def schema_terms(data_dictionary: DataDictionary) -> set[str]:
+    """Stemmed table and column name parts of the data dictionary."""
+    names = [
+        name
+        for database in data_dictionary.databases.values()
+        for schema in database.schemas.values()
+        for table_name, table in schema.tables.items()
+        for name in [table_name, *(column.name for column in table.columns)]
+    ]
+    terms = {token for name in names for token in tokenize(name.replace("_", " "))}
+    return terms - GENERIC_SCHEMA_TOKENS
+
+
+class NaiveBayesIntentModel:
+    """Multinomial naive Bayes over n-grams, with add-one smoothing."""
+
+    def __init__(self, examples: dict[Intent, list[str]]) -> None:
+        """Train on labelled messages."""
+        self.counts = {
+            intent: Counter(ng for text in texts for ng in ngrams(tokenize(text)))
+            for intent, texts in examples.items()
+        }
+        self.totals = {intent: sum(c.values()) for intent, c in self.counts.items()}
+        self.vocabulary_size = len(set().union(*self.counts.values()))
+        total_examples = sum(len(texts) for texts in examples.values())
+        self.log_priors = {
+            intent: math.log(len(texts) / total_examples)
+            for intent, texts in examples.items()
+        }
+
+    def log_odds(self, tokens: list[str]) -> float:
+        """Log-odds of sql over chat for a tokenized message."""
+        score = self.log_priors["sql"] - self.log_priors["chat"]
+        for ngram in ngrams(tokens):
+            score += self._log_likelihood(ngram, "sql")
+            score -= self._log_likelihood(ngram, "chat")
+        return score
+
+    def _log_likelihood(self, ngram: str, intent: Intent) -> float:
+        """Smoothed log P(ngram | intent)."""
+        return math.log(
+            (self.counts[intent][ngram] + 1)
+            / (self.totals[intent] + self.vocabulary_size)
+        )
+
+
+class LocalIntentClassifier:
+    """Rule and n-gram classifier that decides confident cases locally."""
+
+    def __init__(
+        self,
+        model: NaiveBayesIntentModel,
+        terms: set[str],
+        confidence_threshold: float,
+    ) -> None:
+        """Initialize with a trained model and the schema terms."""
+        self.model = model
+        self.terms = terms
+        self.confidence_threshold = confidence_threshold
+        self.local_decisions = 0
+        self.llm_fallbacks = 0
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_knowledge(
+        cls,
+        data_dictionary: DataDictionary,
+        sql_examples: dict[str, SQLExample],
+        examples_path: str | Path,
+        confidence_threshold: float,
+    ) -> "LocalIntentClassifier":
+        """Train on the labelled messages, the SQL examples and the schema."""
+        with open(examples_path) as f:
+            examples = yaml.safe_load(f)
+
+        examples["sql"] = examples["sql"] + [
+            example.question for example in sql_examples.values()
+        ]
+        return cls(
+            NaiveBayesIntentModel(examples),
+            schema_terms(data_dictionary),
+            confidence_threshold,
+        )
+
+    def sql_probability(self, message: str) -> float:
+        """Probability that a message asks for data."""
+        return self._score(message)[0]
+
+    def _score(self, message: str) -> tuple[float, int, int]:
+        """Probability of sql, with the schema term and chat rule hit counts."""
+        text = " ".join(message.lower().split())
+        tokens = tokenize(text)
+        schema_hits = len(self.terms.intersection(tokens))
+        chat_hits = sum(bool(p.search(text)) for p in CHAT_PATTERNS + META_PATTERNS)
+
+        log_odds = self.model.log_odds(tokens)
+        log_odds += SQL_RULE_WEIGHT * sum(bool(p.search(text)) for p in SQL_PATTERNS)
+        log_odds -= CHAT_RULE_WEIGHT * chat_hits
+        log_odds += SCHEMA_TERM_WEIGHT * min(schema_hits, 2)
+
+        # Clamp to keep exp() in range
+        log_odds = max(min(log_odds, 50.0), -50.0)
+        return 1 / (1 + math.exp(-log_odds)), schema_hits, chat_hits
+
+    def classify(self, message: str, has_history: bool = False) -> Intent | None:
+        """Classify a message, or return None to defer to the LLM.
+
+        Args:
+            message: The user's message
+            has_history: Whether the conversation has earlier messages. Data
+                questions referring back to it are left to the LLM.
+        """
+        probability, schema_hits, chat_hits = self._score(message)
+        intent: Intent | None = None
+        if probability >= self.confidence_threshold:
+            intent = "sql"
+        # Never send a message naming the data to chat without a chat cue
+        elif probability <= 1 - self.confidence_threshold and (
+            chat_hits or not schema_hits
+        ):
+            intent = "chat"
+
+        text = message.lower()
+        if intent == "sql" and (
+            any(p.search(text) for p in META_PATTERNS)
+            or (has_history and REFERENCE_PATTERN.search(text))
+        ):
+            intent = None
+
+        with self._lock:
+            if intent is None:
+                self.llm_fallbacks += 1
+            else:
+                self.local_decisions += 1
+
+        return intent
+
+    def stats(self) -> dict:
+        """Counts of local decisions and LLM fallbacks."""
+        total = self.local_decisions + self.llm_fallbacks
+        return {
+            "local": self.local_decisions,
+            "llm": self.llm_fallbacks,
+            "local_fraction": self.local_decisions / total if total else 0.0,
+        }
@@ -1,63 +1,170 @@
 """NL2SQL agent nodes."""
 
-from typing import Literal
+import asyncio
+import time
+from typing import Any, Literal
 
 import pandas as pd
-from langchain.chat_models import init_chat_model
-from langchain_core.messages import AIMessage, HumanMessage
+from langchain.agents import AgentExecutor
+from langchain.agents.format_scratchpad.openai_tools import (
+    format_to_openai_tool_messages,
+)
+from langchain.agents.output_parsers.openai_tools import OpenAIToolsAgentOutputParser
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage
+from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
+from langchain_core.runnables import (
+    Runnable,
+    RunnableConfig,
+    RunnableLambda,
+    RunnablePassthrough,
+)
+from langchain_core.tools import StructuredTool
+from langchain_core.utils.function_calling import convert_to_openai_tool
 from langgraph.types import interrupt
 from loguru import logger
 
+from nl2sql.agents.deadline import (
+    deadline_exceeded,
+    guard_deadline,
+    llm_timeout,
+    remaining_time,
+    timeout_update,
+)
+from nl2sql.agents.intent import LocalIntentClassifier
+from nl2sql.agents.result_store import store_execution_result
+from nl2sql.agents.speculation import SpeculativeTasks, speculation_key
+from nl2sql.agents.sql_cache import sql_cache
+from nl2sql.agents.sql_checker import LocalSQLChecker
 from nl2sql.agents.state import State
+from nl2sql.agents.tools.chat_tools import ChatAgentTools
 from nl2sql.agents.utils import (
+    add_row_limit,
+    estimate_sql_cost,
     execute_sql_query,
     format_answer,
     format_query_results_for_llm,
     get_chat_history,
     validate_sql_syntax,
 )
-from nl2sql.config import UNSAFE_SQL_KEYWORDS, load_chat_prompt_template
+from nl2sql.config import (
+    UNSAFE_SQL_KEYWORDS,
+    get_prompt_registry,
+    load_agent_config,
+)
 from nl2sql.database.postgresql import PostgreSQLConnector
 from nl2sql.knowledge_base.data_dictionary import DataDictionary
+from nl2sql.knowledge_base.schema_selection import SchemaSelector, table_key
 from nl2sql.knowledge_base.sql_examples import SQLExample
 from nl2sql.knowledge_base.vector_store import VectorStore
+from nl2sql.llm import cached_chain, get_chat_model
+from nl2sql.metrics import (
+    SQL_COST_DECISIONS,
+    SQL_EXECUTION_DURATION,
+    SQL_FIX_ATTEMPTS,
+    SQL_LOCAL_CHECKS,
+    SQL_VALIDATION_DURATION,
+)
 
 # ===============================
 # Prompts & Knowledge Base
 # ===============================
 
-intent_classifier_prompt = load_chat_prompt_template(target_prompt="intent_classifier")
-sql_generator_prompt = load_chat_prompt_template(target_prompt="sql_generator")
+# Templates are looked up per call so that reloads are picked up
+prompts = get_prompt_registry()
 
 # Load knowledge base components
 data_dictionary = DataDictionary.load()
 sql_examples = SQLExample.from_yaml("knowledge/sql_examples.yml")
 
+# Agent settings
+agent_config = load_agent_config()
+
+
+# Local first-stage intent classifier, None when disabled
+intent_config = agent_config["intent"]
+local_intent_classifier = (
+    LocalIntentClassifier.from_knowledge(
+        data_dictionary,
+        sql_examples,
+        intent_config["examples_path"],
+        intent_config["confidence_threshold"],
+    )
+    if intent_config["local_classifier"]
+    else None
+)
+
+# Selects the tables put in the SQL generator prompt, None when disabled
+schema_selection_config = agent_config["schema_selection"]
+schema_selector = (
+    SchemaSelector(
+        data_dictionary,
+        token_budget=schema_selection_config["token_budget"],
+        include_fk_neighbours=schema_selection_config["include_fk_neighbours"],
+    )
+    if schema_selection_config["enabled"]
+    else None
+)
+
+# Checks generated SQL against the data dictionary before the database, None
+# when disabled
+sql_checker = (
+    LocalSQLChecker(data_dictionary)
+    if agent_config["sql_validation"]["local_checks"]
+    else None
+)
+
+# Thresholds deciding which queries need a confirmation
+cost_guard_config = agent_config["cost_guard"]
+
+# Retrievals started with the intent classifier, handed to the SQL generator
+speculative_retrievals = SpeculativeTasks(ttl=agent_config["speculation"]["ttl"])
+
 
 # ===============================
 # Agent Nodes
 # ===============================
 
 
-def intent_classifier(state: State) -> dict:
-    """Determine if user wants chat or SQL functionality."""
-    logger.info("🔄 [Node] Intent Classifier")
+def _intent_classifier_chain(config: RunnableConfig | None = None) -> Runnable:
+    """Build the intent classification chain."""
+    return cached_chain(
+        prompts.get("intent_classifier"),
+        "intent_classifier",
+        timeout=llm_timeout(config),
+    )
 
+
+def _intent_classifier_inputs(state: State) -> dict:
+    """Build the intent classifier prompt inputs from the state."""
     # Retrieve chat history
     chat_history = get_chat_history(state.messages[:-1])
     user_query = state.messages[-1].content
     logger.debug(f"Chat history:\n{chat_history}")
     logger.debug(f"Last message: {user_query}")
 
-    # Classify user intent using LLM
-    llm = init_chat_model(model="gpt-4.1-mini", model_provider="openai", temperature=0)
-    router_llm_chain = intent_classifier_prompt | llm
+    return {"user_message": user_query, "chat_history": chat_history}
+
+
+def _local_intent(state: State, user_message: str) -> str | None:
+    """Classify obvious messages locally, None when the LLM should decide."""
+    if local_intent_classifier is None:
+        return None
 
-    response = router_llm_chain.invoke(
-        {"user_message": user_query, "chat_history": chat_history}
+    intent = local_intent_classifier.classify(
+        user_message, has_history=len(state.messages) > 1
     )
+    if intent is not None:
+        local_fraction = local_intent_classifier.stats()["local_fraction"]
+        logger.debug(
+            f"✅ Intent resolved locally: {intent} "
+            f"({local_fraction:.0%} of messages resolved locally)"
+        )
+    return intent
+
 
-    detected_user_intent = response.content.strip().lower()
+def _parse_user_intent(intent: str, user_query: str) -> dict:
+    """Parse the intent classifier output into a state update."""
+    detected_user_intent = intent.strip().lower()
     logger.debug(f"Detected user intent: {detected_user_intent}")
 
     # Default to chat if the intent is not chat or sql
@@ -66,36 +173,71 @@ def intent_classifier(state: State) -> dict:
             "⚠️ LLM Router returned unexpected classification: "
             f"'{detected_user_intent}'. Defaulting to chat."
         )
-        return {"user_intent": "chat"}
+        return {"user_intent": "chat", "deadline_exceeded": False}
 
-    return {"user_intent": detected_user_intent, "user_query": user_query}
+    return {
+        "user_intent": detected_user_intent,
+        "user_query": user_query,
+        "deadline_exceeded": False,
+    }
 
 
-def chat_agent(state: State, vector_store: VectorStore) -> dict:
-    """Handle general chat queries using a ReAct-style agent."""
-    logger.info("🔄 [Node] Chat Agent")
+@guard_deadline("classifying your request")
+def intent_classifier(state: State, config: RunnableConfig | None = None) -> dict:
+    """Determine if user wants chat or SQL functionality."""
+    logger.info("🔄 [Node] Intent Classifier")
 
-    # Get user message and history
-    messages = state.messages
-    last_user_message = messages[-1]
-    chat_history = messages[:-1]
+    # Resolve obvious cases locally, classify the rest using LLM
+    inputs = _intent_classifier_inputs(state)
+    intent = _local_intent(state, inputs["user_message"])
+    if intent is None:
+        intent = _intent_classifier_chain(config).invoke(inputs).content
 
-    # Define tools for the chat agent
-    from langchain.agents import AgentExecutor, create_openai_tools_agent
-    from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
-    from langchain_core.tools import StructuredTool
+    return _parse_user_intent(intent, inputs["user_message"])
 
-    from nl2sql.agents.tools.chat_tools import ChatAgentTools
 
-    chat_agent_tools = ChatAgentTools(vector_store)
-    tools = [
-        StructuredTool.from_function(func=chat_agent_tools.get_similar_queries),
-        StructuredTool.from_function(func=chat_agent_tools.explain_query),
-        StructuredTool.from_function(func=chat_agent_tools.get_schema_info),
-    ]
+@guard_deadline("classifying your request")
+async def aintent_classifier(
+    state: State, config: RunnableConfig | None = None
+) -> dict:
+    """Determine if user wants chat or SQL functionality (async)."""
+    logger.info("🔄 [Node] Intent Classifier")
+
+    # Resolve obvious cases locally, classify the rest using LLM
+    inputs = _intent_classifier_inputs(state)
+    intent = _local_intent(state, inputs["user_message"])
+    if intent is None:
+        response = await _intent_classifier_chain(config).ainvoke(inputs)
+        intent = response.content
+
+    return _parse_user_intent(intent, inputs["user_message"])
+
+
+@guard_deadline("classifying your request")
+async def aintent_classifier_speculative(
+    state: State, vector_store: VectorStore, config: RunnableConfig | None = None
+) -> dict:
+    """Classify user intent while retrieving examples and tables speculatively (async).
 
-    # Get the system prompt
-    chat_system_prompt = """You are a helpful NL2SQL assistant that can help users with database queries and data analysis.
+    The retrieval is picked up by the SQL generator, or cancelled when the
+    message turns out not to be a data question.
+    """
+    user_message = state.messages[-1].content
+    key = speculation_key(config, user_message)
+    speculative_retrievals.start(key, _aretrieve(vector_store, user_message))
+
+    try:
+        update = await aintent_classifier(state, config=config)
+    except BaseException:
+        speculative_retrievals.discard(key)
+        raise
+
+    if update.get("user_intent") != "sql":
+        speculative_retrievals.discard(key)
+    return update
+
+
+CHAT_AGENT_SYSTEM_PROMPT = """You are a helpful NL2SQL assistant that can help users with database queries and data analysis.
 
 You have access to tools that can:
 1. Find similar SQL query examples from the knowledge base
@@ -106,30 +248,85 @@ For general questions about capabilities, explain what you can do.
 For questions about the database or SQL, use the appropriate tools to provide helpful information.
 Be conversational and helpful, and guide users toward useful database queries."""  # noqa: E501
 
+
+def create_chat_agent_executor(vector_store: VectorStore) -> AgentExecutor:
+    """Build the chat agent, its tools and prompt once, for reuse across messages.
+
+    The per-message LLM timeout is read from the `timeout` input, so the same
+    executor serves every request; see `chat_agent`.
+
+    Args:
+        vector_store: Vector store holding the SQL examples
+    """
+    chat_agent_tools = ChatAgentTools(vector_store, data_dictionary)
+    tools = [
+        StructuredTool.from_function(func=chat_agent_tools.get_similar_queries),
+        StructuredTool.from_function(func=chat_agent_tools.explain_query),
+        StructuredTool.from_function(func=chat_agent_tools.get_schema_info),
+    ]
+    tool_specs = [convert_to_openai_tool(tool) for tool in tools]
+
     # Create the prompt
     prompt = ChatPromptTemplate.from_messages(
         [
-            ("system", chat_system_prompt),
+            ("system", CHAT_AGENT_SYSTEM_PROMPT),
             MessagesPlaceholder(variable_name="chat_history"),
             ("user", "{input}"),
             MessagesPlaceholder(variable_name="agent_scratchpad"),
         ]
     )
 
-    # Initialize the LLM
-    llm = init_chat_model(model="gpt-4.1-mini", model_provider="openai", temperature=0)
+    def call_model(inputs: dict, config: RunnableConfig) -> BaseMessage:
+        # The shared LLM, bound to the message's timeout and the tools
+        llm = get_chat_model("chat_agent", timeout=inputs["timeout"])
+        return llm.bind(tools=tool_specs).invoke(prompt.invoke(inputs), config)
+
+    # Same pipeline as `create_openai_tools_agent`, with a per-call timeout
+    agent = (
+        RunnablePassthrough.assign(
+            agent_scratchpad=lambda x: format_to_openai_tool_messages(
+                x["intermediate_steps"]
+            )
+        )
+        | RunnableLambda(call_model, name="chat_agent_llm")
+        | OpenAIToolsAgentOutputParser()
+    )
+    return AgentExecutor(agent=agent, tools=tools, verbose=True)
+
 
-    # Create the agent
-    agent = create_openai_tools_agent(llm, tools, prompt)
-    agent_executor = AgentExecutor(agent=agent, tools=tools, verbose=True)
+@guard_deadline("answering your message")
+def chat_agent(
+    state: State, agent_executor: AgentExecutor, config: RunnableConfig | None = None
+) -> dict:
+    """Handle general chat queries using a ReAct-style agent."""
+    logger.info("🔄 [Node] Chat Agent")
+
+    # Get user message and history
+    messages = state.messages
+    last_user_message = messages[-1]
+    chat_history = messages[:-1]
+
+    # Bound the tool loop by the remaining time budget, on a shallow copy so
+    # that concurrent messages don't share the limit
+    agent_executor = agent_executor.model_copy(
+        update={"max_execution_time": remaining_time(config)}
+    )
 
     # Invoke the agent
     try:
         response = agent_executor.invoke(
-            {"input": last_user_message.content, "chat_history": chat_history}
+            {
+                "input": last_user_message.content,
+                "chat_history": chat_history,
+                "timeout": llm_timeout(config),
+            },
+            # Tools (e.g. the query explainer) get the deadline from it
+            config,
         )
         response_content = response["output"]
     except Exception as e:
+        if deadline_exceeded(config):
+            raise
         logger.error(f"Chat agent error: {e}")
         response_content = (
             "I'm here to help you with database queries and data analysis. "
@@ -140,45 +337,250 @@ Be conversational and helpful, and guide users toward useful database queries.""
     return {"messages": [AIMessage(content=response_content)]}
 
 
-def sql_generator(state: State, vector_store: VectorStore) -> dict:
-    """Generate SQL query from natural language using LLM and context."""
-    logger.info("🔄 [Node] SQL Generator")
-    logger.debug(f"User question: {state.user_query}")
+def _sql_generator_chain(config: RunnableConfig | None = None) -> Runnable:
+    """Build the SQL generation chain."""
+    # Configured with the JSON output mode, returns dict directly
+    llm = get_chat_model("sql_generator", timeout=llm_timeout(config))
+    return prompts.get("sql_generator") | llm
 
+
+def _schema_context(schema_docs: list[Any]) -> str:
+    """Format the retrieved tables, or the whole data dictionary."""
+    if schema_selector is None or not schema_docs:
+        return data_dictionary.format_context()
+
+    tables = schema_selector.select(table_key(doc.metadata) for doc in schema_docs)
+    if not tables:
+        return data_dictionary.format_context()
+
+    logger.debug(f"Selected tables: {', '.join('.'.join(t[1:]) for t in tables)}")
+    return schema_selector.format_context(tables)
+
+
+def _sql_generator_inputs(
+    state: State, retrieved_docs: list[Any], schema_docs: list[Any]
+) -> dict:
+    """Build the SQL generator prompt inputs from the state and retrieval."""
     # Get chat history for context
     chat_history = get_chat_history(state.messages[:-1])
     logger.debug(f"Chat history length: {len(chat_history)}")
 
-    # Format schema context from data dictionary
-    schema_context = data_dictionary.format_context()
+    # Format schema context from the tables relevant to the question
+    schema_context = _schema_context(schema_docs)
 
     # Format SQL examples for few-shot learning
-    retrieved_docs = vector_store.vectorstore.similarity_search(
-        state.user_query, k=4, filter={"type": "example"}
-    )
     logger.debug(f"Retrieved {len(retrieved_docs)} docs")
     sql_examples_context = "\n\n".join([doc.page_content for doc in retrieved_docs])
 
-    # Initialize LLM
-    llm = init_chat_model(
-        model="gpt-4.1-mini", model_provider="openai", temperature=0
-    ).with_structured_output(method="json_mode")  # returns dict directly
+    return {
+        "user_query": state.user_query,
+        "chat_history": chat_history,
+        "schema_context": schema_context,
+        "sql_examples": sql_examples_context,
+    }
 
-    # Create SQL generation chain
-    llm_chain = sql_generator_prompt | llm
 
-    # Generate SQL query
-    response = llm_chain.invoke(
-        {
-            "user_query": state.user_query,
-            "chat_history": chat_history,
-            "schema_context": schema_context,
-            "sql_examples": sql_examples_context,
+def _parse_sql_generation(response: Any) -> dict:  # noqa: ANN401
+    """Validate the SQL generator output and turn it into a state update.
+
+    The output must be a JSON object with a string `sql_query`; an optional
+    `sql_explanation` must be a string too. Other keys are dropped.
+    """
+    if not isinstance(response, dict):
+        response = {}
+    sql_query = response.get("sql_query")
+    if not isinstance(sql_query, str) or not sql_query.strip():
+        logger.warning(f"⚠️ SQL generator returned no SQL query: {response}")
+        return {
+            "sql_query": None,
+            "sql_explanation": None,
+            "messages": [
+                AIMessage(
+                    content="❌ I couldn't generate a SQL query for this question. "
+                    "Could you rephrase it?"
+                )
+            ],
         }
+
+    sql_explanation = response.get("sql_explanation")
+    if not isinstance(sql_explanation, str):
+        sql_explanation = None
+    return {"sql_query": sql_query, "sql_explanation": sql_explanation}
+
+
+def _schema_version() -> str:
+    """Schema version the SQL cache is tied to, following data dictionary changes."""
+    return data_dictionary.content_hash()
+
+
+def _use_sql_cache(state: State) -> bool:
+    """Whether the SQL cache applies to the state's question."""
+    cache_config = agent_config["sql_cache"]
+    if not cache_config["enabled"]:
+        return False
+    # Follow-up questions depend on the chat history
+    return not cache_config["standalone_only"] or len(state.messages) == 1
+
+
+def _cached_sql_generation(state: State, embedding: list[float]) -> dict | None:
+    """Reuse the SQL generated for a near-duplicate question, if any."""
+    if not _use_sql_cache(state):
+        return None
+
+    cached = sql_cache.lookup(state.user_query, embedding, _schema_version())
+    if cached is None:
+        return None
+
+    logger.info("✅ SQL cache hit")
+    logger.debug(f"Cached question: {cached.question}")
+    return {"sql_query": cached.sql_query, "sql_explanation": cached.sql_explanation}
+
+
+def _cache_sql_generation(state: State, embedding: list[float], response: dict) -> None:
+    """Cache the SQL generated for the state's question."""
+    if _use_sql_cache(state) and response.get("sql_query"):
+        sql_cache.put(
+            state.user_query,
+            embedding,
+            _schema_version(),
+            response["sql_query"],
+            response.get("sql_explanation"),
+        )
+
+
+def _update_cached_sql(state: State, sql_query: str) -> None:
+    """Cache the fixed query rather than fixing it again next time."""
+    if _use_sql_cache(state):
+        sql_cache.update(state.user_query, sql_query)
+
+
+def _discard_cached_sql(state: State) -> None:
+    """Drop cached SQL for the state's question after it proved unusable."""
+    if agent_config["sql_cache"]["enabled"]:
+        sql_cache.discard(state.user_query)
+
+
+@guard_deadline("generating the SQL query")
+def sql_generator(
+    state: State, vector_store: VectorStore, config: RunnableConfig | None = None
+) -> dict:
+    """Generate SQL query from natural language using LLM and context."""
+    logger.info("🔄 [Node] SQL Generator")
+    logger.debug(f"User question: {state.user_query}")
+
+    # Embed once for both the cache lookup and the examples search
+    embedding = vector_store.vectorstore.embeddings.embed_query(state.user_query)
+    cached = _cached_sql_generation(state, embedding)
+    if cached is not None:
+        return cached
+
+    retrieved_docs = vector_store.vectorstore.similarity_search_by_vector(
+        embedding, k=4, filter={"type": "example"}
     )
+    schema_docs = _search_schema(vector_store, embedding)
 
-    # TODO: Add key validation for the response
+    # Generate SQL query
+    response = _sql_generator_chain(config).invoke(
+        _sql_generator_inputs(state, retrieved_docs, schema_docs)
+    )
 
+    response = _parse_sql_generation(response)
+    _cache_sql_generation(state, embedding, response)
+    return response
+
+
+def _search_schema(vector_store: VectorStore, embedding: list[float]) -> list[Any]:
+    """Search the schema documents of the tables closest to a question."""
+    if schema_selector is None:
+        return []
+    return vector_store.vectorstore.similarity_search_by_vector(
+        embedding, k=schema_selection_config["top_k"], filter={"type": "schema"}
+    )
+
+
+async def _asearch_context(
+    vector_store: VectorStore, embedding: list[float]
+) -> tuple[list[Any], list[Any]]:
+    """Search the SQL examples and tables closest to a question embedding."""
+    # PGVector is bound to a sync engine, so search off the event loop
+    examples, schema_docs = await asyncio.gather(
+        asyncio.to_thread(
+            vector_store.vectorstore.similarity_search_by_vector,
+            embedding,
+            k=4,
+            filter={"type": "example"},
+        ),
+        asyncio.to_thread(_search_schema, vector_store, embedding),
+    )
+    return examples, schema_docs
+
+
+async def _aretrieve(
+    vector_store: VectorStore, question: str
+) -> tuple[list[float], tuple[list[Any], list[Any]]]:
+    """Embed a question and search its SQL examples and tables."""
+    embedding = await vector_store.vectorstore.embeddings.aembed_query(question)
+    return embedding, await _asearch_context(vector_store, embedding)
+
+
+async def _speculative_retrieval(
+    task: asyncio.Task | None,
+) -> tuple[list[float], tuple[list[Any], list[Any]]] | None:
+    """Result of a speculative retrieval, None if there is none or it failed.
+
+    The retrieval is only a head start: on failure the caller retrieves again.
+    """
+    if task is None:
+        return None
+    try:
+        return await task
+    except asyncio.CancelledError:
+        # Only swallow the cancellation of the speculative task, not the node's
+        current = asyncio.current_task()
+        if current is not None and current.cancelling():
+            raise
+        logger.warning("⚠️ Speculative retrieval was cancelled, retrieving again")
+    except Exception as e:
+        logger.warning(f"⚠️ Speculative retrieval failed, retrieving again: {e}")
+    return None
+
+
+@guard_deadline("generating the SQL query")
+async def asql_generator(
+    state: State, vector_store: VectorStore, config: RunnableConfig | None = None
+) -> dict:
+    """Generate SQL query from natural language using LLM and context (async)."""
+    logger.info("🔄 [Node] SQL Generator")
+    logger.debug(f"User question: {state.user_query}")
+
+    speculative = await _speculative_retrieval(
+        speculative_retrievals.pop(speculation_key(config, state.user_query))
+    )
+    if speculative is not None:
+        # Started alongside the intent classifier
+        embedding, retrieved = speculative
+    else:
+        # Embed once for both the cache lookup and the examples search
+        embedding = await vector_store.vectorstore.embeddings.aembed_query(
+            state.user_query
+        )
+        retrieved = None
+
+    cached = _cached_sql_generation(state, embedding)
+    if cached is not None:
+        return cached
+
+    if retrieved is None:
+        retrieved = await _asearch_context(vector_store, embedding)
+    retrieved_docs, schema_docs = retrieved
+
+    # Generate SQL query
+    response = await _sql_generator_chain(config).ainvoke(
+        _sql_generator_inputs(state, retrieved_docs, schema_docs)
+    )
+
+    response = _parse_sql_generation(response)
+    _cache_sql_generation(state, embedding, response)
     return response
 
 
@@ -195,6 +597,7 @@ def sql_safety_validator(state: State) -> dict:
 
     if found_unsafe_keywords:
         logger.error(f"❌ SQL contains unsafe keywords: {found_unsafe_keywords}")
+        _discard_cached_sql(state)
         ai_message = AIMessage(
             content=f"❌ SQL contains unsafe keywords: {found_unsafe_keywords}"
         )
@@ -204,36 +607,99 @@ def sql_safety_validator(state: State) -> dict:
         return {"sql_safety_status": "safe"}
 
 
-def sql_syntax_validator(state: State, db_connector: PostgreSQLConnector) -> dict:
+def _validate_sql(
+    query: str, db_connector: PostgreSQLConnector, checked_locally: set[str]
+) -> dict:
+    """Validate a query with the local checks, then against the database.
+
+    A query rejected locally goes to the database if the fixer hands it back
+    unchanged, so the local checks can't fail a query the database accepts.
+
+    Args:
+        query: SQL query to validate
+        db_connector: Database the query is prepared on
+        checked_locally: Queries already checked locally, updated in place
+
+    Returns:
+        dict: {"valid_syntax": bool or None (not validated), "error": str or None}
+    """
+    if sql_checker is not None and query not in checked_locally:
+        checked_locally.add(query)
+        result = sql_checker.check(query)
+        SQL_LOCAL_CHECKS.labels(outcome=result["error_type"] or "passed").inc()
+        if not result["valid_syntax"]:
+            logger.debug("Local SQL check failed, skipping the database")
+            return result
+
+    with SQL_VALIDATION_DURATION.time():
+        return validate_sql_syntax(query, db_connector)
+
+
+@guard_deadline("validating the SQL query", include_sql=True)
+def sql_syntax_validator(
+    state: State,
+    db_connector: PostgreSQLConnector,
+    config: RunnableConfig | None = None,
+) -> dict:
     """Validate SQL syntax and attempt to fix errors using LLM."""
     logger.info("🔄 [Node] SQL Syntax Validator")
 
     max_retries = 3
     current_query = state.sql_query
+    checked_locally: set[str] = set()
 
     for attempt in range(max_retries):
         # Validate current query
-        validation_result = validate_sql_syntax(current_query, db_connector)
+        validation_result = _validate_sql(current_query, db_connector, checked_locally)
+
+        # The database couldn't validate it: not a reason to "fix" the query,
+        # let it through and leave execution to report any error
+        if validation_result["valid_syntax"] is None:
+            logger.warning("⚠️ Syntax Validator: SQL query could not be validated")
+            SQL_FIX_ATTEMPTS.labels(outcome="unverified").observe(attempt)
+            return {
+                "sql_syntax_status": "unverified",
+                "sql_query": current_query,
+            }
 
         # If the query is valid, return success
         if validation_result["valid_syntax"]:
             logger.debug("✅ Syntax Validator: SQL syntax is valid.")
+            SQL_FIX_ATTEMPTS.labels(outcome="valid").observe(attempt)
+            if current_query != state.sql_query:
+                _update_cached_sql(state, current_query)
             return {
                 "sql_syntax_status": "valid",
                 "sql_query": current_query,
             }
 
+        # Fix attempts are optional work, skip them when time is short
+        remaining = remaining_time(config)
+        if (
+            remaining is not None
+            and remaining < agent_config["deadline"]["min_fix_attempt_budget"]
+        ):
+            logger.warning("⏱️ Not enough time left for another SQL fix attempt")
+            SQL_FIX_ATTEMPTS.labels(outcome="timeout").observe(attempt)
+            return {
+                "sql_syntax_status": "invalid",
+                **timeout_update(
+                    f"fixing the SQL query (error: {validation_result['error']})",
+                    current_query,
+                ),
+            }
+
         # Log the error and the current query for debugging
         logger.debug(f"Invalid syntax → Entering Fix Attempt #{attempt + 1}...")
         logger.debug(f"Current query: {current_query}")
         logger.debug(f"Error: {validation_result['error']}")
 
         # Use LLM to fix the error
-        sql_syntax_fixer_prompt = load_chat_prompt_template(
-            target_prompt="sql_syntax_fixer"
+        llm_chain = cached_chain(
+            prompts.get("sql_syntax_fixer"),
+            "sql_syntax_fixer",
+            timeout=llm_timeout(config),
         )
-        llm = init_chat_model(model="gpt-4.1", model_provider="openai", temperature=0)
-        llm_chain = sql_syntax_fixer_prompt | llm
         fixed_query = llm_chain.invoke(
             {
                 "query": current_query,
@@ -245,6 +711,8 @@ def sql_syntax_validator(state: State, db_connector: PostgreSQLConnector) -> dic
     logger.warning(
         f"⚠️ Syntax Validator: Failed to fix SQL syntax after {max_retries} attempts."
     )
+    SQL_FIX_ATTEMPTS.labels(outcome="failed").observe(max_retries)
+    _discard_cached_sql(state)
     return {
         "sql_syntax_status": False,
         "messages": [
@@ -258,12 +726,126 @@ def sql_syntax_validator(state: State, db_connector: PostgreSQLConnector) -> dic
     }
 
 
+def _cost_decision(estimate: dict) -> Literal["approved", "confirm", "rejected"]:
+    """Decide from a cost estimate whether a query needs confirmation."""
+    cost, rows = estimate["total_cost"], estimate["plan_rows"]
+    if (
+        cost <= cost_guard_config["auto_approve_max_cost"]
+        and rows <= cost_guard_config["auto_approve_max_rows"]
+    ):
+        return "approved"
+    if (
+        cost <= cost_guard_config["reject_max_cost"]
+        and rows <= cost_guard_config["reject_max_rows"]
+    ):
+        return "confirm"
+    return "rejected"
+
+
+def _limited_query(
+    state: State, db_connector: PostgreSQLConnector
+) -> tuple[str, dict] | None:
+    """Add a row limit to a rejected query, if that makes it cheap enough.
+
+    Returns:
+        The limited query and its estimate, or None
+    """
+    limit_rows = cost_guard_config["limit_rows"]
+    limited_query = add_row_limit(state.sql_query, limit_rows) if limit_rows else None
+    if limited_query is None:
+        return None
+
+    estimate = estimate_sql_cost(limited_query, db_connector)
+    if not estimate["success"] or _cost_decision(estimate) == "rejected":
+        return None
+    return limited_query, {
+        "total_cost": estimate["total_cost"],
+        "plan_rows": estimate["plan_rows"],
+        "row_limit": limit_rows,
+    }
+
+
+@guard_deadline("estimating the SQL query cost", include_sql=True)
+def sql_cost_guard(
+    state: State,
+    db_connector: PostgreSQLConnector,
+    config: RunnableConfig | None = None,
+) -> dict:
+    """Estimate the SQL query cost and decide whether it needs confirmation.
+
+    Cheap queries are approved without asking the user. Queries too expensive
+    to run are limited to a number of rows when that brings their estimate
+    down, and rejected otherwise.
+    """
+    logger.info("🔄 [Node] SQL Cost Guard")
+
+    if not cost_guard_config["enabled"]:
+        return {"sql_cost_status": "confirm", "sql_cost_estimate": None}
+
+    estimate = estimate_sql_cost(state.sql_query, db_connector)
+    if not estimate["success"]:
+        # Leave the decision to the user
+        logger.warning(f"⚠️ Could not estimate the SQL query cost: {estimate['error']}")
+        SQL_COST_DECISIONS.labels(decision="unknown").inc()
+        return {"sql_cost_status": "confirm", "sql_cost_estimate": None}
+
+    sql_cost_estimate = {
+        "total_cost": estimate["total_cost"],
+        "plan_rows": estimate["plan_rows"],
+    }
+    decision = _cost_decision(estimate)
+    logger.debug(
+        f"Estimated cost: {estimate['total_cost']:.0f}, "
+        f"rows: {estimate['plan_rows']} → {decision}"
+    )
+    if decision != "rejected":
+        SQL_COST_DECISIONS.labels(decision=decision).inc()
+        return {"sql_cost_status": decision, "sql_cost_estimate": sql_cost_estimate}
+
+    limited = _limited_query(state, db_connector)
+    if limited is not None:
+        limited_query, limited_estimate = limited
+        row_limit = limited_estimate["row_limit"]
+        logger.debug(f"✅ Limited the SQL query to {row_limit} rows")
+        SQL_COST_DECISIONS.labels(decision="limited").inc()
+        return {
+            "sql_query": limited_query,
+            "sql_cost_status": "confirm",
+            "sql_cost_estimate": limited_estimate,
+        }
+
+    logger.warning("⚠️ SQL query rejected, estimated to be too expensive")
+    SQL_COST_DECISIONS.labels(decision="rejected").inc()
+    return {
+        "sql_cost_status": "rejected",
+        "sql_cost_estimate": sql_cost_estimate,
+        "messages": [
+            AIMessage(
+                content=(
+                    "❌ This query is too expensive to run: it is estimated at "
+                    f"{estimate['total_cost']:,.0f} cost units and "
+                    f"{estimate['plan_rows']:,} rows.\n\n"
+                    f"```sql\n{state.sql_query}\n```\n\n"
+                    "Please narrow down your question, e.g. to a date range, or "
+                    "ask for aggregated results."
+                )
+            )
+        ],
+    }
+
+
 def human_feedback(state: State) -> dict:
     """Ask for human confirmation and pause for input."""
     logger.info("🔄 [Node] Human Feedback")
 
     # Format the answer for the user
     formatted_answer = format_answer(state)
+    row_limit = (state.sql_cost_estimate or {}).get("row_limit")
+    if row_limit:
+        formatted_answer += (
+            "\n⚠️ The full query is estimated to be too expensive, so I limited "
+            f"it to {row_limit} rows.\n"
+        )
     formatted_answer += "\nShould I execute this query? Answer with 'yes' or 'no'."
 
     # Create the AI message
@@ -301,17 +883,49 @@ def human_feedback(state: State) -> dict:
     }
 
 
-def sql_executor(state: State, db_connector: PostgreSQLConnector) -> dict:
+@guard_deadline("running the SQL query", include_sql=True)
+def sql_executor(
+    state: State,
+    db_connector: PostgreSQLConnector,
+    config: RunnableConfig | None = None,
+) -> dict:
     """Execute the SQL query."""
     logger.info("🔄 [Node] SQL Executor")
 
-    # Execute the SQL query
-    sql_execution_result = execute_sql_query(state.sql_query, db_connector)
+    # Execute the SQL query, bounded by the remaining time budget
+    start = time.perf_counter()
+    sql_execution_result = execute_sql_query(
+        state.sql_query,
+        db_connector,
+        timeout=remaining_time(config),
+        max_rows=agent_config["result_store"]["max_rows"],
+    )
     sql_execution_status = "success" if sql_execution_result["success"] else "failure"
+    SQL_EXECUTION_DURATION.labels(status=sql_execution_status).observe(
+        time.perf_counter() - start
+    )
+
+    # Keep the full rows in the result store, only a preview goes to the state
+    sql_execution_result = store_execution_result(
+        sql_execution_result, preview_rows=agent_config["result_store"]["preview_rows"]
+    )
+
+    if sql_execution_status == "failure" and deadline_exceeded(config):
+        return {
+            "sql_execution_status": sql_execution_status,
+            "sql_execution_result": sql_execution_result,
+            **timeout_update("running the SQL query", state.sql_query),
+        }
 
-    if sql_execution_status:
+    if sql_execution_status == "failure":
+        _discard_cached_sql(state)
+
+    if sql_execution_status == "success":
         logger.debug(f"✅ SQL execution status: {sql_execution_status}")
-        logger.debug(f"✅ SQL result: {sql_execution_result['data'][:50]}...")
+        logger.debug(
+            f"✅ SQL result: {sql_execution_result['row_count']} rows, "
+            f"handle {sql_execution_result.get('handle')}"
+        )
     else:
         logger.debug(f"❌ SQL execution status: {sql_execution_status}")
         logger.debug(f"❌ SQL result: {sql_execution_result['error']}")
@@ -322,10 +936,17 @@ def sql_executor(state: State, db_connector: PostgreSQLConnector) -> dict:
     }
 
 
-def sql_result_analyzer(state: State) -> dict:
-    """Analyse the SQL result using LLM."""
-    logger.info("🔄 [Node] SQL Result Analyser")
+def _sql_result_analyzer_chain(config: RunnableConfig | None = None) -> Runnable:
+    """Build the result interpretation chain."""
+    return cached_chain(
+        prompts.get("result_analyzer"),
+        "sql_result_analyzer",
+        timeout=llm_timeout(config),
+    )
+
 
+def _sql_result_analyzer_inputs(state: State) -> dict:
+    """Build the result analyzer prompt inputs from the state."""
     # Reconstruct execution result with DataFrame for formatting
     execution_result_for_formatting = state.sql_execution_result.copy()
     if execution_result_for_formatting["data"] is not None:
@@ -337,24 +958,15 @@ def sql_result_analyzer(state: State) -> dict:
     # Format results for LLM interpretation
     formatted_results = format_query_results_for_llm(execution_result_for_formatting)
 
-    # Load the result interpretation prompt
-    result_analyzer_prompt = load_chat_prompt_template(target_prompt="result_analyzer")
-
-    # Initialize LLM
-    llm = init_chat_model(model="gpt-4.1", model_provider="openai", temperature=0.1)
+    return {
+        "user_query": state.user_query,
+        "sql_query": state.sql_query,
+        "query_results": formatted_results,
+    }
 
-    # Create the interpretation chain
-    llm_chain = result_analyzer_prompt | llm
-
-    # Generate interpretation
-    response = llm_chain.invoke(
-        {
-            "user_query": state.user_query,
-            "sql_query": state.sql_query,
-            "query_results": formatted_results,
-        }
-    )
 
+def _sql_result_analysis(response: AIMessage) -> dict:
+    """Turn the result interpretation into a state update."""
     analyzed_result = response.content
     logger.info("✅ Results analyzed successfully")
 
@@ -367,19 +979,51 @@ def sql_result_analyzer(state: State) -> dict:
     }
 
 
+@guard_deadline("analyzing the query results", include_sql=True)
+def sql_result_analyzer(state: State, config: RunnableConfig | None = None) -> dict:
+    """Analyse the SQL result using LLM."""
+    logger.info("🔄 [Node] SQL Result Analyser")
+
+    # Generate interpretation
+    response = _sql_result_analyzer_chain(config).invoke(
+        _sql_result_analyzer_inputs(state)
+    )
+
+    return _sql_result_analysis(response)
+
+
+@guard_deadline("analyzing the query results", include_sql=True)
+async def asql_result_analyzer(
+    state: State, config: RunnableConfig | None = None
+) -> dict:
+    """Analyse the SQL result using LLM (async)."""
+    logger.info("🔄 [Node] SQL Result Analyser")
+
+    # Generate interpretation
+    response = await _sql_result_analyzer_chain(config).ainvoke(
+        _sql_result_analyzer_inputs(state)
+    )
+
+    return _sql_result_analysis(response)
+
+
 # ===============================
 # Node Rounters
 # ===============================
 
 
-def route_intent(state: State) -> Literal["sql", "chat"]:
+def route_intent(state: State) -> Literal["sql", "chat", "timeout"]:
     """Route intent to either SQL or Chat agent."""
+    if state.deadline_exceeded:
+        return "timeout"
     logger.debug(f"→ Routing to {state.user_intent}")
     return state.user_intent
 
 
-def check_sql_generation(state: State) -> Literal["success", "failure"]:
+def check_sql_generation(state: State) -> Literal["success", "failure", "timeout"]:
     """Check if the SQL query is valid."""
+    if state.deadline_exceeded:
+        return "timeout"
     if state.sql_query and state.sql_query.strip():
         logger.debug("→ Routing to success")
         return "success"
@@ -394,10 +1038,24 @@ def check_sql_safety(state: State) -> Literal["safe", "unsafe"]:
     return "safe" if state.sql_safety_status == "safe" else "unsafe"
 
 
-def check_sql_syntax(state: State) -> Literal["valid", "invalid"]:
+def check_sql_syntax(state: State) -> Literal["valid", "invalid", "timeout"]:
     """Check if the SQL query is valid."""
+    if state.deadline_exceeded:
+        return "timeout"
     logger.debug(f"→ Routing to {state.sql_syntax_status}")
-    return "valid" if state.sql_syntax_status == "valid" else "invalid"
+    if state.sql_syntax_status in ("valid", "unverified"):
+        return "valid"
+    return "invalid"
+
+
+def check_sql_cost(
+    state: State,
+) -> Literal["approved", "confirm", "rejected", "timeout"]:
+    """Check if the SQL query can run without confirmation."""
+    if state.deadline_exceeded:
+        return "timeout"
+    logger.debug(f"→ Routing to {state.sql_cost_status}")
+    return state.sql_cost_status
 
 
 def check_human_feedback(state: State) -> Literal["approved", "rejected"]:
@@ -406,7 +1064,9 @@ def check_human_feedback(state: State) -> Literal["approved", "rejected"]:
     return "approved" if state.user_feedback_status == "approved" else "rejected"
 
 
-def check_sql_execution(state: State) -> Literal["success", "failure"]:
+def check_sql_execution(state: State) -> Literal["success", "failure", "timeout"]:
     """Check if the SQL query was executed successfully."""
+    if state.deadline_exceeded:
+        return "timeout"
     logger.debug(f"→ Routing to {state.sql_execution_status}")
     return "success" if state.sql_execution_status == "success" else "failure"
@@ -0,0 +1,177 @@
+"""Server-side store for SQL query results.
+
+Executed results are kept here under an opaque handle so that graph state (and
+its checkpoints) only carries a small preview. Clients page through the full
+rows with the handle instead of re-running the query.
+
+The store lives in process memory: a handle is only valid on the worker that
+executed the query, until it expires or is evicted.
+"""
+
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any
+
+from loguru import logger
+
+from nl2sql.config import load_agent_config
+
+
+@dataclass
+class StoredResult:
+    """Rows of an executed query kept under a handle."""
+
+    handle: str
+    query: str
+    columns: list[str]
+    rows: list[dict[str, Any]]
+    row_count: int
+    truncated: bool
+    expires_at: float
+    created_at: float = field(default_factory=time.time)
+
+    def page(
+        self, offset: int, limit: int, columns: list[str] | None = None
+    ) -> list[dict[str, Any]]:
+        """Return a slice of rows, optionally projected on `columns`."""
+        rows = self.rows[offset : offset + limit]
+        if columns is None:
+            return rows
+        return [{column: row[column] for column in columns} for row in rows]
+
+
+class ResultStore:
+    """Thread-safe in-memory result store with TTL and size caps.
+
+    Entries expire `ttl` seconds after they are stored. When the store holds
+    more than `max_entries` results or `max_total_rows` rows, least recently
+    used entries are evicted first. Results longer than `max_rows` are kept
+    truncated.
+    """
+
+    def __init__(
+        self, ttl: float, max_entries: int, max_rows: int, max_total_rows: int
+    ) -> None:
+        """Initialize an empty store."""
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_rows = max_rows
+        self.max_total_rows = max_total_rows
+        self._results: OrderedDict[str, StoredResult] = OrderedDict()
+        self._total_rows = 0
+        self._lock = threading.Lock()
+
+    def put(
+        self,
+        query: str,
+        columns: list[str],
+        rows: list[dict[str, Any]],
+        truncated: bool = False,
+    ) -> StoredResult:
+        """Store the rows of an executed query under a new handle.
+
+        Args:
+            query: The executed query
+            columns: Column names of the result
+            rows: Rows of the result
+            truncated: Whether the rows were already cut short at fetch time
+        """
+        stored = StoredResult(
+            handle=uuid.uuid4().hex,
+            query=query,
+            columns=columns,
+            rows=rows[: self.max_rows],
+            row_count=len(rows),
+            truncated=truncated or len(rows) > self.max_rows,
+            expires_at=time.time() + self.ttl,
+        )
+
+        with self._lock:
+            self._results[stored.handle] = stored
+            self._total_rows += len(stored.rows)
+            self._evict()
+
+        return stored
+
+    def get(self, handle: str) -> StoredResult | None:
+        """Get a stored result, or None if unknown, expired or evicted."""
+        with self._lock:
+            stored = self._results.get(handle)
+            if stored is None:
+                return None
+            if stored.expires_at <= time.time():
+                self._remove(handle)
+                return None
+            self._results.move_to_end(handle)
+            return stored
+
+    def __len__(self) -> int:
+        """Number of stored results, including expired ones not yet evicted."""
+        return len(self._results)
+
+    def stats(self) -> dict:
+        """Number of stored results and rows."""
+        with self._lock:
+            return {"entries": len(self._results), "rows": self._total_rows}
+
+    def _remove(self, handle: str) -> None:
+        """Drop an entry (caller holds the lock)."""
+        stored = self._results.pop(handle)
+        self._total_rows -= len(stored.rows)
+
+    def _evict(self) -> None:
+        """Drop expired entries, then LRU ones past the caps (caller holds the lock)."""
+        now = time.time()
+        for handle in [h for h, r in self._results.items() if r.expires_at <= now]:
+            self._remove(handle)
+
+        while self._results and (
+            len(self._results) > self.max_entries
+            or self._total_rows > self.max_total_rows
+        ):
+            handle = next(iter(self._results))
+            logger.debug(f"🗑️ Evicting stored result {handle}")
+            self._remove(handle)
+
+
+def store_execution_result(execution_result: dict, preview_rows: int) -> dict:
+    """Move the rows of a successful execution into the result store.
+
+    Args:
+        execution_result: Result dictionary from `execute_sql_query`
+        preview_rows: Number of leading rows kept inline
+
+    Returns:
+        The execution result with `data` cut down to the preview and the
+        `handle` and `truncated` keys added; `row_count` keeps the count of
+        rows fetched.
+    """
+    if not execution_result["success"] or execution_result["data"] is None:
+        return execution_result
+
+    stored = result_store.put(
+        execution_result["query_executed"],
+        execution_result["columns"],
+        execution_result["data"],
+        truncated=execution_result.get("truncated", False),
+    )
+    return {
+        **execution_result,
+        "data": stored.rows[:preview_rows],
+        "handle": stored.handle,
+        "truncated": stored.truncated,
+    }
+
+
+result_store_config = load_agent_config()["result_store"]
+
+# Process-wide result store
+result_store = ResultStore(
+    ttl=result_store_config["ttl"],
+    max_entries=result_store_config["max_entries"],
+    max_rows=result_store_config["max_rows"],
+    max_total_rows=result_store_config["max_total_rows"],
+)
@@ -0,0 +1,68 @@
+"""Speculative work started ahead of the node that consumes it.
+
+A node can start a task early (e.g. retrieval while the intent is still being
+classified) and a later node of the same run picks it up by key. Tasks are
+process-local, so this only applies within a single graph run on the event
+loop that started them.
+"""
+
+import asyncio
+import time
+from collections.abc import Coroutine, Hashable
+
+from langchain_core.runnables import RunnableConfig
+from loguru import logger
+
+
+def speculation_key(config: RunnableConfig | None, question: str) -> tuple:
+    """Key of a run's speculative work: its thread and question."""
+    thread_id = (config or {}).get("configurable", {}).get("thread_id")
+    return (thread_id, question)
+
+
+class SpeculativeTasks:
+    """Registry of speculative tasks, keyed per run.
+
+    Tasks that were never picked up (e.g. the run was abandoned between the
+    two nodes) are cancelled once older than `ttl` seconds.
+    """
+
+    def __init__(self, ttl: float) -> None:
+        """Initialize an empty registry."""
+        self.ttl = ttl
+        self._tasks: dict[Hashable, tuple[asyncio.Task, float]] = {}
+
+    def start(self, key: Hashable, coro: Coroutine) -> asyncio.Task:
+        """Start a task, replacing any pending one under the same key."""
+        self._purge()
+        self.discard(key)
+        task = asyncio.create_task(coro)
+        self._tasks[key] = (task, time.monotonic())
+        return task
+
+    def pop(self, key: Hashable) -> asyncio.Task | None:
+        """Take the task started under `key`, if any."""
+        entry = self._tasks.pop(key, None)
+        return entry[0] if entry else None
+
+    def discard(self, key: Hashable) -> None:
+        """Cancel and drop the task started under `key`, if any."""
+        task = self.pop(key)
+        if task is None:
+            return
+        if not task.done():
+            task.cancel()
+            logger.debug("🗑️ Discarded speculative task")
+        elif not task.cancelled():
+            # Mark a failure as retrieved, nobody is going to await it
+            task.exception()
+
+    def _purge(self) -> None:
+        """Cancel tasks that were never picked up."""
+        now = time.monotonic()
+        for key in [k for k, (_, t) in self._tasks.items() if now - t > self.ttl]:
+            self.discard(key)
+
+    def __len__(self) -> int:
+        """Number of pending tasks."""
+        return len(self._tasks)
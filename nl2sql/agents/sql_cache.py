@@ -0,0 +1,195 @@
+"""Semantic cache for generated SQL.
+
+Questions are embedded and compared by cosine similarity to previously
+answered ones; a near-duplicate above the similarity threshold reuses the
+cached SQL instead of calling the SQL generator LLM. Questions differing only
+in a literal ("orders in 2017" vs "orders in 2018") embed very close, so a
+near-duplicate must also have the same literals (quoted strings, numbers,
+upper-case codes such as state "SP"). The cache is tied to a schema version
+(the data dictionary content hash) and is cleared whenever the version
+changes.
+"""
+
+import re
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+
+import numpy as np
+from loguru import logger
+
+from nl2sql.config import load_agent_config
+
+# Quoted strings, numbers (years, amounts, limits) and upper-case codes
+LITERAL_PATTERN = re.compile(r"'[^']*'|\"[^\"]*\"|\d+(?:[.,]\d+)*|\b[A-Z]{2,}\b")
+
+
+def normalize_question(question: str) -> str:
+    """Normalize a question for exact lookups (case and whitespace)."""
+    return " ".join(question.lower().split())
+
+
+def question_literals(question: str) -> tuple[str, ...]:
+    """Literals of a question, which its SQL most likely depends on."""
+    return tuple(sorted(LITERAL_PATTERN.findall(question)))
+
+
+@dataclass
+class CachedSQL:
+    """A generated SQL query cached for a question."""
+
+    question: str
+    embedding: np.ndarray
+    literals: tuple[str, ...]
+    sql_query: str
+    sql_explanation: str | None
+    expires_at: float
+
+
+class SemanticSQLCache:
+    """Thread-safe semantic cache with LRU, TTL and max-entries eviction."""
+
+    def __init__(
+        self, similarity_threshold: float, ttl: float, max_entries: int
+    ) -> None:
+        """Initialize an empty cache."""
+        self.similarity_threshold = similarity_threshold
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self._entries: OrderedDict[str, CachedSQL] = OrderedDict()
+        self._schema_version: str | None = None
+        self._lock = threading.Lock()
+
+    def lookup(
+        self, question: str, embedding: list[float], schema_version: str
+    ) -> CachedSQL | None:
+        """Find the cached SQL of the most similar question, if close enough."""
+        with self._lock:
+            self._check_schema_version(schema_version)
+            self._evict_expired()
+
+            # Same question up to case and whitespace, no need to compare
+            match = self._entries.get(normalize_question(question))
+            if match is None:
+                match = self._most_similar(
+                    _unit(embedding), question_literals(question)
+                )
+            if match is None:
+                self.misses += 1
+                return None
+
+            self.hits += 1
+            self._entries.move_to_end(normalize_question(match.question))
+            return match
+
+    def put(
+        self,
+        question: str,
+        embedding: list[float],
+        schema_version: str,
+        sql_query: str,
+        sql_explanation: str | None = None,
+    ) -> None:
+        """Cache the SQL generated for a question."""
+        key = normalize_question(question)
+        with self._lock:
+            self._check_schema_version(schema_version)
+            self._entries[key] = CachedSQL(
+                question=question,
+                embedding=_unit(embedding),
+                literals=question_literals(question),
+                sql_query=sql_query,
+                sql_explanation=sql_explanation,
+                expires_at=time.time() + self.ttl,
+            )
+            self._entries.move_to_end(key)
+
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def update(self, question: str, sql_query: str) -> None:
+        """Replace the SQL cached for a question (e.g. after a syntax fix)."""
+        with self._lock:
+            entry = self._entries.get(normalize_question(question))
+            if entry is not None:
+                entry.sql_query = sql_query
+
+    def discard(self, question: str) -> None:
+        """Drop the entry of a question whose SQL turned out to be unusable."""
+        with self._lock:
+            if self._entries.pop(normalize_question(question), None) is not None:
+                logger.debug(f"🗑️ Discarded cached SQL for: {question}")
+
+    def clear(self) -> None:
+        """Drop all entries."""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        """Hit/miss counters and current size."""
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+            "size": len(self._entries),
+        }
+
+    def _check_schema_version(self, schema_version: str) -> None:
+        """Clear the cache when the schema changed (caller holds the lock)."""
+        if schema_version == self._schema_version:
+            return
+        if self._entries:
+            logger.info("🔄 Schema changed, clearing the SQL cache")
+            self._entries.clear()
+            self.invalidations += 1
+        self._schema_version = schema_version
+
+    def _evict_expired(self) -> None:
+        """Drop expired entries (caller holds the lock)."""
+        now = time.time()
+        for key in [k for k, e in self._entries.items() if e.expires_at <= now]:
+            del self._entries[key]
+            self.evictions += 1
+
+    def _most_similar(
+        self, embedding: np.ndarray, literals: tuple[str, ...]
+    ) -> CachedSQL | None:
+        """Most similar entry with the same literals, above the threshold.
+
+        The caller holds the lock.
+        """
+        entries = [e for e in self._entries.values() if e.literals == literals]
+        if not entries:
+            return None
+
+        similarities = np.stack([e.embedding for e in entries]) @ embedding
+        best = int(np.argmax(similarities))
+        if similarities[best] < self.similarity_threshold:
+            return None
+        return entries[best]
+
+
+def _unit(embedding: list[float]) -> np.ndarray:
+    """Normalize an embedding so dot products are cosine similarities."""
+    vector = np.asarray(embedding, dtype=np.float32)
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+
+sql_cache_config = load_agent_config()["sql_cache"]
+
+# Process-wide SQL cache
+sql_cache = SemanticSQLCache(
+    similarity_threshold=sql_cache_config["similarity_threshold"],
+    ttl=sql_cache_config["ttl"],
+    max_entries=sql_cache_config["max_entries"],
+)
@@ -0,0 +1,618 @@
+"""Local SQL checks run before the database round trip.
+
+Generated queries are tokenized with sqlparse and checked in process for:
+
+- syntax errors: unbalanced parentheses, unterminated quotes, stray commas
+  (e.g. `SELECT a, FROM t`) and multiple statements
+- tables missing from the data dictionary
+- columns missing from the tables they are read from
+
+The checks are conservative: anything they can't resolve with certainty
+(functions in FROM, tables outside the dictionary schemas, columns of derived
+tables) is left to the database. A query passing them may still be invalid;
+one failing them is. Error messages mimic PostgreSQL's and add hints (close
+matches, the columns of a table) for the SQL fixer.
+"""
+
+import difflib
+from dataclasses import dataclass, field
+from typing import Literal
+
+from sqlparse import lexer
+from sqlparse.sql import Token
+from sqlparse.tokens import (
+    Comment,
+    Error,
+    Literal as LiteralToken,
+    Name,
+    Punctuation,
+    Wildcard,
+)
+
+from nl2sql.knowledge_base.data_dictionary import DataDictionary
+
+CheckErrorType = Literal["syntax", "table", "column"]
+
+# (schema, table)
+RelationKey = tuple[str, str]
+
+# Keywords a comma can't be followed by
+CLAUSE_KEYWORDS = {
+    "FROM",
+    "WHERE",
+    "GROUP BY",
+    "HAVING",
+    "ORDER BY",
+    "LIMIT",
+    "OFFSET",
+    "UNION",
+    "UNION ALL",
+    "INTERSECT",
+    "EXCEPT",
+    "ON",
+}
+
+# Keywords ending the relation list of a FROM clause
+FROM_END_KEYWORDS = CLAUSE_KEYWORDS - {"FROM", "ON"} | {
+    "WINDOW",
+    "FETCH",
+    "FOR",
+    "RETURNING",
+}
+
+# Words sqlparse tokenizes as names although they are SQL syntax
+SYNTAX_NAMES = {"within"}
+
+MAX_HINT_COLUMNS = 40
+
+
+class SQLCheckError(Exception):
+    """Error found by the local checks."""
+
+    def __init__(self, error_type: CheckErrorType, message: str) -> None:
+        """Create the error.
+
+        Args:
+            error_type: Kind of error, used as a metric label
+            message: PostgreSQL-like message with hints for the SQL fixer
+        """
+        super().__init__(message)
+        self.error_type = error_type
+
+
+@dataclass
+class _Frame:
+    """Parenthesized group of a query."""
+
+    # Whether the group holds a query (vs. a function call or expression list)
+    query: bool
+    # Whether a comma starts a new relation of a FROM clause
+    in_from: bool = False
+
+
+@dataclass
+class _Scope:
+    """Names a query defines, merged across its subqueries."""
+
+    # Alias -> relation, None for derived tables and relations outside the
+    # data dictionary
+    aliases: dict[str, RelationKey | None] = field(default_factory=dict)
+    # Table name -> relation, for relations without an alias
+    tables: dict[str, RelationKey | None] = field(default_factory=dict)
+    ctes: set[str] = field(default_factory=set)
+    # Output names: column aliases, CTE and derived table column lists
+    declared: set[str] = field(default_factory=set)
+    functions: set[str] = field(default_factory=set)
+    # Columns of the data dictionary relations read by the query
+    columns: set[str] = field(default_factory=set)
+    relations: list[RelationKey] = field(default_factory=list)
+    # Token indices of relation names and aliases
+    consumed: set[int] = field(default_factory=set)
+    # Whether a relation has unknown columns (set-returning functions, VALUES,
+    # tables outside the dictionary), so unqualified columns can't be checked
+    opaque: bool = False
+
+
+def _keyword(token: Token | None) -> str:
+    """Normalized keyword of a token, empty for other tokens."""
+    if token is None or not token.is_keyword:
+        return ""
+    return " ".join(token.value.upper().split())
+
+
+def _word(token: Token | None) -> str | None:
+    """Identifier of a name or quoted identifier token, None for other tokens.
+
+    Unquoted names are folded to lower case, like PostgreSQL does.
+    """
+    if token is None:
+        return None
+    if token.ttype is Name:
+        return token.value.lower()
+    if token.ttype is LiteralToken.String.Symbol:
+        return token.value[1:-1].replace('""', '"')
+    return None
+
+
+def _is(token: Token | None, value: str) -> bool:
+    """Whether a token is the given punctuation."""
+    return token is not None and token.ttype is Punctuation and token.value == value
+
+
+def _at(tokens: list[Token], index: int) -> Token | None:
+    """Token at an index, None out of range."""
+    return tokens[index] if 0 <= index < len(tokens) else None
+
+
+def _check_comma(previous: Token | None, following: Token | None) -> None:
+    """Check the tokens around a comma.
+
+    Raises:
+        SQLCheckError: For a leading, trailing or doubled comma
+    """
+    if following is None:
+        raise SQLCheckError("syntax", "syntax error at end of input")
+    if (
+        _is(following, ")")
+        or _is(following, ",")
+        or _keyword(following) in CLAUSE_KEYWORDS
+        or _keyword(following).endswith("JOIN")
+    ):
+        raise SQLCheckError(
+            "syntax",
+            f'syntax error at or near "{following.value}": remove the comma before it',
+        )
+    if (
+        previous is None
+        or _is(previous, "(")
+        or _keyword(previous) in ("SELECT", "DISTINCT")
+    ):
+        raise SQLCheckError("syntax", 'syntax error at or near ","')
+
+
+def _close_matches(name: str, candidates: set[str] | list[str]) -> list[str]:
+    """Candidates close to a misspelled name."""
+    return difflib.get_close_matches(name, sorted(candidates), n=3, cutoff=0.6)
+
+
+def _quoted(*parts: str) -> str:
+    """Dotted, double-quoted identifier."""
+    return ".".join(f'"{part}"' for part in parts)
+
+
+class LocalSQLChecker:
+    """Check generated queries against the data dictionary."""
+
+    def __init__(self, data_dictionary: DataDictionary) -> None:
+        """Index the tables and columns of a data dictionary.
+
+        The tables of all databases are merged, since a connection only reaches
+        one of them anyway.
+
+        Args:
+            data_dictionary: Tables the generated queries may read
+        """
+        self._columns: dict[RelationKey, list[str]] = {}
+        for database_info in data_dictionary.databases.values():
+            for schema_name, schema_info in database_info.schemas.items():
+                for table_name, table_info in schema_info.tables.items():
+                    self._columns[(schema_name, table_name)] = [
+                        column.name for column in table_info.columns
+                    ]
+
+        self._schemas = {schema for schema, _ in self._columns}
+        self._by_table: dict[str, list[RelationKey]] = {}
+        for key in self._columns:
+            self._by_table.setdefault(key[1], []).append(key)
+
+    def check(self, query: str) -> dict:
+        """Check a query, like `validate_sql_syntax` but without the database.
+
+        Args:
+            query: SQL query to check
+
+        Returns:
+            dict: {
+                "valid_syntax": bool,
+                "error": str or None,
+                "error_type": "syntax", "table", "column" or None
+            }
+        """
+        try:
+            tokens = self._tokens(query)
+            self._check_syntax(tokens)
+            scope = self._analyze(tokens)
+            self._check_columns(tokens, scope)
+        except SQLCheckError as e:
+            return {"valid_syntax": False, "error": str(e), "error_type": e.error_type}
+        return {"valid_syntax": True, "error": None, "error_type": None}
+
+    @staticmethod
+    def _tokens(query: str) -> list[Token]:
+        """Tokens of the single statement of a query, without whitespace.
+
+        Only the lexer is run: sqlparse's grouping is several times slower and
+        the checks work on the flat token stream.
+        """
+        statements: list[list[Token]] = [[]]
+        for ttype, value in lexer.tokenize(query):
+            token = Token(ttype, value)
+            if _is(token, ";"):
+                statements.append([])
+            elif not token.is_whitespace and ttype not in Comment:
+                statements[-1].append(token)
+        statements = [tokens for tokens in statements if tokens]
+
+        if not statements:
+            raise SQLCheckError("syntax", "syntax error: empty query")
+        if len(statements) > 1:
+            raise SQLCheckError(
+                "syntax",
+                "cannot run multiple statements, send a single SELECT query",
+            )
+        return statements[0]
+
+    @staticmethod
+    def _check_syntax(tokens: list[Token]) -> None:
+        """Check quotes, parentheses and commas."""
+        depth = 0
+        for i, token in enumerate(tokens):
+            if token.ttype in Error and token.value in ("'", '"'):
+                kind = "quoted string" if token.value == "'" else "quoted identifier"
+                raise SQLCheckError(
+                    "syntax", f"unterminated {kind} at or near {token.value!r}"
+                )
+            if _is(token, "("):
+                depth += 1
+            elif _is(token, ")"):
+                depth -= 1
+                if depth < 0:
+                    raise SQLCheckError(
+                        "syntax", 'syntax error at or near ")": unmatched parenthesis'
+                    )
+            elif _is(token, ","):
+                _check_comma(_at(tokens, i - 1), _at(tokens, i + 1))
+
+        if depth > 0:
+            raise SQLCheckError(
+                "syntax", f"syntax error at end of input: {depth} unclosed parenthesis"
+            )
+
+    def _analyze(self, tokens: list[Token]) -> _Scope:
+        """Collect the relations, aliases and output names of a query."""
+        scope = _Scope()
+        self._collect_ctes(tokens, scope)
+
+        frames = [_Frame(query=True)]
+        for i, token in enumerate(tokens):
+            if _is(token, "("):
+                following = _at(tokens, i + 1)
+                frames.append(
+                    _Frame(query=_keyword(following) in ("SELECT", "WITH", "VALUES"))
+                )
+                continue
+            if _is(token, ")"):
+                frames.pop()
+                continue
+
+            frame = frames[-1]
+            if not frame.query:
+                # Function arguments, e.g. EXTRACT(YEAR FROM ...)
+                continue
+            keyword = _keyword(token)
+            if (keyword == "FROM" and _keyword(tokens[i - 1]) != "DISTINCT") or (
+                keyword.endswith("JOIN")
+            ):
+                frame.in_from = True
+                self._relation(tokens, i + 1, scope)
+            elif keyword in FROM_END_KEYWORDS:
+                frame.in_from = False
+            elif frame.in_from and _is(token, ","):
+                self._relation(tokens, i + 1, scope)
+
+        self._collect_declared(tokens, scope)
+        return scope
+
+    @staticmethod
+    def _matching(tokens: list[Token], start: int) -> int:
+        """Index of the parenthesis closing the one at `start`."""
+        depth = 0
+        for i in range(start, len(tokens)):
+            if _is(tokens[i], "("):
+                depth += 1
+            elif _is(tokens[i], ")"):
+                depth -= 1
+                if depth == 0:
+                    return i
+        return len(tokens) - 1
+
+    @staticmethod
+    def _dotted(tokens: list[Token], start: int) -> tuple[list[str], int]:
+        """Parts of a dotted name and the index following it."""
+        parts = []
+        i = start
+        while (word := _word(_at(tokens, i))) is not None:
+            parts.append(word)
+            i += 1
+            if not _is(_at(tokens, i), "."):
+                break
+            i += 1
+        return parts, i
+
+    def _collect_ctes(self, tokens: list[Token], scope: _Scope) -> None:
+        """Collect CTE (and named window) names and column lists.
+
+        Matches `name AS (`, `name AS [NOT] MATERIALIZED (` and
+        `name (columns) AS (`.
+        """
+        for i, token in enumerate(tokens):
+            name = _word(token)
+            if name is None:
+                continue
+            j = i + 1
+            columns_end = None
+            if _is(_at(tokens, j), "("):
+                columns_end = self._matching(tokens, j)
+                j = columns_end + 1
+            if j >= len(tokens) or _keyword(tokens[j]) != "AS":
+                continue
+            j += 1
+            while j < len(tokens) and _keyword(tokens[j]) in ("NOT", "MATERIALIZED"):
+                j += 1
+            if not _is(_at(tokens, j), "("):
+                continue
+
+            scope.ctes.add(name)
+            scope.consumed.add(i)
+            if columns_end is not None:
+                for k in range(i + 2, columns_end):
+                    if (column := _word(tokens[k])) is not None:
+                        scope.declared.add(column)
+                        scope.consumed.add(k)
+
+    def _relation(self, tokens: list[Token], start: int, scope: _Scope) -> None:
+        """Resolve the relation starting at `start` and its alias."""
+        i = start
+        while _keyword(_at(tokens, i)) in ("LATERAL", "ONLY"):
+            i += 1
+        if i >= len(tokens):
+            return
+
+        relation, i = self._relation_source(tokens, i, scope)
+
+        while _keyword(_at(tokens, i)) in ("WITH", "ORDINALITY", "AS"):
+            i += 1
+        alias = _word(_at(tokens, i))
+        if alias is None:
+            return
+        scope.aliases[alias] = relation
+        scope.consumed.add(i)
+        if _is(_at(tokens, i + 1), "("):
+            # Column aliases, e.g. AS t(a, b)
+            for k in range(i + 2, self._matching(tokens, i + 1)):
+                if (column := _word(tokens[k])) is not None:
+                    scope.declared.add(column)
+                    scope.consumed.add(k)
+
+    def _relation_source(
+        self, tokens: list[Token], start: int, scope: _Scope
+    ) -> tuple[RelationKey | None, int]:
+        """Resolve a table, derived table or function in FROM.
+
+        Returns:
+            The data dictionary relation (None for other sources) and the index
+            following the source
+        """
+        if _is(tokens[start], "("):
+            # Derived table: its columns are checked where they are defined
+            if _keyword(_at(tokens, start + 1)) == "VALUES":
+                scope.opaque = True
+            return None, self._matching(tokens, start) + 1
+
+        parts, end = self._dotted(tokens, start)
+        if not parts:
+            return None, start
+        if _is(_at(tokens, end), "("):
+            # Set-returning function, e.g. generate_series(...)
+            scope.opaque = True
+            scope.functions.add(parts[-1])
+            return None, self._matching(tokens, end) + 1
+
+        scope.consumed.update(range(start, end))
+        relation = self._resolve_table(parts, scope)
+        if relation is not None or parts[-1] not in scope.ctes:
+            scope.tables[parts[-1]] = relation
+        return relation, end
+
+    def _resolve_table(self, parts: list[str], scope: _Scope) -> RelationKey | None:
+        """Resolve a table reference against the data dictionary.
+
+        Raises:
+            SQLCheckError: If the table is missing from the data dictionary
+        """
+        table = parts[-1]
+        schema = parts[-2] if len(parts) > 1 else None
+
+        if schema is None:
+            if table in scope.ctes:
+                return None
+            matches = self._by_table.get(table, [])
+            if not matches:
+                if table.startswith("pg_"):
+                    # System catalogs
+                    scope.opaque = True
+                    return None
+                raise SQLCheckError("table", self._unknown_table(table, schema))
+            for match in matches:
+                scope.columns.update(self._columns[match])
+                scope.relations.append(match)
+            # Resolved by the search path when several schemas have the table
+            return matches[0] if len(matches) == 1 else None
+
+        if schema not in self._schemas:
+            # e.g. information_schema
+            scope.opaque = True
+            return None
+        key = (schema, table)
+        if key not in self._columns:
+            raise SQLCheckError("table", self._unknown_table(table, schema))
+        scope.columns.update(self._columns[key])
+        scope.relations.append(key)
+        return key
+
+    def _unknown_table(self, table: str, schema: str | None) -> str:
+        """Message for a table missing from the data dictionary."""
+        candidates = {
+            _quoted(*key): key[1]
+            for key in self._columns
+            if schema is None or key[0] == schema
+        }
+        name = _quoted(schema, table) if schema else _quoted(table)
+        message = f"relation {name} does not exist"
+        matches = _close_matches(table, list(candidates.values()))
+        if matches:
+            suggestions = [key for key, value in candidates.items() if value in matches]
+            return f"{message}. Did you mean {' or '.join(suggestions)}?"
+        return f"{message}. Available tables: {', '.join(sorted(candidates))}"
+
+    @staticmethod
+    def _collect_declared(tokens: list[Token], scope: _Scope) -> None:
+        """Collect function names and output names (`AS x` or implicit `x`)."""
+        for i, token in enumerate(tokens):
+            word = _word(token)
+            if word is None:
+                continue
+            following = _at(tokens, i + 1)
+            if _is(following, "("):
+                scope.functions.add(word)
+                continue
+            previous = _at(tokens, i - 1)
+            if previous is None or _is(previous, "."):
+                continue
+            if (
+                _keyword(previous) in ("AS", "END")
+                or _is(previous, ")")
+                or previous.ttype in Name
+                or previous.ttype in LiteralToken
+            ):
+                scope.declared.add(word)
+
+    def _check_columns(self, tokens: list[Token], scope: _Scope) -> None:
+        """Check column references against the relations they are read from.
+
+        Raises:
+            SQLCheckError: For a column missing from its table, or a qualifier
+                that isn't a relation of the query
+        """
+        i = 0
+        while i < len(tokens):
+            if i in scope.consumed or _word(tokens[i]) is None:
+                i += 1
+                continue
+            parts, end = self._dotted(tokens, start=i)
+            previous = _at(tokens, i - 1)
+            following = _at(tokens, end)
+            start, i = i, end
+
+            if _is(previous, "::") or _is(following, "("):
+                # Type casts and function calls
+                continue
+            if _is(tokens[end - 1], "."):
+                # Qualified wildcard (`t.*`) or a keyword column (`t.year`)
+                i += 1
+                if following is None:
+                    continue
+                if following.ttype is Wildcard:
+                    self._resolve_qualifier(parts, scope)
+                    continue
+                if not following.is_keyword:
+                    continue
+                parts.append(following.value.lower())
+
+            if len(parts) == 1:
+                self._check_unqualified(parts[0], tokens, start, scope)
+                continue
+            relation = self._resolve_qualifier(parts[:-1], scope)
+            if relation is not None and parts[-1] not in self._columns[relation]:
+                raise SQLCheckError("column", self._unknown_column(parts, relation))
+
+    def _resolve_qualifier(
+        self, qualifier: list[str], scope: _Scope
+    ) -> RelationKey | None:
+        """Relation a column qualifier refers to, None if unknown.
+
+        Raises:
+            SQLCheckError: If the qualifier isn't a relation of the query
+        """
+        if len(qualifier) > 1:
+            key = (qualifier[-2], qualifier[-1])
+            return key if key in self._columns else None
+
+        name = qualifier[0]
+        if name in scope.aliases:
+            return scope.aliases[name]
+        if name in scope.tables:
+            return scope.tables[name]
+        if name in scope.ctes or scope.opaque:
+            return None
+        relations = sorted(set(scope.aliases) | set(scope.tables) | scope.ctes)
+        hint = f". Relations of the query: {', '.join(relations)}" if relations else ""
+        raise SQLCheckError(
+            "column", f'missing FROM-clause entry for table "{name}"{hint}'
+        )
+
+    def _unknown_column(self, parts: list[str], relation: RelationKey) -> str:
+        """Message for a qualified column missing from its table."""
+        *qualifier, column = parts
+        message = f"column {'.'.join(qualifier)}.{column} does not exist"
+        owners = [key for key, columns in self._columns.items() if column in columns]
+        if owners:
+            tables = ", ".join(_quoted(*key) for key in owners)
+            return f"{message}. It is a column of {tables}"
+        columns = self._columns[relation]
+        matches = _close_matches(column, columns)
+        if matches:
+            return f"{message}. Did you mean {' or '.join(map(_quoted, matches))}?"
+        return f"{message}. Its columns are: {', '.join(columns[:MAX_HINT_COLUMNS])}"
+
+    def _check_unqualified(
+        self, column: str, tokens: list[Token], index: int, scope: _Scope
+    ) -> None:
+        """Check an unqualified column against all relations of the query.
+
+        Raises:
+            SQLCheckError: If no relation of the query has the column
+        """
+        following = _at(tokens, index + 1)
+        if (
+            scope.opaque
+            or (
+                tokens[index].ttype is not LiteralToken.String.Symbol
+                and column in SYNTAX_NAMES
+            )
+            # Typed literals (DATE '...') and EXTRACT(field FROM ...)
+            or (following is not None and following.ttype in LiteralToken.String)
+            or (_is(tokens[index - 1], "(") and _keyword(following) == "FROM")
+        ):
+            return
+
+        known = (
+            scope.columns
+            | scope.declared
+            | scope.functions
+            | scope.ctes
+            | set(scope.aliases)
+            | set(scope.tables)
+            | self._schemas
+        )
+        if column in known:
+            return
+
+        message = f'column "{column}" does not exist'
+        matches = _close_matches(column, scope.columns)
+        if matches:
+            message += f". Did you mean {' or '.join(map(_quoted, matches))}?"
+        elif scope.relations:
+            tables = ", ".join(_quoted(*key) for key in scope.relations)
+            message += f". Tables of the query: {tables}"
+        raise SQLCheckError("column", message)
@@ -24,6 +24,9 @@ class State(BaseModel):
     sql_execution_result: dict[str, Any] | None = None
     sql_execution_analysis: str | None = None
     sql_safety_status: Literal["safe", "unsafe"] | None = None
-    sql_syntax_status: Literal["valid", "invalid"] | None = None
+    sql_syntax_status: Literal["valid", "invalid", "unverified"] | None = None
+    sql_cost_status: Literal["approved", "confirm", "rejected"] | None = None
+    sql_cost_estimate: dict[str, Any] | None = None
     user_feedback_status: Literal["approved", "rejected"] | None = None
     sql_execution_status: Literal["success", "failure"] | None = None
+    deadline_exceeded: bool = False
@@ -1,21 +1,31 @@
 """This module contains the tools for the chat agent."""
 
-from langchain.chat_models import init_chat_model
 from langchain_core.prompts import ChatPromptTemplate
+from langchain_core.runnables import RunnableConfig, ensure_config
 
+from nl2sql.agents.deadline import llm_timeout
 from nl2sql.knowledge_base.data_dictionary import DataDictionary
 from nl2sql.knowledge_base.vector_store import VectorStore
+from nl2sql.llm import cached_chain
 
 
 class ChatAgentTools:
     """Container for chat agent tools."""
 
-    def __init__(self, vector_store: VectorStore) -> None:
-        """Initialize with a vector store instance."""
+    def __init__(
+        self, vector_store: VectorStore, data_dictionary: DataDictionary | None = None
+    ) -> None:
+        """Initialize with a vector store instance.
+
+        Args:
+            vector_store: Vector store holding the SQL examples
+            data_dictionary: Loaded data dictionary for the schema context;
+                loaded from disk when not given
+        """
         self.vector_store = vector_store
         # Load data dictionary for schema context
         try:
-            self.data_dictionary = DataDictionary.load()
+            self.data_dictionary = data_dictionary or DataDictionary.load()
             self.schema_context = self.data_dictionary.format_context()
         except Exception as e:
             # Fallback to a basic schema description
@@ -69,11 +79,14 @@ class ChatAgentTools:
         except Exception as e:
             return f"Error retrieving similar queries: {e!s}"
 
-    def explain_query(self, sql_query: str) -> str:
+    def explain_query(self, sql_query: str, config: RunnableConfig) -> str:
         """Explain a SQL query based on the database schema.
 
         Args:
             sql_query (str): The SQL query to be explained.
+            config: Run config, injected by the tool (hidden from the model).
+                The agent runs tools without one, the chat agent node's config
+                is then inherited; its deadline bounds the explanation.
         """
         try:
             explainer_prompt = """You are a helpful SQL expert. Explain the following SQL query in simple terms,
@@ -90,12 +103,12 @@ class ChatAgentTools:
             explainer_prompt_template = ChatPromptTemplate.from_template(
                 explainer_prompt
             )
-            llm = init_chat_model(
-                model="gpt-4.1-mini", model_provider="openai", temperature=0
+            explainer_chain = cached_chain(
+                explainer_prompt_template,
+                "query_explainer",
+                timeout=llm_timeout(ensure_config(config)),
             )
 
-            explainer_chain = explainer_prompt_template | llm
-
             response = explainer_chain.invoke(
                 {"sql_query": sql_query, "schema_context": self.schema_context}
             )
@@ -4,9 +4,12 @@ import pandas as pd
 from langchain_core.messages import BaseMessage
 from loguru import logger
 from sqlalchemy import text
+from sqlparse import lexer
+from sqlparse.tokens import Comment, Keyword, Punctuation
 
 from nl2sql.agents.state import State
 from nl2sql.database.base import SQLBaseConnector
+from nl2sql.database.postgresql import PostgreSQLConnector
 
 
 def get_chat_history(messages: list[BaseMessage], last_n_messages: int = 10) -> str:
@@ -16,32 +19,70 @@ def get_chat_history(messages: list[BaseMessage], last_n_messages: int = 10) ->
     )
 
 
-def validate_sql_syntax(query: str, db_conn: SQLBaseConnector) -> dict:
+def validate_sql_syntax(query: str, db_conn: PostgreSQLConnector) -> dict:
     """Validate SQL syntax using PostgreSQL's PREPARE statement.
 
+    Runs on the connector's pooled validation sessions, and recently validated
+    query texts are answered from cache (see `SQLSyntaxValidator`).
+
     Args:
         query (str): The SQL query to validate.
-        db_conn: A SQLBaseConnector instance.
+        db_conn: A PostgreSQLConnector instance.
 
     Returns:
         dict: {
-            "valid_syntax": bool,
+            "valid_syntax": bool, or None if the database couldn't validate it,
             "error": str or None
         }
     """
-    cur = db_conn.engine.raw_connection().cursor()
-    result = {"valid_syntax": True, "error": None}
+    return db_conn.get_syntax_validator().validate(query)
 
-    try:
-        cur.execute(f"PREPARE validate_stmt AS {query}")
-        cur.execute("DEALLOCATE validate_stmt")
-    except Exception as e:
-        result["valid_syntax"] = False
-        result["error"] = str(e)
-    finally:
-        cur.close()
 
-    return result
+def estimate_sql_cost(query: str, db_conn: PostgreSQLConnector) -> dict:
+    """Estimate the cost of a SQL query using PostgreSQL's EXPLAIN.
+
+    The query is planned, not run, on the connector's validation sessions.
+
+    Args:
+        query (str): The SQL query to estimate.
+        db_conn: A PostgreSQLConnector instance.
+
+    Returns:
+        dict: {
+            "success": bool,
+            "total_cost": float or None,
+            "plan_rows": int or None,
+            "error": str or None
+        }
+    """
+    return db_conn.get_syntax_validator().explain(query)
+
+
+def add_row_limit(query: str, max_rows: int) -> str | None:
+    """Add a LIMIT to a query.
+
+    Args:
+        query (str): The SQL query to limit.
+        max_rows: Maximum number of rows the query returns.
+
+    Returns:
+        The limited query, or None if the query already has a top-level LIMIT
+        or FETCH clause.
+    """
+    depth = 0
+    position = 0
+    body_end = 0
+    for ttype, value in lexer.tokenize(query):
+        if ttype is Punctuation:
+            depth += {"(": 1, ")": -1}.get(value, 0)
+        elif depth == 0 and ttype in Keyword and value.upper() in ("LIMIT", "FETCH"):
+            return None
+        position += len(value)
+        if not (value.isspace() or ttype in Comment or value == ";"):
+            body_end = position
+
+    # On its own line, so that a trailing comment can't swallow it
+    return f"{query[:body_end]}\nLIMIT {max_rows}"
 
 
 def format_answer(state: State) -> str:
@@ -54,18 +95,30 @@ def format_answer(state: State) -> str:
     return formatted_answer
 
 
-def execute_sql_query(query: str, db_conn: SQLBaseConnector) -> dict:
+def execute_sql_query(
+    query: str,
+    db_conn: SQLBaseConnector,
+    timeout: float | None = None,
+    max_rows: int | None = None,
+) -> dict:
     """Execute SQL query and return formatted results.
 
     Args:
         query (str): The SQL query to execute.
         db_conn: A SQLBaseConnector instance.
+        timeout: Optional statement timeout in seconds, applied with
+            `SET LOCAL statement_timeout` to the query's transaction.
+        max_rows: Optional maximum number of rows to fetch. Rows are then
+            streamed from a server-side cursor, so a longer result is never
+            held in memory in full.
 
     Returns:
         dict: {
             "success": bool,
-            "data": pandas.DataFrame or None,
-            "row_count": int,
+            "data": list of row dicts or None,
+            "columns": list of column names,
+            "row_count": int (rows fetched),
+            "truncated": bool (the query returned more than max_rows rows),
             "error": str or None,
             "query_executed": str
         }
@@ -73,7 +126,9 @@ def execute_sql_query(query: str, db_conn: SQLBaseConnector) -> dict:
     result = {
         "success": False,
         "data": None,
+        "columns": [],
         "row_count": 0,
+        "truncated": False,
         "error": None,
         "query_executed": query.strip(),
     }
@@ -84,12 +139,27 @@ def execute_sql_query(query: str, db_conn: SQLBaseConnector) -> dict:
 
     try:
         with db_conn.engine.connect() as conn:
+            if timeout is not None:
+                # Scoped to this transaction, which is rolled back on release
+                timeout_ms = max(int(timeout * 1000), 1)
+                conn.execute(text(f"SET LOCAL statement_timeout = {timeout_ms}"))
+
+            if max_rows is not None:
+                conn = conn.execution_options(stream_results=True)
             query_result = conn.execute(text(query))
             logger.debug(f"Returns rows: {query_result.returns_rows}")
 
             if query_result.returns_rows:
+                if max_rows is None:
+                    rows = query_result.fetchall()
+                else:
+                    # One extra row tells whether the result was cut short
+                    rows = query_result.fetchmany(max_rows + 1)
+                    result["truncated"] = len(rows) > max_rows
+                    rows = rows[:max_rows]
+                result["columns"] = list(query_result.keys())
                 result["data"] = pd.DataFrame(
-                    data=query_result.fetchall(), columns=query_result.keys()
+                    data=rows, columns=query_result.keys()
                 ).to_dict("records")
                 result["row_count"] = len(result["data"])
                 logger.debug(
@@ -112,6 +182,9 @@ def format_query_results_for_llm(
 ) -> str:
     """Format SQL execution results for LLM interpretation.
 
+    The data may be a preview of the result (see `store_execution_result`), so
+    sizes come from `row_count` and `columns` rather than the rows at hand.
+
     Args:
         execution_result: Result dictionary from execute_sql_query
         max_rows: Maximum number of rows to include in the formatted output
@@ -129,11 +202,13 @@ def format_query_results_for_llm(
 
     # Convert to pandas DataFrame
     df = pd.DataFrame(execution_result["data"])
+    row_count = execution_result.get("row_count", len(df))
+    columns = execution_result.get("columns") or list(df.columns)
 
     result_text = (
         "Query executed successfully. "
-        f"Returned {len(df)} rows and {len(df.columns)} columns.\n"
-        f"Columns: {', '.join(df.columns)}\n\n"
+        f"Returned {row_count} rows and {len(columns)} columns.\n"
+        f"Columns: {', '.join(columns)}\n\n"
     )
 
     # Add sample data (limited to max_rows and max_cols)
@@ -141,9 +216,10 @@ def format_query_results_for_llm(
     result_text += df.iloc[:max_rows, :max_cols].to_string(index=False)
 
     # Add note if results were truncated
-    if len(df) > max_rows:
-        result_text += f"\n\n... ({len(df) - max_rows} more rows not shown)"
-    if max_cols is not None and len(df.columns) > max_cols:
-        result_text += f"\n\n... ({len(df.columns) - max_cols} more columns not shown)"
+    shown_rows = min(len(df), max_rows)
+    if row_count > shown_rows:
+        result_text += f"\n\n... ({row_count - shown_rows} more rows not shown)"
+    if max_cols is not None and len(columns) > max_cols:
+        result_text += f"\n\n... ({len(columns) - max_cols} more columns not shown)"
 
     return result_text
@@ -0,0 +1,156 @@
+"""Shared runtime components for the NL2SQL API."""
+
+import asyncio
+
+from langgraph.checkpoint.postgres.aio import AsyncPostgresSaver
+from langgraph.graph.state import CompiledStateGraph
+from loguru import logger
+from psycopg_pool import AsyncConnectionPool
+from sqlalchemy import text
+
+from nl2sql.agents.graph import create_graph
+from nl2sql.config import load_agent_config, load_api_config
+from nl2sql.database.postgresql import PostgreSQLConnector
+from nl2sql.knowledge_base.vector_store import VectorStore
+from nl2sql.llm import get_chat_model, model_registry
+
+
+class Components:
+    """Container for the database, vector store, memory and graph components.
+
+    Components are built once per process, under a lock, and are meant to be
+    initialized and warmed up from the application lifespan before the worker
+    starts accepting requests.
+    """
+
+    def __init__(
+        self,
+        config_path: str = "configs/database.yml",
+        api_config_path: str = "configs/api.yml",
+    ) -> None:
+        """Initialize an empty component container."""
+        self.config_path = config_path
+        self.api_config_path = api_config_path
+        self.db_connector: PostgreSQLConnector | None = None
+        self.vector_store: VectorStore | None = None
+        self.memory: AsyncPostgresSaver | None = None
+        self.graph: CompiledStateGraph | None = None
+        self.memory_pool: AsyncConnectionPool | None = None
+        self._lock = asyncio.Lock()
+
+    @property
+    def initialized(self) -> bool:
+        """Whether all components have been built."""
+        return self.graph is not None
+
+    @property
+    def checkpointer_connected(self) -> bool:
+        """Whether the checkpointer pool is open and holds connections (no I/O)."""
+        pool = self.memory_pool
+        return (
+            pool is not None and not pool.closed and pool.get_stats()["pool_size"] > 0
+        )
+
+    async def initialize(self) -> None:
+        """Build all components, once, in dependency order."""
+        if self.initialized:
+            return
+
+        async with self._lock:
+            # Another task may have finished initialization while we waited
+            if self.initialized:
+                return
+
+            # Connector and vector store setup is blocking, keep it off the loop
+            logger.info("🔄 Initializing database connector...")
+            self.db_connector = await asyncio.to_thread(
+                PostgreSQLConnector, config_path=self.config_path
+            )
+
+            logger.info("🔄 Initializing vector store...")
+            self.vector_store = await asyncio.to_thread(VectorStore, self.db_connector)
+
+            logger.info("🔄 Initializing PostgreSQL memory...")
+            # A pool lets concurrent requests checkpoint in parallel and
+            # survives dropped connections
+            checkpointer_config = load_api_config(self.api_config_path)["checkpointer"]
+            self.memory_pool = self.db_connector.get_async_psycopg_pool(
+                **checkpointer_config
+            )
+            await self.memory_pool.open(wait=True)
+            self.memory = AsyncPostgresSaver(conn=self.memory_pool)
+            # Setup memory tables
+            await self.memory.setup()
+
+            logger.info("🔄 Initializing agent graph...")
+            workflow = create_graph(
+                self.db_connector,
+                self.vector_store,
+                speculative_retrieval=load_agent_config()["speculation"]["retrieval"],
+            )
+            self.graph = workflow.compile(checkpointer=self.memory)
+
+    async def warmup(self) -> None:
+        """Exercise the database, embedding and LLM clients once.
+
+        Failures are logged rather than raised: a slow or unavailable provider
+        should not keep the worker from starting.
+        """
+        logger.info("🔄 Warming up components...")
+
+        try:
+            await asyncio.to_thread(self._ping_database)
+            logger.debug("✅ Database round trip")
+        except Exception as e:
+            logger.warning(f"⚠️ Database warmup failed: {e}")
+
+        try:
+            # Connects the minimum number of SQL validation sessions
+            await asyncio.to_thread(
+                self.db_connector.get_syntax_validator().open, wait=True
+            )
+            logger.debug("✅ SQL validation sessions")
+        except Exception as e:
+            logger.warning(f"⚠️ SQL validation warmup failed: {e}")
+
+        try:
+            # Embeds the text and queries pgvector in one go
+            await asyncio.to_thread(
+                self.vector_store.vectorstore.similarity_search, "warmup", k=1
+            )
+            logger.debug("✅ Embedding and vector store round trip")
+        except Exception as e:
+            logger.warning(f"⚠️ Vector store warmup failed: {e}")
+
+        try:
+            # Also opens a keep-alive connection in the shared HTTP pool
+            llm = get_chat_model("intent_classifier")
+            await llm.ainvoke("ping", max_tokens=1)
+            logger.debug("✅ LLM round trip")
+        except Exception as e:
+            logger.warning(f"⚠️ LLM warmup failed: {e}")
+
+        logger.info("✅ Components warmed up")
+
+    async def close(self) -> None:
+        """Release connections held by the components."""
+        if self.memory_pool is not None:
+            await self.memory_pool.close()
+        if self.db_connector is not None:
+            self.db_connector.dispose()
+        await model_registry.aclose()
+
+        self.db_connector = None
+        self.vector_store = None
+        self.memory = None
+        self.graph = None
+        self.memory_pool = None
+
+    def _ping_database(self) -> None:
+        """Run a trivial query on the shared engine."""
+        with self.db_connector.engine.connect() as conn:
+            conn.execute(text("SELECT 1"))
+
+
+# Process-wide component container
+components = Components()
@@ -0,0 +1,171 @@
+"""Concurrency control for graph runs in the NL2SQL API."""
+
+import asyncio
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+
+
+class OverloadedError(Exception):
+    """Raised when a request is shed instead of queued."""
+
+    def __init__(self, message: str, retry_after: int) -> None:
+        """Initialize with a message and a Retry-After hint in seconds."""
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class SessionLocks:
+    """FIFO locks that serialize graph runs of the same session.
+
+    Runs on one thread ID must not interleave: they would read and write the
+    same checkpoints. Locks exist only while a request holds or waits on them.
+    """
+
+    def __init__(self, max_pending: int, retry_after: int) -> None:
+        """Initialize with the number of requests allowed to wait per session."""
+        self.max_pending = max_pending
+        self.retry_after = retry_after
+        self._locks: dict[str, asyncio.Lock] = {}
+        self._holders: dict[str, int] = {}
+
+    @asynccontextmanager
+    async def hold(self, session_id: str) -> AsyncIterator[None]:
+        """Hold the session lock, waiting behind earlier requests of the session."""
+        # Requests on the session, including the one currently running
+        holders = self._holders.get(session_id, 0)
+        if holders > self.max_pending:
+            raise OverloadedError(
+                f"Too many pending requests for session {session_id}",
+                self.retry_after,
+            )
+
+        lock = self._locks.setdefault(session_id, asyncio.Lock())
+        self._holders[session_id] = holders + 1
+        try:
+            async with lock:
+                yield
+        finally:
+            self._holders[session_id] -= 1
+            if not self._holders[session_id]:
+                del self._holders[session_id]
+                del self._locks[session_id]
+
+    def __len__(self) -> int:
+        """Number of sessions with a running or waiting request."""
+        return len(self._locks)
+
+
+class AdmissionController:
+    """Bound the number of graph runs in flight, shedding load past a queue.
+
+    Up to `max_in_flight` runs execute at once. Further requests wait in a
+    queue of at most `max_queue` entries for up to `queue_timeout` seconds;
+    beyond that they are rejected with `OverloadedError`.
+
+    Background runs (e.g. batches) are never shed, nor counted in that queue.
+    At most `max_background` of them run at once, so interactive requests
+    always have `max_in_flight - max_background` slots to themselves.
+    """
+
+    def __init__(
+        self,
+        max_in_flight: int,
+        max_queue: int,
+        queue_timeout: float,
+        retry_after: int,
+        max_background: int,
+    ) -> None:
+        """Initialize the controller limits.
+
+        Raises:
+            ValueError: If background runs could take every slot
+        """
+        if not 0 < max_background < max_in_flight:
+            raise ValueError(
+                "max_background must be positive and lower than max_in_flight"
+            )
+        self.max_in_flight = max_in_flight
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.retry_after = retry_after
+        self.max_background = max_background
+        self._semaphore = asyncio.Semaphore(max_in_flight)
+        self._background_semaphore = asyncio.Semaphore(max_background)
+        self._in_flight = 0
+        self._queued = 0
+        self._background_queued = 0
+
+    @property
+    def in_flight(self) -> int:
+        """Number of admitted runs."""
+        return self._in_flight
+
+    @property
+    def queued(self) -> int:
+        """Number of requests waiting for admission."""
+        return self._queued
+
+    @property
+    def background_queued(self) -> int:
+        """Number of background runs waiting for admission."""
+        return self._background_queued
+
+    @asynccontextmanager
+    async def admit(self, shed: bool = True) -> AsyncIterator[None]:
+        """Wait for a slot to run a graph.
+
+        Args:
+            shed: Reject the request when the queue is full or the wait times
+                out. Background work (e.g. batches) passes False to wait for
+                one of the background slots regardless.
+        """
+        if not shed:
+            async with self._admit_background():
+                yield
+            return
+
+        if self._semaphore.locked() and self._queued >= self.max_queue:
+            raise OverloadedError("Server is at capacity", self.retry_after)
+
+        self._queued += 1
+        try:
+            await asyncio.wait_for(self._semaphore.acquire(), self.queue_timeout)
+        except TimeoutError as e:
+            raise OverloadedError(
+                "Timed out waiting for capacity", self.retry_after
+            ) from e
+        finally:
+            self._queued -= 1
+
+        async with self._run():
+            yield
+
+    @asynccontextmanager
+    async def _admit_background(self) -> AsyncIterator[None]:
+        """Wait for a background slot, then for a run slot."""
+        self._background_queued += 1
+        try:
+            await self._background_semaphore.acquire()
+            try:
+                await self._semaphore.acquire()
+            except BaseException:
+                self._background_semaphore.release()
+                raise
+        finally:
+            self._background_queued -= 1
+
+        try:
+            async with self._run():
+                yield
+        finally:
+            self._background_semaphore.release()
+
+    @asynccontextmanager
+    async def _run(self) -> AsyncIterator[None]:
+        """Account for an admitted run and free its slot afterwards."""
+        self._in_flight += 1
+        try:
+            yield
+        finally:
+            self._in_flight -= 1
+            self._semaphore.release()
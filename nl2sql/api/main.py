@@ -1,11 +1,34 @@
 """Main FastAPI application for NL2SQL agent."""
 
-from fastapi import FastAPI
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI, Request, status
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
 from loguru import logger
 
+from nl2sql.api.components import components
+from nl2sql.api.concurrency import OverloadedError
 from nl2sql.api.routes.chat import router as chat_router
 from nl2sql.api.routes.health import router as health_router
+from nl2sql.api.routes.metrics import router as metrics_router
+from nl2sql.api.routes.results import router as results_router
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI) -> AsyncIterator[None]:
+    """Build and warm up components before serving, release them on shutdown."""
+    logger.info("🚀 NL2SQL Agent API starting up...")
+    await components.initialize()
+    await components.warmup()
+    logger.info("✅ NL2SQL Agent API ready")
+
+    yield
+
+    logger.info("🛑 NL2SQL Agent API shutting down...")
+    await components.close()
+
 
 # Create FastAPI application
 app = FastAPI(
@@ -14,6 +37,7 @@ app = FastAPI(
     version="0.1.0",
     docs_url="/docs",
     redoc_url="/redoc",
+    lifespan=lifespan,
 )
 
 # Add CORS middleware
@@ -25,9 +49,23 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+
+@app.exception_handler(OverloadedError)
+async def overloaded_handler(request: Request, exc: OverloadedError) -> JSONResponse:
+    """Reject shed requests with 429 and a Retry-After hint."""
+    logger.warning(f"⚠️ Request to {request.url.path} rejected: {exc}")
+    return JSONResponse(
+        status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+        content={"detail": str(exc)},
+        headers={"Retry-After": str(exc.retry_after)},
+    )
+
+
 # Include routers
 app.include_router(health_router, tags=["Health"])
 app.include_router(chat_router, prefix="/chat", tags=["Chat"])
+app.include_router(results_router, prefix="/results", tags=["Results"])
+app.include_router(metrics_router, tags=["Metrics"])
 
 
 @app.get("/")
@@ -38,21 +76,11 @@ async def root() -> dict[str, str]:
         "docs": "/docs",
         "health": "/health",
         "chat": "/chat",
+        "results": "/results/{handle}",
+        "metrics": "/metrics",
     }
 
 
-@app.on_event("startup")
-async def startup_event() -> None:
-    """Startup event handler."""
-    logger.info("🚀 NL2SQL Agent API starting up...")
-
-
-@app.on_event("shutdown")
-async def shutdown_event() -> None:
-    """Shutdown event handler."""
-    logger.info("🛑 NL2SQL Agent API shutting down...")
-
-
 if __name__ == "__main__":
     import uvicorn
 
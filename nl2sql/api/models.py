@@ -1,8 +1,9 @@
 """Pydantic models for API requests and responses."""
 
-from typing import Any
+from datetime import datetime
+from typing import Any, Literal
 
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 
 
 class HealthResponse(BaseModel):
@@ -13,11 +14,41 @@ class HealthResponse(BaseModel):
     message: str
 
 
+class LivenessResponse(BaseModel):
+    """Liveness probe response model."""
+
+    status: str
+
+
+class PoolStats(BaseModel):
+    """Database connection pool statistics."""
+
+    size: int
+    checked_out: int
+    idle: int
+    overflow: int
+
+
+class ReadinessResponse(BaseModel):
+    """Readiness probe response model."""
+
+    status: str
+    components_initialized: bool
+    database_connected: bool
+    checkpointer_connected: bool
+    vector_store_available: bool
+    pool: PoolStats | None = None
+    checkpointer_pool: PoolStats | None = None
+    checked_at: datetime
+    message: str
+
+
 class ChatRequest(BaseModel):
     """Chat request model."""
 
     message: str
     session_id: str | None = None
+    timeout: float | None = Field(None, gt=0)
 
 
 class ChatResponse(BaseModel):
@@ -26,3 +57,49 @@ class ChatResponse(BaseModel):
     message: str
     session_id: str
     metadata: dict[str, Any] | None = None
+
+
+class BatchChatRequest(BaseModel):
+    """Batch chat request model."""
+
+    questions: list[str] = Field(..., min_length=1)
+    max_concurrency: int | None = Field(None, ge=1)
+    auto_approve: bool = False
+    timeout: float | None = Field(None, gt=0)
+
+
+class BatchChatItem(BaseModel):
+    """Result of a single question in a batch."""
+
+    index: int
+    question: str
+    status: Literal["success", "awaiting_confirmation", "rejected", "timeout", "error"]
+    session_id: str
+    message: str | None = None
+    metadata: dict[str, Any] | None = None
+    error: str | None = None
+
+
+class BatchChatResponse(BaseModel):
+    """Batch chat response model."""
+
+    results: list[BatchChatItem]
+    succeeded: int
+    awaiting_confirmation: int
+    rejected: int
+    timed_out: int
+    failed: int
+
+
+class ResultPage(BaseModel):
+    """A page of rows from a stored query result."""
+
+    handle: str
+    columns: list[str]
+    rows: list[dict[str, Any]]
+    offset: int
+    limit: int
+    row_count: int
+    next_offset: int | None = None
+    truncated: bool
+    expires_at: datetime
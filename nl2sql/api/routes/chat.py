@@ -1,135 +1,220 @@
 """Chat API routes."""
 
+import asyncio
+import json
+import time
 import uuid
+from collections.abc import AsyncIterator
+from contextlib import AsyncExitStack
 from datetime import datetime
+from typing import Any, Literal
 
 from fastapi import APIRouter, HTTPException
-from langchain_core.messages import HumanMessage
-from langgraph.checkpoint.postgres import PostgresSaver
+from fastapi.responses import StreamingResponse
+from langchain_core.messages import AIMessageChunk, HumanMessage
+from langgraph.types import Command
 from loguru import logger
-from psycopg import Connection
-from psycopg.rows import dict_row
+from starlette.background import BackgroundTask
 
-from nl2sql.agents.graph import create_graph
-from nl2sql.api.models import ChatRequest, ChatResponse
-from nl2sql.database.postgresql import PostgreSQLConnector
-from nl2sql.knowledge_base.vector_store import VectorStore
+from nl2sql.agents.deadline import deadline_config, timeout_message
+from nl2sql.api.components import components
+from nl2sql.api.concurrency import AdmissionController, SessionLocks
+from nl2sql.api.models import (
+    BatchChatItem,
+    BatchChatRequest,
+    BatchChatResponse,
+    ChatRequest,
+    ChatResponse,
+)
+from nl2sql.config import load_api_config
+from nl2sql.metrics import metrics_callback_handler
 
 router = APIRouter()
 
-# Global component instances (initialized on first request)
-_db_connector = None
-_vector_store = None
-_graph = None
-_memory = None
+api_config = load_api_config()
+batch_config = api_config["batch"]
+admission_config = api_config["admission"]
 
+# Runs on the same session are serialized; runs across sessions are bounded
+session_locks = SessionLocks(
+    max_pending=admission_config["max_pending_per_session"],
+    retry_after=admission_config["retry_after"],
+)
+admission = AdmissionController(
+    max_in_flight=admission_config["max_in_flight"],
+    max_queue=admission_config["max_queue"],
+    queue_timeout=admission_config["queue_timeout"],
+    retry_after=admission_config["retry_after"],
+    max_background=admission_config["max_background_in_flight"],
+)
 
-def _initialize_components() -> None:
-    """Initialize database, vector store, graph, and memory components."""
-    global _db_connector, _vector_store, _graph, _memory
+# Graph state fields surfaced as response metadata
+RESPONSE_METADATA_KEYS = [
+    "user_intent",
+    "sql_query",
+    "sql_safety_status",
+    "sql_syntax_status",
+    "sql_cost_status",
+    "sql_execution_status",
+    "deadline_exceeded",
+]
 
-    if _db_connector is None:
-        logger.info("🔄 Initializing database connector...")
-        _db_connector = PostgreSQLConnector(config_path="configs/database.yml")
+# Nodes whose LLM tokens are streamed to the client as the answer
+STREAMED_ANSWER_NODES = {"sql_result_analyzer", "chat_agent"}
 
-    if _vector_store is None:
-        logger.info("🔄 Initializing vector store...")
-        _vector_store = VectorStore(_db_connector)
 
-    if _memory is None:
-        logger.info("🔄 Initializing PostgreSQL memory...")
-        # Get connection string and create psycopg connection
-        conn_string = _db_connector.create_postgresql_uri()
-        postgres_conn = Connection.connect(
-            conn_string, autocommit=True, prepare_threshold=0, row_factory=dict_row
+def _resolve_session_id(request: ChatRequest) -> str:
+    """Return the request session ID or generate a new one."""
+    return (
+        request.session_id
+        or f"test_{datetime.now().strftime('%Y%m%d_%H%M%S')}_{str(uuid.uuid4())[:8]}"
+    )
+
+
+def _graph_config(session_id: str, timeout: float | None) -> dict:
+    """Build the graph config for a session with a request deadline."""
+    timeout = min(
+        timeout or api_config["request_timeout"], api_config["max_request_timeout"]
+    )
+    return {
+        "configurable": {"thread_id": session_id, **deadline_config(timeout)},
+        # Records node and LLM call latencies for /metrics
+        "callbacks": [metrics_callback_handler],
+    }
+
+
+def _hard_timeout(config: dict) -> float:
+    """Seconds to wait for the graph before abandoning the run."""
+    deadline = config["configurable"]["deadline"]
+    return max(deadline - time.time(), 0) + api_config["timeout_grace"]
+
+
+async def _timed_out_result(config: dict) -> dict:
+    """Build a partial result from the last checkpoint of an abandoned run."""
+    logger.warning("⏱️ Graph run abandoned after its deadline")
+    snapshot = await components.graph.aget_state(config)
+    return {
+        **snapshot.values,
+        "messages": [timeout_message("processing your request")],
+        "deadline_exceeded": True,
+    }
+
+
+async def _ainvoke_with_deadline(graph_input: dict | Command, config: dict) -> dict:
+    """Run the graph, answering from the last checkpoint if it overruns.
+
+    Nodes stop on their own once the deadline passes; this is the backstop
+    for a node that does not return in time.
+    """
+    try:
+        return await asyncio.wait_for(
+            components.graph.ainvoke(graph_input, config=config),
+            timeout=_hard_timeout(config),
         )
-        _memory = PostgresSaver(conn=postgres_conn)
-        # Setup memory tables
-        _memory.setup()
+    except TimeoutError:
+        return await _timed_out_result(config)
+
+
+async def _iter_until(stream: AsyncIterator, timeout: float) -> AsyncIterator:
+    """Iterate an async stream, raising TimeoutError after `timeout` seconds."""
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    try:
+        while True:
+            try:
+                yield await asyncio.wait_for(anext(stream), deadline - loop.time())
+            except StopAsyncIteration:
+                return
+    finally:
+        await stream.aclose()
+
+
+async def _prepare_graph_input(message: str, config: dict) -> dict | Command:
+    """Build the graph input, resuming an interrupted run when applicable."""
+    # Check if there's an existing interrupted state to resume
+    existing_state = await components.graph.aget_state(config)
+    if existing_state.next and message.lower() in ["yes", "no"]:
+        # This is a response to an interrupt, resume the graph
+        logger.debug("🔄 Resuming interrupted graph...")
+        return Command(resume=message)
+
+    # Create initial state and start new conversation
+    return {"messages": [HumanMessage(content=message)]}
+
 
-    if _graph is None:
-        logger.info("🔄 Initializing agent graph...")
-        workflow = create_graph(_db_connector, _vector_store)
-        _graph = workflow.compile(checkpointer=_memory)
+def _extract_response_message(result: dict) -> str:
+    """Extract the message to return to the user from a graph result."""
+    # Check if the graph was interrupted (for human feedback)
+    if "__interrupt__" in result:
+        interrupt_data = result["__interrupt__"][0].value
+        interrupt_message = interrupt_data.get("messages")
+        if hasattr(interrupt_message, "content"):
+            return interrupt_message.content
+        if isinstance(interrupt_message, str):
+            return interrupt_message
+        return "Waiting for your confirmation. Please respond with 'yes' or 'no'."
+
+    # Get the last message that isn't the user's input
+    for msg in reversed(result.get("messages") or []):
+        if hasattr(msg, "type") and msg.type != "human":
+            return msg.content
+
+    return "I processed your message but couldn't generate a response."
+
+
+def _response_metadata(result: dict) -> dict[str, Any]:
+    """Extract the response metadata from a graph result."""
+    metadata = {key: result.get(key) for key in RESPONSE_METADATA_KEYS}
+
+    # Rows are fetched separately through /results/{handle}
+    execution_result = result.get("sql_execution_result") or {}
+    metadata["result_handle"] = execution_result.get("handle")
+    metadata["row_count"] = execution_result.get("row_count")
+    return metadata
+
+
+def _format_sse(event: str, data: dict[str, Any]) -> str:
+    """Format a server-sent event."""
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
 
 
 @router.post("/", response_model=ChatResponse)
 async def chat(request: ChatRequest) -> ChatResponse:
-    """Chat endpoint that processes user messages through the NL2SQL agent."""
-    try:
-        # Initialize components if needed
-        _initialize_components()
+    """Chat endpoint that processes user messages through the NL2SQL agent.
 
-        # Generate session ID if not provided
-        session_id = (
-            request.session_id
-            or f"test_{datetime.now().strftime('%Y%m%d_%H%M%S')}_{str(uuid.uuid4())[:8]}"  # noqa: E501
-        )
+    Requests on the same session run one at a time, in arrival order. When too
+    many requests are queued the request is rejected with 429 and Retry-After.
+    """
+    # Generate session ID if not provided
+    session_id = _resolve_session_id(request)
+
+    async with session_locks.hold(session_id), admission.admit():
+        return await _chat(request, session_id)
+
+
+async def _chat(request: ChatRequest, session_id: str) -> ChatResponse:
+    """Process a chat message once the request has been admitted."""
+    try:
+        # No-op once the application lifespan has initialized the components
+        await components.initialize()
 
         logger.info(f"🔄 Processing chat request for session: {session_id}")
         logger.debug(f"User message: {request.message}")
 
-        # Create user message
-        user_message = HumanMessage(content=request.message)
-
         # Configure graph execution
-        config = {"configurable": {"thread_id": session_id}}
-
-        # Check if there's an existing interrupted state to resume
-        existing_state = _graph.get_state(config)
-        if existing_state.next and request.message.lower() in ["yes", "no"]:
-            # This is a response to an interrupt, resume the graph
-            logger.debug("🔄 Resuming interrupted graph...")
-            from langgraph.types import Command
-
-            result = _graph.invoke(Command(resume=request.message), config=config)
-        else:
-            # Create initial state and start new conversation
-            initial_state = {"messages": [user_message]}
-
-            # Execute the agent graph
-            logger.debug("🔄 Executing agent graph...")
-            result = _graph.invoke(initial_state, config=config)
-
-        # Check if the graph was interrupted (for human feedback)
-        if "__interrupt__" in result:
-            interrupt_data = result["__interrupt__"][0].value
-            interrupt_message = interrupt_data.get("messages")
-            if hasattr(interrupt_message, "content"):
-                last_message = interrupt_message.content
-            elif isinstance(interrupt_message, str):
-                last_message = interrupt_message
-            else:
-                last_message = (
-                    "Waiting for your confirmation. Please respond with 'yes' or 'no'."
-                )
-        else:
-            # Extract the last AI message from the result
-            last_message = None
-            if result.get("messages"):
-                # Get the last message that isn't the user's input
-                for msg in reversed(result["messages"]):
-                    if hasattr(msg, "type") and msg.type != "human":
-                        last_message = msg.content
-                        break
-
-            if last_message is None:
-                last_message = (
-                    "I processed your message but couldn't generate a response."
-                )
+        config = _graph_config(session_id, request.timeout)
+
+        # Execute the agent graph
+        logger.debug("🔄 Executing agent graph...")
+        graph_input = await _prepare_graph_input(request.message, config)
+        result = await _ainvoke_with_deadline(graph_input, config)
 
         logger.info(f"✅ Chat request completed for session: {session_id}")
 
         return ChatResponse(
-            message=last_message,
+            message=_extract_response_message(result),
             session_id=session_id,
-            metadata={
-                "user_intent": result.get("user_intent"),
-                "sql_query": result.get("sql_query"),
-                "sql_safety_status": result.get("sql_safety_status"),
-                "sql_syntax_status": result.get("sql_syntax_status"),
-                "sql_execution_status": result.get("sql_execution_status"),
-            },
+            metadata=_response_metadata(result),
         )
 
     except Exception as e:
@@ -137,3 +222,249 @@ async def chat(request: ChatRequest) -> ChatResponse:
         raise HTTPException(
             status_code=500, detail=f"Chat processing error: {e!s}"
         ) from e
+
+
+@router.post("/stream")
+async def chat_stream(request: ChatRequest) -> StreamingResponse:
+    """Stream graph progress and answer tokens as server-sent events.
+
+    Events:
+        - `start`: sent immediately with the session ID
+        - `node`: a graph node finished, with the state fields it updated
+        - `token`: an answer token from the result analyzer or the chat agent
+        - `done`: the final message and metadata, as returned by `/chat/`
+        - `error`: the graph failed; no further events follow
+
+    Past the request deadline the stream ends with a `done` event carrying a
+    partial answer. Admission happens before the stream starts, so a saturated
+    server answers 429 like `/chat/`.
+    """
+    await components.initialize()
+    session_id = _resolve_session_id(request)
+
+    # Held for the whole stream, released when it ends or the client leaves
+    async with AsyncExitStack() as stack:
+        await stack.enter_async_context(session_locks.hold(session_id))
+        await stack.enter_async_context(admission.admit())
+        admitted = stack.pop_all()
+
+    # The deadline starts once the request is admitted
+    config = _graph_config(session_id, request.timeout)
+
+    async def event_stream() -> AsyncIterator[str]:
+        logger.info(f"🔄 Streaming chat request for session: {session_id}")
+        yield _format_sse("start", {"session_id": session_id})
+
+        try:
+            graph_input = await _prepare_graph_input(request.message, config)
+            interrupt = None
+            stream = components.graph.astream(
+                graph_input, config=config, stream_mode=["updates", "messages"]
+            )
+
+            async for mode, chunk in _iter_until(stream, _hard_timeout(config)):
+                if mode == "messages":
+                    message_chunk, chunk_metadata = chunk
+                    node = chunk_metadata.get("langgraph_node")
+                    # Skip whole messages written to state, only forward tokens
+                    if (
+                        node in STREAMED_ANSWER_NODES
+                        and isinstance(message_chunk, AIMessageChunk)
+                        and message_chunk.content
+                    ):
+                        yield _format_sse(
+                            "token", {"node": node, "content": message_chunk.content}
+                        )
+                    continue
+
+                for node, update in chunk.items():
+                    if node == "__interrupt__":
+                        interrupt = update
+                        continue
+                    update = update or {}
+                    yield _format_sse(
+                        "node",
+                        {
+                            "node": node,
+                            "status": "completed",
+                            "update": {
+                                key: update[key]
+                                for key in RESPONSE_METADATA_KEYS
+                                if key in update
+                            },
+                        },
+                    )
+
+            # Rebuild the same response the non-streaming endpoint returns
+            snapshot = await components.graph.aget_state(config)
+            result = dict(snapshot.values)
+            if interrupt:
+                result["__interrupt__"] = interrupt
+
+            yield _format_sse(
+                "done",
+                {
+                    "message": _extract_response_message(result),
+                    "session_id": session_id,
+                    "metadata": _response_metadata(result),
+                },
+            )
+            logger.info(f"✅ Chat stream completed for session: {session_id}")
+
+        except TimeoutError:
+            result = await _timed_out_result(config)
+            yield _format_sse(
+                "done",
+                {
+                    "message": _extract_response_message(result),
+                    "session_id": session_id,
+                    "metadata": _response_metadata(result),
+                },
+            )
+
+        except Exception as e:
+            logger.error(f"❌ Chat stream failed: {e}")
+            yield _format_sse("error", {"detail": f"Chat processing error: {e!s}"})
+
+        finally:
+            await admitted.aclose()
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        # Safety net if the stream never starts; closing twice is a no-op
+        background=BackgroundTask(admitted.aclose),
+    )
+
+
+def _batch_status(
+    result: dict,
+) -> Literal["success", "awaiting_confirmation", "rejected", "timeout", "error"]:
+    """Outcome of a batch question, from the final graph state."""
+    if "__interrupt__" in result:
+        return "awaiting_confirmation"
+    if result.get("deadline_exceeded"):
+        return "timeout"
+    if (
+        result.get("sql_safety_status") == "unsafe"
+        or result.get("sql_cost_status") == "rejected"
+        or result.get("user_feedback_status") == "rejected"
+    ):
+        return "rejected"
+    # SQL generation, syntax fixing or execution gave up
+    if (
+        result.get("user_intent") == "sql"
+        and result.get("sql_execution_status") != "success"
+    ):
+        return "error"
+    return "success"
+
+
+async def _run_batch_item(
+    index: int,
+    question: str,
+    session_id: str,
+    auto_approve: bool,
+    timeout: float | None,
+    semaphore: asyncio.Semaphore,
+) -> BatchChatItem:
+    """Run a single batch question through the graph in its own session."""
+    # Batch questions wait for a background slot instead of being shed
+    async with semaphore, admission.admit(shed=False):
+        # The deadline starts once the question leaves the queue
+        config = _graph_config(session_id, timeout)
+        try:
+            result = await _ainvoke_with_deadline(
+                {"messages": [HumanMessage(content=question)]}, config
+            )
+
+            # Approve the generated SQL on the caller's behalf
+            if "__interrupt__" in result and auto_approve:
+                result = await _ainvoke_with_deadline(Command(resume="yes"), config)
+
+            status = _batch_status(result)
+            execution_result = result.get("sql_execution_result") or {}
+            return BatchChatItem(
+                index=index,
+                question=question,
+                status=status,
+                session_id=session_id,
+                message=_extract_response_message(result),
+                metadata=_response_metadata(result),
+                error=execution_result.get("error") if status == "error" else None,
+            )
+
+        except Exception as e:
+            logger.error(f"❌ Batch question {index} failed: {e}")
+            return BatchChatItem(
+                index=index,
+                question=question,
+                status="error",
+                session_id=session_id,
+                error=f"Chat processing error: {e!s}",
+            )
+
+
+@router.post("/batch", response_model=BatchChatResponse)
+async def chat_batch(request: BatchChatRequest) -> BatchChatResponse:
+    """Run many questions through the NL2SQL agent concurrently.
+
+    Each question runs in its own session. Generated SQL stops at the human
+    feedback step unless `auto_approve` is set, in which case it is executed
+    and analyzed; otherwise the item is returned as `awaiting_confirmation`
+    and can be confirmed later through `/chat/` with its session ID. Results
+    are returned in input order. Questions share the global in-flight limit
+    with interactive requests.
+    """
+    if len(request.questions) > batch_config["max_questions"]:
+        raise HTTPException(
+            status_code=413,
+            detail=(
+                f"Batch has {len(request.questions)} questions, "
+                f"the maximum is {batch_config['max_questions']}"
+            ),
+        )
+
+    await components.initialize()
+
+    concurrency = min(
+        request.max_concurrency or batch_config["default_concurrency"],
+        batch_config["max_concurrency"],
+    )
+    semaphore = asyncio.Semaphore(concurrency)
+    batch_id = (
+        f"batch_{datetime.now().strftime('%Y%m%d_%H%M%S')}_{str(uuid.uuid4())[:8]}"
+    )
+
+    logger.info(
+        f"🔄 Processing batch {batch_id}: {len(request.questions)} questions, "
+        f"concurrency {concurrency}, auto-approve {request.auto_approve}"
+    )
+
+    # gather keeps results in input order
+    results = await asyncio.gather(
+        *(
+            _run_batch_item(
+                index,
+                question,
+                f"{batch_id}_{index}",
+                request.auto_approve,
+                request.timeout,
+                semaphore,
+            )
+            for index, question in enumerate(request.questions)
+        )
+    )
+
+    statuses = [item.status for item in results]
+    logger.info(f"✅ Batch {batch_id} completed")
+
+    return BatchChatResponse(
+        results=results,
+        succeeded=statuses.count("success"),
+        awaiting_confirmation=statuses.count("awaiting_confirmation"),
+        rejected=statuses.count("rejected"),
+        timed_out=statuses.count("timeout"),
+        failed=statuses.count("error"),
+    )
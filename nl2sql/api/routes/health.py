@@ -1,46 +1,193 @@
 """Health check routes for the NL2SQL API."""
 
-from fastapi import APIRouter
+import asyncio
+import time
+from datetime import datetime
+from typing import Any
+
+from fastapi import APIRouter, Response, status
 from loguru import logger
 from sqlalchemy import text
+from sqlalchemy.pool import QueuePool
 
-from nl2sql.api.models import HealthResponse
-from nl2sql.database.postgresql import PostgreSQLConnector
+from nl2sql.api.components import components
+from nl2sql.api.models import (
+    HealthResponse,
+    LivenessResponse,
+    PoolStats,
+    ReadinessResponse,
+)
+from nl2sql.config import load_api_config
 
 router = APIRouter()
 
+health_config = load_api_config()["health"]
+
+
+class ReadinessProbe:
+    """Readiness checks against the shared components.
+
+    Checks reuse the shared engine and checkpointer pool, and their
+    result is cached for `cache_ttl` seconds so frequent probes do not touch
+    the database. Concurrent probes on a stale cache share a single check.
+    """
+
+    def __init__(self, cache_ttl: float) -> None:
+        """Initialize the probe with an empty cache."""
+        self.cache_ttl = cache_ttl
+        self._result: dict[str, Any] | None = None
+        self._checked_at = 0.0
+        self._lock = asyncio.Lock()
+
+    def _is_fresh(self) -> bool:
+        """Whether the cached result is still within the TTL."""
+        return (
+            self._result is not None
+            and time.monotonic() - self._checked_at < self.cache_ttl
+        )
+
+    async def check(self) -> dict[str, Any]:
+        """Return the cached readiness result, refreshing it when stale."""
+        if self._is_fresh():
+            return self._result
+
+        async with self._lock:
+            if not self._is_fresh():
+                self._result = await asyncio.to_thread(self._run_checks)
+                self._checked_at = time.monotonic()
+
+        return self._result
+
+    @staticmethod
+    def _run_checks() -> dict[str, Any]:
+        """Check the database, vector store and checkpointer."""
+        result = {
+            "components_initialized": components.initialized,
+            "database_connected": False,
+            "checkpointer_connected": False,
+            "vector_store_available": False,
+            "checked_at": datetime.now(),
+            "message": "Service is ready",
+        }
+
+        if not components.initialized:
+            result["message"] = "Components are not initialized"
+            return result
+
+        errors = []
+        try:
+            # One pooled connection serves both the database and vector store checks
+            with components.db_connector.engine.connect() as conn:
+                result["database_connected"] = (
+                    conn.execute(text("SELECT 1")).scalar() == 1
+                )
+                collection = conn.execute(
+                    text("SELECT 1 FROM langchain_pg_collection WHERE name = :name"),
+                    {"name": components.vector_store.vectorstore.collection_name},
+                ).scalar()
+                result["vector_store_available"] = collection is not None
+        except Exception as e:
+            errors.append(f"Database error: {e!s}")
+
+        result["checkpointer_connected"] = components.checkpointer_connected
+
+        if not result["vector_store_available"] and not errors:
+            errors.append("Vector store collection not found")
+        if not result["checkpointer_connected"]:
+            errors.append("Checkpointer pool has no open connections")
+        if errors:
+            result["message"] = "; ".join(errors)
+
+        return result
+
+
+readiness_probe = ReadinessProbe(cache_ttl=health_config["cache_ttl"])
+
+
+def _pool_stats() -> PoolStats | None:
+    """Read the shared engine's connection pool counters (no I/O)."""
+    if not components.initialized:
+        return None
+
+    pool = components.db_connector.engine.pool
+    if not isinstance(pool, QueuePool):
+        return None
+
+    return PoolStats(
+        size=pool.size(),
+        checked_out=pool.checkedout(),
+        idle=pool.checkedin(),
+        overflow=pool.overflow(),
+    )
+
+
+def _checkpointer_pool_stats() -> PoolStats | None:
+    """Read the checkpointer connection pool counters (no I/O)."""
+    pool = components.memory_pool
+    if pool is None:
+        return None
+
+    stats = pool.get_stats()
+    return PoolStats(
+        size=stats["pool_size"],
+        checked_out=stats["pool_size"] - stats["pool_available"],
+        idle=stats["pool_available"],
+        overflow=max(stats["pool_size"] - pool.min_size, 0),
+    )
+
+
+def _is_ready(result: dict[str, Any]) -> bool:
+    """Whether every readiness check passed."""
+    return all(
+        result[key]
+        for key in (
+            "components_initialized",
+            "database_connected",
+            "checkpointer_connected",
+            "vector_store_available",
+        )
+    )
+
+
+@router.get("/health/live", response_model=LivenessResponse)
+async def liveness() -> LivenessResponse:
+    """Liveness probe: the process is up and serving requests."""
+    return LivenessResponse(status="alive")
+
+
+@router.get("/health/ready", response_model=ReadinessResponse)
+async def readiness(response: Response) -> ReadinessResponse:
+    """Readiness probe: components are initialized and their backends reachable."""
+    result = await readiness_probe.check()
+    ready = _is_ready(result)
+
+    if not ready:
+        logger.error(f"❌ Readiness check failed: {result['message']}")
+        response.status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+
+    return ReadinessResponse(
+        status="ready" if ready else "unready",
+        pool=_pool_stats(),
+        checkpointer_pool=_checkpointer_pool_stats(),
+        **result,
+    )
+
 
 @router.get("/health", response_model=HealthResponse)
 async def health_check() -> HealthResponse:
     """Health check endpoint that verifies database connectivity."""
-    try:
-        # Test database connection
-        db_connector = PostgreSQLConnector(config_path="configs/database.yml")
-
-        # Test basic connectivity with a simple query
-        with db_connector.engine.connect() as conn:
-            result = conn.execute(text("SELECT 1 as test"))
-            test_value = result.fetchone()[0]
-
-        if test_value == 1:
-            logger.info("✅ Health check passed - database connected")
-            return HealthResponse(
-                status="healthy",
-                database_connected=True,
-                message="Service is healthy and database is connected",
-            )
-        else:
-            logger.error("❌ Health check failed - unexpected database response")
-            return HealthResponse(
-                status="unhealthy",
-                database_connected=False,
-                message="Database connection test failed",
-            )
-
-    except Exception as e:
-        logger.error(f"❌ Health check failed: {e}")
+    result = await readiness_probe.check()
+
+    if _is_ready(result):
         return HealthResponse(
-            status="unhealthy",
-            database_connected=False,
-            message=f"Database connection error: {e!s}",
+            status="healthy",
+            database_connected=True,
+            message="Service is healthy and database is connected",
         )
+
+    logger.error(f"❌ Health check failed: {result['message']}")
+    return HealthResponse(
+        status="unhealthy",
+        database_connected=result["database_connected"],
+        message=result["message"],
+    )
@@ -0,0 +1,134 @@
+"""Prometheus metrics route for the NL2SQL API."""
+
+from collections.abc import Iterator
+
+from fastapi import APIRouter, Response
+from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, generate_latest
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily, Metric
+from prometheus_client.registry import Collector
+
+from nl2sql.agents import nodes
+from nl2sql.agents.result_store import result_store
+from nl2sql.agents.sql_cache import sql_cache
+from nl2sql.api.components import components
+from nl2sql.api.routes import chat
+from nl2sql.llm import response_cache
+
+router = APIRouter()
+
+
+def _lookups(name: str, documentation: str, stats: dict) -> Iterator[Metric]:
+    """Hit/miss counter and hit ratio gauge of a cache's stats."""
+    lookups = CounterMetricFamily(name, documentation, labels=["result"])
+    lookups.add_metric(["hit"], stats["hits"])
+    lookups.add_metric(["miss"], stats["misses"])
+    yield lookups
+    yield GaugeMetricFamily(
+        name.removesuffix("_lookups") + "_hit_ratio",
+        f"Hit ratio of {documentation[0].lower()}{documentation[1:]}",
+        value=stats["hit_rate"],
+    )
+
+
+class AgentStatsCollector(Collector):
+    """Exports the counters the agent components keep, read at scrape time."""
+
+    def collect(self) -> Iterator[Metric]:
+        """Collect the current component stats."""
+        sql_cache_stats = sql_cache.stats()
+        yield from _lookups(
+            "nl2sql_sql_cache_lookups", "Lookups of the SQL cache", sql_cache_stats
+        )
+        yield CounterMetricFamily(
+            "nl2sql_sql_cache_evictions",
+            "Entries evicted from the SQL cache",
+            value=sql_cache_stats["evictions"],
+        )
+        yield CounterMetricFamily(
+            "nl2sql_sql_cache_invalidations",
+            "SQL cache clears after schema changes",
+            value=sql_cache_stats["invalidations"],
+        )
+        yield GaugeMetricFamily(
+            "nl2sql_sql_cache_entries",
+            "Entries in the SQL cache",
+            value=sql_cache_stats["size"],
+        )
+
+        if response_cache is not None:
+            yield from _lookups(
+                "nl2sql_llm_response_cache_lookups",
+                "Lookups of the LLM response cache",
+                response_cache.stats(),
+            )
+
+        if nodes.local_intent_classifier is not None:
+            intent_stats = nodes.local_intent_classifier.stats()
+            decisions = CounterMetricFamily(
+                "nl2sql_intent_decisions",
+                "Intent classifications by where they were decided",
+                labels=["decided_by"],
+            )
+            decisions.add_metric(["local"], intent_stats["local"])
+            decisions.add_metric(["llm"], intent_stats["llm"])
+            yield decisions
+
+        validator = (
+            components.db_connector.syntax_validator
+            if components.db_connector is not None
+            else None
+        )
+        if validator is not None:
+            validation_stats = validator.stats()
+            yield from _lookups(
+                "nl2sql_sql_validation_cache_lookups",
+                "Lookups of the SQL validation cache",
+                validation_stats,
+            )
+            yield GaugeMetricFamily(
+                "nl2sql_sql_validation_sessions",
+                "Open SQL validation sessions",
+                value=validation_stats["pool_size"],
+            )
+            yield GaugeMetricFamily(
+                "nl2sql_sql_validation_sessions_waiting",
+                "Validations waiting for a free session",
+                value=validation_stats["requests_waiting"],
+            )
+
+        result_store_stats = result_store.stats()
+        yield GaugeMetricFamily(
+            "nl2sql_result_store_entries",
+            "Query results held in the result store",
+            value=result_store_stats["entries"],
+        )
+        yield GaugeMetricFamily(
+            "nl2sql_result_store_rows",
+            "Rows held in the result store",
+            value=result_store_stats["rows"],
+        )
+
+        yield GaugeMetricFamily(
+            "nl2sql_requests_in_flight",
+            "Graph runs currently admitted",
+            value=chat.admission.in_flight,
+        )
+        yield GaugeMetricFamily(
+            "nl2sql_requests_queued",
+            "Requests waiting for admission",
+            value=chat.admission.queued,
+        )
+        yield GaugeMetricFamily(
+            "nl2sql_batch_requests_queued",
+            "Batch questions waiting for admission",
+            value=chat.admission.background_queued,
+        )
+
+
+REGISTRY.register(AgentStatsCollector())
+
+
+@router.get("/metrics", include_in_schema=False)
+async def metrics() -> Response:
+    """Expose the metrics in the Prometheus text format."""
+    return Response(content=generate_latest(REGISTRY), media_type=CONTENT_TYPE_LATEST)
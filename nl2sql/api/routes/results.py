@@ -0,0 +1,67 @@
+"""Query result routes."""
+
+from datetime import datetime
+from typing import Annotated
+
+from fastapi import APIRouter, HTTPException, Query
+
+from nl2sql.agents.result_store import result_store
+from nl2sql.api.models import ResultPage
+from nl2sql.config import load_api_config
+
+router = APIRouter()
+
+results_config = load_api_config()["results"]
+
+
+def _parse_columns(columns: list[str] | None) -> list[str] | None:
+    """Accept both repeated and comma-separated `columns` parameters."""
+    if not columns:
+        return None
+    names = [name.strip() for value in columns for name in value.split(",")]
+    return [name for name in names if name]
+
+
+@router.get("/{handle}", response_model=ResultPage)
+async def get_result_page(
+    handle: str,
+    offset: Annotated[int, Query(ge=0)] = 0,
+    limit: Annotated[int | None, Query(ge=1)] = None,
+    columns: Annotated[list[str] | None, Query()] = None,
+) -> ResultPage:
+    """Page through the rows of an executed query.
+
+    The handle is returned as `metadata.result_handle` by the chat endpoints.
+    Pass the returned `next_offset` as `offset` to fetch the next page; it is
+    null on the last page. `columns` restricts the returned columns.
+    """
+    stored = result_store.get(handle)
+    if stored is None:
+        raise HTTPException(
+            status_code=404, detail=f"Result {handle} not found or expired"
+        )
+
+    projection = _parse_columns(columns)
+    if projection is not None:
+        unknown = [name for name in projection if name not in stored.columns]
+        if unknown:
+            raise HTTPException(
+                status_code=400, detail=f"Unknown columns: {', '.join(unknown)}"
+            )
+
+    limit = min(
+        limit or results_config["default_page_size"], results_config["max_page_size"]
+    )
+    next_offset = offset + limit
+
+    return ResultPage(
+        handle=handle,
+        columns=projection or stored.columns,
+        rows=stored.page(offset, limit, projection),
+        offset=offset,
+        limit=limit,
+        row_count=stored.row_count,
+        next_offset=next_offset if next_offset < len(stored.rows) else None,
+        truncated=stored.truncated,
+        expires_at=datetime.fromtimestamp(stored.expires_at),
+    )
@@ -1,9 +1,11 @@
 """Configuration utilities."""
 
+import threading
 from pathlib import Path
 
 import yaml
 from langchain_core.prompts import ChatPromptTemplate
+from loguru import logger
 
 UNSAFE_SQL_KEYWORDS = [
     "drop",
@@ -36,15 +38,122 @@ def load_database_config(config_path: str | Path = "configs/database.yml") -> di
     return load_config(config_path)["database"]
 
 
+def load_validation_config(
+    config_path: str | Path = "configs/database.yml",
+) -> dict:
+    """Load the SQL validation session settings from YAML file."""
+    return load_config(config_path)["validation"]
+
+
+def load_api_config(config_path: str | Path = "configs/api.yml") -> dict:
+    """Load API configuration from YAML file."""
+    return load_config(config_path)["api"]
+
+
+def load_agent_config(config_path: str | Path = "configs/agent.yml") -> dict:
+    """Load agent configuration from YAML file."""
+    return load_config(config_path)["agent"]
+
+
+def load_llm_config(config_path: str | Path = "configs/llm.yml") -> dict:
+    """Load LLM configuration from YAML file."""
+    return load_config(config_path)["llm"]
+
+
 def load_schema_config(config_path: str | Path = "configs/schema.yml") -> dict:
     """Load database schema configuration from YAML file."""
     return load_config(config_path)
 
 
+class PromptRegistry:
+    """Chat prompt templates of a prompt YAML file.
+
+    The file is parsed and all templates are built once, so getting a template
+    on the request path is a dict lookup. Edits to the file are picked up by an
+    explicit `reload()` or `reload_if_changed()`; templates already handed out
+    are not affected, so callers should get templates per use rather than hold
+    on to them.
+    """
+
+    def __init__(self, file_path: str | Path = "configs/prompts.yml") -> None:
+        """Load the prompt templates of a YAML file."""
+        self.file_path = Path(file_path)
+        self._templates: dict[str, ChatPromptTemplate] = {}
+        self._mtime_ns: int | None = None
+        self._lock = threading.Lock()
+        self.reload()
+
+    def get(self, name: str) -> ChatPromptTemplate:
+        """Get a prompt template by name.
+
+        Raises:
+            ValueError: If the file has no such prompt
+        """
+        template = self._templates.get(name)
+        if template is None:
+            raise ValueError(f"Prompt template {name} not found in {self.file_path}")
+        return template
+
+    def names(self) -> list[str]:
+        """Names of the loaded prompt templates."""
+        return list(self._templates)
+
+    def reload(self) -> None:
+        """Parse the file and rebuild all templates.
+
+        The templates are swapped in at once; on an error the previous ones
+        are kept and the error is raised.
+        """
+        with self._lock:
+            mtime_ns = self.file_path.stat().st_mtime_ns
+            prompts = load_config(self.file_path)
+            self._templates = {
+                name: ChatPromptTemplate.from_messages(
+                    [
+                        ("system", prompt["system_prompt"]),
+                        ("human", prompt["user_prompt"]),
+                    ]
+                )
+                for name, prompt in prompts.items()
+            }
+            self._mtime_ns = mtime_ns
+        logger.debug(f"✅ Loaded {len(self._templates)} prompts from {self.file_path}")
+
+    def reload_if_changed(self) -> bool:
+        """Reload the templates if the file was modified since the last load.
+
+        Returns:
+            Whether the templates were reloaded
+        """
+        if self.file_path.stat().st_mtime_ns == self._mtime_ns:
+            return False
+        logger.info(f"🔄 Prompt file changed, reloading {self.file_path}")
+        self.reload()
+        return True
+
+
+_prompt_registries: dict[Path, PromptRegistry] = {}
+_prompt_registries_lock = threading.Lock()
+
+
+def get_prompt_registry(
+    file_path: str | Path = "configs/prompts.yml",
+) -> PromptRegistry:
+    """Get the process-wide prompt registry of a prompt YAML file."""
+    path = Path(file_path)
+    with _prompt_registries_lock:
+        if path not in _prompt_registries:
+            _prompt_registries[path] = PromptRegistry(file_path)
+        return _prompt_registries[path]
+
+
 def load_chat_prompt_template(
     file_path: str | Path = "configs/prompts.yml", target_prompt: str | None = None
 ) -> ChatPromptTemplate:
-    """Set up a prompt template from a YAML file.
+    """Get a prompt template from a YAML file.
+
+    Templates come from the file's `PromptRegistry`, so the file is only parsed
+    on the first call (and on reloads).
 
     Args:
         file_path: Path to the prompt YAML file
@@ -53,14 +162,4 @@ def load_chat_prompt_template(
     Returns:
         LangChain ChatPromptTemplate
     """
-    prompts = load_config(file_path)
-    if prompts.get(target_prompt) is None:
-        raise ValueError(f"Prompt template {target_prompt} not found in {file_path}")
-
-    prompt_template = ChatPromptTemplate.from_messages(
-        [
-            ("system", prompts[target_prompt]["system_prompt"]),
-            ("human", prompts[target_prompt]["user_prompt"]),
-        ]
-    )
-    return prompt_template
+    return get_prompt_registry(file_path).get(target_prompt)
@@ -1,11 +1,18 @@
 """PostgreSQL connector."""
 
+import threading
 from pathlib import Path
+from typing import TYPE_CHECKING, Any
 from urllib.parse import unquote_plus
 
 from sqlalchemy import Engine, create_engine
 
+from nl2sql.config import load_validation_config
 from nl2sql.database.base import DatabaseParams, SQLBaseConnector
+from nl2sql.database.validation import SQLSyntaxValidator
+
+if TYPE_CHECKING:
+    from psycopg_pool import AsyncConnectionPool, ConnectionPool
 
 
 class PostgreSQLConnector(SQLBaseConnector):
@@ -22,6 +29,9 @@ class PostgreSQLConnector(SQLBaseConnector):
     ) -> None:
         """Initialize the PostgreSQL connector."""
         super().__init__(host, port, database, username, password, config_path)
+        # Created on first use, see `get_syntax_validator`
+        self.syntax_validator: SQLSyntaxValidator | None = None
+        self._syntax_validator_lock = threading.Lock()
 
     def create_uri(
         self,
@@ -86,6 +96,106 @@ class PostgreSQLConnector(SQLBaseConnector):
             **kwargs,
         )
 
+    def get_psycopg_pool(
+        self,
+        min_size: int = 1,
+        max_size: int | None = None,
+        open: bool = True,
+        **kwargs: Any,  # noqa: ANN401
+    ) -> "ConnectionPool":
+        """Get a psycopg connection pool.
+
+        Connections use autocommit, no prepared statements and dict rows, as
+        required by the LangGraph PostgreSQL checkpointer. Connections are
+        checked before being handed out and the pool reconnects on its own
+        when the server goes away.
+
+        Args:
+            min_size: Number of connections kept open
+            max_size: Maximum number of connections (default: min_size)
+            open: Whether to open the pool right away
+            **kwargs: Additional psycopg_pool.ConnectionPool parameters
+                (e.g. max_idle, max_lifetime, reconnect_timeout, timeout)
+
+        Returns:
+            psycopg_pool.ConnectionPool: Connection pool
+        """
+        from psycopg.rows import dict_row
+        from psycopg_pool import ConnectionPool
+
+        return ConnectionPool(
+            self.create_postgresql_uri(),
+            min_size=min_size,
+            max_size=max_size,
+            open=open,
+            check=ConnectionPool.check_connection,
+            kwargs={
+                "autocommit": True,
+                "prepare_threshold": 0,
+                "row_factory": dict_row,
+            },
+            **kwargs,
+        )
+
+    def get_async_psycopg_pool(
+        self,
+        min_size: int = 1,
+        max_size: int | None = None,
+        **kwargs: Any,  # noqa: ANN401
+    ) -> "AsyncConnectionPool":
+        """Get an async psycopg connection pool.
+
+        Same connection settings as `get_psycopg_pool`. The pool is created
+        closed: call `await pool.open()` from a running event loop.
+
+        Args:
+            min_size: Number of connections kept open
+            max_size: Maximum number of connections (default: min_size)
+            **kwargs: Additional psycopg_pool.AsyncConnectionPool parameters
+                (e.g. max_idle, max_lifetime, reconnect_timeout, timeout)
+
+        Returns:
+            psycopg_pool.AsyncConnectionPool: Async connection pool
+        """
+        from psycopg.rows import dict_row
+        from psycopg_pool import AsyncConnectionPool
+
+        return AsyncConnectionPool(
+            self.create_postgresql_uri(),
+            min_size=min_size,
+            max_size=max_size,
+            open=False,
+            check=AsyncConnectionPool.check_connection,
+            kwargs={
+                "autocommit": True,
+                "prepare_threshold": 0,
+                "row_factory": dict_row,
+            },
+            **kwargs,
+        )
+
     def create_engine(self, params: DatabaseParams) -> Engine:
         """Create a SQLAlchemy engine."""
         return create_engine(self.create_uri(params))
+
+    def get_syntax_validator(self) -> SQLSyntaxValidator:
+        """Get the pooled syntax validator of the database.
+
+        Created on first call with the `validation` settings of
+        `configs/database.yml`; later calls return the same validator.
+
+        Returns:
+            SQLSyntaxValidator: Validator with its own session pool
+        """
+        with self._syntax_validator_lock:
+            if self.syntax_validator is None:
+                self.syntax_validator = SQLSyntaxValidator(
+                    self.create_postgresql_uri(), **load_validation_config()
+                )
+            return self.syntax_validator
+
+    def dispose(self) -> None:
+        """Close the engine's connections and the validation sessions."""
+        if self.syntax_validator is not None:
+            self.syntax_validator.close()
+        self.engine.dispose()
@@ -0,0 +1,251 @@
+"""Pooled SQL syntax validation.
+
+Queries are validated with PostgreSQL's `PREPARE`, which parses and analyzes
+them (tables, columns, types) without running them. Validation uses its own
+small pool of sessions, separate from the SQLAlchemy engine, so that a burst
+of validations can't starve query execution and vice versa. The sessions are
+read-only, autocommit and have short statement and lock timeouts. Each
+validation prepares under a unique statement name and deallocates it, so a
+failed validation never leaves a name behind for the next one.
+
+Results are cached by query text for a while: the SQL fixer loop and cached
+SQL generations often validate the same query again.
+
+The same sessions estimate query costs with `EXPLAIN` (plans only, queries
+are never run).
+"""
+
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+import psycopg
+from loguru import logger
+from psycopg_pool import ConnectionPool, PoolTimeout
+
+# SQLSTATE classes of errors that depend on the query alone: syntax errors and
+# access rule violations (unknown tables, columns, functions) and data
+# exceptions. Other errors (timeouts, connection failures) aren't cached.
+CACHEABLE_SQLSTATE_CLASSES = ("42", "22")
+
+
+class SQLSyntaxValidator:
+    """Validate query syntax on a pool of read-only sessions."""
+
+    def __init__(
+        self,
+        conninfo: str,
+        min_size: int = 2,
+        max_size: int = 8,
+        timeout: float = 5.0,
+        max_idle: float = 300.0,
+        statement_timeout: float = 2.0,
+        lock_timeout: float = 1.0,
+        cache_ttl: float = 600.0,
+        cache_max_entries: int = 1000,
+    ) -> None:
+        """Create the validator; the pool is opened on first use or by `open()`.
+
+        Args:
+            conninfo: PostgreSQL connection string
+            min_size: Sessions kept open
+            max_size: Upper bound the pool can grow to under load
+            timeout: Seconds to wait for a free session before failing
+            max_idle: Close sessions idle for longer than this (down to min_size)
+            statement_timeout: Seconds a validation may take on the server
+            lock_timeout: Seconds a validation may wait for a lock on the server
+            cache_ttl: Seconds a validation result is reused
+            cache_max_entries: Results kept at once; least recently used ones
+                are evicted first
+        """
+        options = (
+            "-c default_transaction_read_only=on"
+            f" -c statement_timeout={_milliseconds(statement_timeout)}"
+            f" -c lock_timeout={_milliseconds(lock_timeout)}"
+        )
+        # Sessions aren't checked before being handed out, that would double
+        # the round trips: a broken session fails the validation, is dropped by
+        # the pool and the validation is retried once
+        self.pool = ConnectionPool(
+            conninfo,
+            min_size=min_size,
+            max_size=max_size,
+            open=False,
+            timeout=timeout,
+            max_idle=max_idle,
+            name="nl2sql-sql-validation",
+            kwargs={"autocommit": True, "options": options},
+        )
+        self.cache_ttl = cache_ttl
+        self.cache_max_entries = cache_max_entries
+        self.hits = 0
+        self.misses = 0
+        self._cache: OrderedDict[str, tuple[dict, float]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def open(self, wait: bool = False) -> None:
+        """Open the pool, if not open yet.
+
+        Args:
+            wait: Block until `min_size` sessions are connected
+        """
+        with self._lock:
+            if self.pool.closed:
+                self.pool.open(wait=wait)
+                logger.debug("✅ SQL validation sessions opened")
+
+    def close(self) -> None:
+        """Close the pool's sessions."""
+        self.pool.close()
+
+    def validate(self, query: str) -> dict:
+        """Validate a query with `PREPARE`.
+
+        Args:
+            query: The SQL query to validate
+
+        Returns:
+            dict: {
+                "valid_syntax": bool, or None if the query couldn't be
+                    validated (no free session, database unreachable),
+                "error": str or None
+            }
+        """
+        cached = self._cached(query)
+        if cached is not None:
+            return cached
+
+        if self.pool.closed:
+            self.open()
+
+        try:
+            result, cacheable = self._prepare(query)
+        except psycopg.Error as e:
+            # Says nothing about the query itself, so it's neither cached nor
+            # reported as a syntax error
+            logger.warning(f"⚠️ SQL validation unavailable: {e}")
+            return {"valid_syntax": None, "error": str(e)}
+        if cacheable:
+            self._put(query, result)
+        return dict(result)
+
+    def explain(self, query: str) -> dict:
+        """Estimate a query's cost with `EXPLAIN` (without `ANALYZE`).
+
+        Errors, including a lack of free sessions, are reported in the result.
+
+        Args:
+            query: The SQL query to estimate
+
+        Returns:
+            dict: {
+                "success": bool,
+                "total_cost": float or None (planner cost units),
+                "plan_rows": int or None (estimated result rows),
+                "error": str or None
+            }
+        """
+        if self.pool.closed:
+            self.open()
+
+        try:
+            with self.pool.connection() as conn:
+                row = conn.execute(f"EXPLAIN (FORMAT JSON) {query}").fetchone()
+        except psycopg.Error as e:
+            # Including pool timeouts: an estimate is never worth failing for
+            return {
+                "success": False,
+                "total_cost": None,
+                "plan_rows": None,
+                "error": str(e),
+            }
+
+        plan = row[0][0]["Plan"]
+        return {
+            "success": True,
+            "total_cost": float(plan["Total Cost"]),
+            "plan_rows": int(plan["Plan Rows"]),
+            "error": None,
+        }
+
+    def clear(self) -> None:
+        """Drop all cached results (e.g. after a schema change)."""
+        with self._lock:
+            self._cache.clear()
+
+    def stats(self) -> dict:
+        """Cache hit/miss counters and pool usage."""
+        lookups = self.hits + self.misses
+        pool_stats = self.pool.get_stats()
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "size": len(self._cache),
+            "pool_size": pool_stats.get("pool_size", 0),
+            "pool_available": pool_stats.get("pool_available", 0),
+            "requests_waiting": pool_stats.get("requests_waiting", 0),
+        }
+
+    def _prepare(self, query: str) -> tuple[dict, bool]:
+        """Prepare and deallocate a query, retrying once on a lost session.
+
+        Returns:
+            The validation result and whether it may be cached
+        """
+        try:
+            return self._prepare_on_session(query)
+        except PoolTimeout:
+            raise
+        except psycopg.OperationalError as e:
+            # The pool drops the broken session (e.g. after a server restart)
+            logger.warning(f"⚠️ SQL validation session lost, retrying: {e}")
+            return self._prepare_on_session(query)
+
+    def _prepare_on_session(self, query: str) -> tuple[dict, bool]:
+        """Prepare and deallocate a query on a pooled session.
+
+        Raises:
+            psycopg.OperationalError: If the session is lost
+        """
+        name = f"nl2sql_validate_{uuid.uuid4().hex}"
+        with self.pool.connection() as conn:
+            try:
+                conn.execute(f"PREPARE {name} AS {query}")
+            except psycopg.Error as e:
+                if conn.closed:
+                    raise
+                sqlstate = e.sqlstate or ""
+                return (
+                    {"valid_syntax": False, "error": str(e)},
+                    sqlstate[:2] in CACHEABLE_SQLSTATE_CLASSES,
+                )
+            conn.execute(f"DEALLOCATE {name}")
+        return {"valid_syntax": True, "error": None}, True
+
+    def _cached(self, query: str) -> dict | None:
+        """Cached result of a query, if fresh."""
+        with self._lock:
+            entry = self._cache.get(query)
+            if entry is None or entry[1] <= time.monotonic():
+                if entry is not None:
+                    del self._cache[query]
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._cache.move_to_end(query)
+            return dict(entry[0])
+
+    def _put(self, query: str, result: dict) -> None:
+        """Cache a result, evicting the least recently used ones."""
+        with self._lock:
+            self._cache[query] = (result, time.monotonic() + self.cache_ttl)
+            self._cache.move_to_end(query)
+            while len(self._cache) > self.cache_max_entries:
+                self._cache.popitem(last=False)
+
+
+def _milliseconds(seconds: float) -> int:
+    """Seconds as a PostgreSQL timeout setting, in milliseconds."""
+    return max(int(seconds * 1000), 1)
@@ -2,16 +2,71 @@
 
 This module extracts and documents database schema information, including
 table structures, columns, and relationships using SQLAlchemy's inspector.
+
+Rendered contexts are memoized per column, table, schema and database, so
+repeated calls return the cached strings and subsets of tables are assembled
+from the cached table contexts. Assigning a field of any model invalidates the
+cached contexts (changes are rare, so they are all re-rendered). In-place
+changes to lists or dicts (e.g. `table.primary_keys.append(...)`) are not
+tracked; call `invalidate_context()` after making them. The content hash is
+memoized the same way.
 """
 
+import hashlib
+from collections.abc import Callable, Iterable
 from pathlib import Path
 
 import yaml
-from pydantic import BaseModel
+from pydantic import BaseModel, PrivateAttr
 from sqlalchemy.engine.reflection import Inspector
 
+# (database, schema, table)
+TableKey = tuple[str, str, str]
+
+
+def _join_context(header: str, tables: list[str]) -> str:
+    """Join table contexts under a header, each followed by a blank line."""
+    return header + "".join(table + "\n\n" for table in tables)
+
+
+# Bumped whenever a dictionary model changes; contexts cached at an older
+# version are stale
+_context_version = 0
+
+
+def _bump_context_version() -> None:
+    """Mark every cached context as stale."""
+    global _context_version
+    _context_version += 1
+
+
+class CachedContextModel(BaseModel):
+    """Model memoizing its rendered context."""
 
-class ColumnInfo(BaseModel):
+    _context: tuple[int, str] | None = PrivateAttr(default=None)
+
+    def __setattr__(self, name: str, value: object) -> None:
+        """Set an attribute, invalidating cached contexts for fields."""
+        super().__setattr__(name, value)
+        if name in type(self).model_fields:
+            _bump_context_version()
+
+    def invalidate_context(self) -> None:
+        """Invalidate cached contexts after an in-place change."""
+        _bump_context_version()
+
+    def _memoized_context(self, render: Callable[[], str]) -> str:
+        """Return the cached context, rendering it if stale."""
+        version = _context_version
+        cached = self._context
+        if cached is not None and cached[0] == version:
+            return cached[1]
+        context = render()
+        self._context = (version, context)
+        return context
+
+
+class ColumnInfo(CachedContextModel):
     """Information about a database column."""
 
     name: str
@@ -27,8 +82,23 @@ class ColumnInfo(BaseModel):
         column_type = str(column["type"])
         return column_type if column_type != "NULL" else "USER-DEFINED"
 
+    def format_context(self) -> str:
+        """Format the column as a line of its table context.
+
+        Columns without a description are left out of the context.
+        """
+        return self._memoized_context(self._render_context)
+
+    def _render_context(self) -> str:
+        """Render the column line."""
+        if not self.description:
+            return ""
+        # Format column type, nullability, and description
+        is_nullable = "NULL" if self.is_nullable else "NOT NULL"
+        return f"  - {self.name} ({self.type}, {is_nullable}): {self.description}\n"
 
-class TableInfo(BaseModel):
+
+class TableInfo(CachedContextModel):
     """Information about a database table."""
 
     name: str
@@ -97,39 +167,35 @@ class TableInfo(BaseModel):
 
     def format_context(self) -> str:
         """Format table information as a string for context retrieval."""
+        return self._memoized_context(self._render_context)
+
+    def _render_context(self) -> str:
+        """Render the table context around its column lines."""
         # Start with table name and description
-        context = f"TABLE: {self.name}\n"
+        lines = [f"TABLE: {self.name}\n"]
         if self.description:
-            context += f"DESCRIPTION: {self.description}\n"
+            lines.append(f"DESCRIPTION: {self.description}\n")
 
         # Add primary keys
         if self.primary_keys:
-            context += f"PRIMARY KEYS: {', '.join(self.primary_keys)}\n"
+            lines.append(f"PRIMARY KEYS: {', '.join(self.primary_keys)}\n")
 
         # Add foreign keys
         if self.foreign_keys:
-            context += "FOREIGN KEYS:\n"
+            lines.append("FOREIGN KEYS:\n")
             for fk in self.foreign_keys:
                 constrained = ", ".join(fk["constrained_columns"])
                 referred = ", ".join(fk["referred_columns"])
-                context += (
+                lines.append(
                     f"  - {constrained} -> "
                     f"{fk['referred_schema']}.{fk['referred_table']}.{referred}\n"
                 )
 
         # Add columns with descriptions
-        context += "COLUMNS:\n"
-        for column in self.columns:
-            if not column.description:
-                continue
-            # Format column type, nullability, and description
-            is_nullable = "NULL" if column.is_nullable else "NOT NULL"
-            context += (
-                f"  - {column.name} ({column.type}, {is_nullable}): "
-                f"{column.description}\n"
-            )
+        lines.append("COLUMNS:\n")
+        lines.extend(column.format_context() for column in self.columns)
 
-        return context
+        return "".join(lines)
 
     def populate_missing_pk_descriptions(self) -> None:
         """Populate missing primary key descriptions."""
@@ -142,7 +208,7 @@ class TableInfo(BaseModel):
         return [col.name for col in self.columns if not col.description]
 
 
-class SchemaInfo(BaseModel):
+class SchemaInfo(CachedContextModel):
     """Information about a database schema."""
 
     name: str
@@ -150,10 +216,12 @@ class SchemaInfo(BaseModel):
 
     def format_context(self) -> str:
         """Format schema information as a string for context retrieval."""
-        context = f"SCHEMA: {self.name}\n\n"
-        for table_info in self.tables.values():
-            context += table_info.format_context() + "\n\n"
-        return context
+        return self._memoized_context(
+            lambda: _join_context(
+                f"SCHEMA: {self.name}\n\n",
+                [table_info.format_context() for table_info in self.tables.values()],
+            )
+        )
 
     def get_tables_with_missing_descriptions(self) -> list[str]:
         """Get list of tables with missing descriptions."""
@@ -173,7 +241,7 @@ class SchemaInfo(BaseModel):
         return missing_columns
 
 
-class DatabaseInfo(BaseModel):
+class DatabaseInfo(CachedContextModel):
     """Information about a database."""
 
     name: str
@@ -181,10 +249,15 @@ class DatabaseInfo(BaseModel):
 
     def format_context(self) -> str:
         """Format database information as a string for context retrieval."""
-        context = f"DATABASE: {self.name}\n\n"
-        for schema_info in self.schemas.values():
-            context += schema_info.format_context()
-        return context
+        return self._memoized_context(
+            lambda: (
+                f"DATABASE: {self.name}\n\n"
+                + "".join(
+                    schema_info.format_context()
+                    for schema_info in self.schemas.values()
+                )
+            )
+        )
 
     def get_tables_with_missing_descriptions(self) -> dict[str, list[str]]:
         """Get tables with missing descriptions organized by schema."""
@@ -205,11 +278,13 @@ class DatabaseInfo(BaseModel):
         return missing_columns
 
 
-class DataDictionary(BaseModel):
+class DataDictionary(CachedContextModel):
     """Main data dictionary containing all database information."""
 
     databases: dict[str, DatabaseInfo]
 
+    _content_hash: tuple[int, str] | None = PrivateAttr(default=None)
+
     @classmethod
     def from_inspector(
         cls,
@@ -248,10 +323,54 @@ class DataDictionary(BaseModel):
 
     def format_context(self) -> str:
         """Format all schema information as a string for context retrieval."""
-        context = ""
-        for database_info in self.databases.values():
-            context += database_info.format_context()
-        return context
+        return self._memoized_context(
+            lambda: "".join(
+                database_info.format_context()
+                for database_info in self.databases.values()
+            )
+        )
+
+    def format_tables_context(self, table_keys: Iterable[TableKey]) -> str:
+        """Format a subset of tables like `format_context`.
+
+        Assembled from the cached table contexts, in data dictionary order.
+
+        Args:
+            table_keys: (database, schema, table) keys of the tables to include
+        """
+        table_keys = set(table_keys)
+        context = []
+        for database_name, database_info in self.databases.items():
+            database_context = []
+            for schema_name, schema_info in database_info.schemas.items():
+                tables = [
+                    table_info.format_context()
+                    for table_name, table_info in schema_info.tables.items()
+                    if (database_name, schema_name, table_name) in table_keys
+                ]
+                if tables:
+                    database_context.append(
+                        _join_context(f"SCHEMA: {schema_name}\n\n", tables)
+                    )
+            if database_context:
+                context.append(f"DATABASE: {database_name}\n\n")
+                context.extend(database_context)
+        return "".join(context)
+
+    def content_hash(self) -> str:
+        """Hash of the dictionary content, used as the schema version.
+
+        Recomputed once the contexts are invalidated by a change.
+        """
+        version = _context_version
+        cached = self._content_hash
+        if cached is not None and cached[0] == version:
+            return cached[1]
+        content_hash = hashlib.sha256(
+            self.model_dump_json().encode("utf-8")
+        ).hexdigest()
+        self._content_hash = (version, content_hash)
+        return content_hash
 
     def save(self, output_path: Path | str) -> Path:
         """Save data dictionary to a YAML file."""
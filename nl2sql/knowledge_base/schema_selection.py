@@ -0,0 +1,117 @@
+"""Question-specific subsets of the data dictionary.
+
+Instead of the whole data dictionary, the SQL generator prompt gets the tables
+retrieved for the question plus their foreign key neighbours (the tables needed
+to join them), trimmed to a token budget.
+"""
+
+import math
+from collections.abc import Iterable
+
+from nl2sql.knowledge_base.data_dictionary import DataDictionary, TableInfo, TableKey
+
+# Rough characters per token of English text and identifiers
+CHARS_PER_TOKEN = 4
+
+
+def estimate_tokens(text: str) -> int:
+    """Approximate token count of a text."""
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+
+def table_key(metadata: dict) -> TableKey:
+    """Key of the table described by a schema document's metadata."""
+    return (metadata["database"], metadata["schema"], metadata["table"])
+
+
+class SchemaSelector:
+    """Select and format the tables relevant to a question."""
+
+    def __init__(
+        self,
+        data_dictionary: DataDictionary,
+        token_budget: int,
+        include_fk_neighbours: bool = True,
+    ) -> None:
+        """Index the tables of a data dictionary and their foreign key links.
+
+        Args:
+            data_dictionary: Data dictionary the tables are selected from
+            token_budget: Approximate token budget of the formatted tables
+            include_fk_neighbours: Also select the tables referenced by, or
+                referencing, the retrieved ones
+        """
+        self.data_dictionary = data_dictionary
+        self.token_budget = token_budget
+        self.include_fk_neighbours = include_fk_neighbours
+
+        self._tables: dict[TableKey, TableInfo] = {
+            (database_name, schema_name, table_name): table_info
+            for database_name, database_info in data_dictionary.databases.items()
+            for schema_name, schema_info in database_info.schemas.items()
+            for table_name, table_info in schema_info.tables.items()
+        }
+        self._neighbours = self._build_neighbours()
+
+    def _build_neighbours(self) -> dict[TableKey, list[TableKey]]:
+        """Tables linked by a foreign key, in either direction."""
+        neighbours: dict[TableKey, list[TableKey]] = {key: [] for key in self._tables}
+        for key, table_info in self._tables.items():
+            database_name, schema_name, _ = key
+            for fk in table_info.foreign_keys:
+                referred = (
+                    database_name,
+                    fk["referred_schema"] or schema_name,
+                    fk["referred_table"],
+                )
+                if referred not in self._tables or referred == key:
+                    continue
+                if referred not in neighbours[key]:
+                    neighbours[key].append(referred)
+                if key not in neighbours[referred]:
+                    neighbours[referred].append(key)
+        return neighbours
+
+    def select(self, retrieved: Iterable[TableKey]) -> list[TableKey]:
+        """Select tables within the token budget.
+
+        Retrieved tables are taken in rank order, then the foreign key
+        neighbours of the selected ones. The top ranked table is always kept,
+        even when it alone exceeds the budget. Unknown tables (e.g. a stale
+        vector store) are ignored.
+
+        Args:
+            retrieved: Keys of the retrieved tables, most relevant first
+
+        Returns:
+            The selected keys, in data dictionary order
+        """
+        selected: list[TableKey] = []
+        used_tokens = 0
+
+        def add(key: TableKey) -> None:
+            nonlocal used_tokens
+            if key in selected:
+                return
+            # Table contexts are memoized, so this is cheap
+            tokens = estimate_tokens(self._tables[key].format_context())
+            if selected and used_tokens + tokens > self.token_budget:
+                return
+            selected.append(key)
+            used_tokens += tokens
+
+        for key in retrieved:
+            if key in self._tables:
+                add(key)
+
+        if self.include_fk_neighbours:
+            for key in list(selected):
+                for neighbour in self._neighbours[key]:
+                    add(neighbour)
+
+        # Stable order, so the same tables always render the same prompt
+        return [key for key in self._tables if key in selected]
+
+    def format_context(self, table_keys: Iterable[TableKey]) -> str:
+        """Format a subset of tables like `DataDictionary.format_context`."""
+        return self.data_dictionary.format_tables_context(table_keys)
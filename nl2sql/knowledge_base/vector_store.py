@@ -4,12 +4,12 @@ import hashlib
 
 from langchain.embeddings.base import Embeddings
 from langchain.schema import Document
-from langchain_openai.embeddings import OpenAIEmbeddings
 from langchain_postgres import PGVector
 
 from nl2sql.database.base import SQLBaseConnector
 from nl2sql.knowledge_base.data_dictionary import DataDictionary
 from nl2sql.knowledge_base.sql_examples import SQLExample
+from nl2sql.llm.registry import get_embeddings
 
 
 class VectorStore:
@@ -21,10 +21,14 @@ class VectorStore:
         collection_name: str = "nl2sql_embeddings",
         embeddings: Embeddings | None = None,
     ) -> None:
-        """Initialize vector store."""
+        """Initialize vector store.
+
+        Embeddings default to the model configured under `llm.embeddings` (or
+        the fake embeddings when `llm.fake` is enabled).
+        """
         self.vectorstore = PGVector(
             connection=db_connector.engine,
-            embeddings=embeddings or OpenAIEmbeddings(model="text-embedding-3-small"),
+            embeddings=embeddings or get_embeddings(),
             collection_name=collection_name,
         )
 
@@ -0,0 +1,24 @@
+"""LLM clients."""
+
+from nl2sql.llm.cache import cached_chain, response_cache
+from nl2sql.llm.fake import FakeChatModel, FakeResponder, HashingEmbeddings
+from nl2sql.llm.registry import (
+    ModelRegistry,
+    create_embeddings,
+    get_chat_model,
+    get_embeddings,
+    model_registry,
+)
+
+__all__ = [
+    "FakeChatModel",
+    "FakeResponder",
+    "HashingEmbeddings",
+    "ModelRegistry",
+    "cached_chain",
+    "create_embeddings",
+    "get_chat_model",
+    "get_embeddings",
+    "model_registry",
+    "response_cache",
+]
@@ -0,0 +1,295 @@
+"""Exact-match cache of LLM responses.
+
+Responses are keyed on the fully rendered prompt plus the model parameters
+(model, provider, temperature, output mode) of the agent role, so identical
+prompts are answered without calling the provider. Per-call options such as
+deadline timeouts are not part of the key, and answers of a fallback model
+(see `nl2sql.llm.resilience`) are not cached.
+
+Backends:
+    - `memory`: in-process LRU with TTL, no external service
+    - `sqlite`: on-disk, shared by the workers of a host
+    - `redis`: any Redis-protocol server, shared across hosts (requires the
+      `redis` package)
+"""
+
+import asyncio
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from pathlib import Path
+
+from langchain_core.messages import BaseMessage, messages_from_dict, messages_to_dict
+from langchain_core.prompt_values import PromptValue
+from langchain_core.prompts import BasePromptTemplate
+from langchain_core.runnables import Runnable, RunnableConfig, RunnableLambda
+from loguru import logger
+
+from nl2sql.config import load_llm_config
+from nl2sql.llm.registry import get_chat_model, model_registry
+from nl2sql.llm.resilience import FALLBACK_METADATA_KEY
+
+
+class ResponseCache(ABC):
+    """Key-value backend of the response cache."""
+
+    # Whether calls do I/O and should run off the event loop
+    blocking = True
+
+    def __init__(self, ttl: float) -> None:
+        """Initialize the hit/miss counters."""
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        # Guards the backend and the counters, updated from worker threads
+        self._lock = threading.Lock()
+
+    @abstractmethod
+    def get(self, key: str) -> str | None:
+        """Get a cached value, or None if missing or expired."""
+
+    @abstractmethod
+    def set(self, key: str, value: str) -> None:
+        """Cache a value for `ttl` seconds."""
+
+    @abstractmethod
+    def clear(self) -> None:
+        """Drop all cached values."""
+
+    def record(self, hit: bool) -> None:
+        """Count a lookup."""
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def stats(self) -> dict:
+        """Hit/miss counters."""
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+
+class MemoryResponseCache(ResponseCache):
+    """In-process LRU cache with TTL."""
+
+    blocking = False
+
+    def __init__(self, ttl: float, max_entries: int) -> None:
+        """Initialize an empty cache."""
+        super().__init__(ttl)
+        self.max_entries = max_entries
+        self._entries: OrderedDict[str, tuple[str, float]] = OrderedDict()
+
+    def get(self, key: str) -> str | None:
+        """Get a cached value, or None if missing or expired."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at <= time.time():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: str) -> None:
+        """Cache a value, evicting the least recently used ones past the cap."""
+        with self._lock:
+            self._entries[key] = (value, time.time() + self.ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        """Drop all cached values."""
+        with self._lock:
+            self._entries.clear()
+
+
+class SQLiteResponseCache(ResponseCache):
+    """On-disk cache in a SQLite database."""
+
+    def __init__(self, ttl: float, path: str | Path) -> None:
+        """Open (or create) the cache database and drop expired entries."""
+        super().__init__(ttl)
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS llm_responses "
+                "(key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)"
+            )
+            self._conn.execute(
+                "DELETE FROM llm_responses WHERE expires_at <= ?", (time.time(),)
+            )
+
+    def get(self, key: str) -> str | None:
+        """Get a cached value, or None if missing or expired."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value FROM llm_responses WHERE key = ? AND expires_at > ?",
+                (key, time.time()),
+            ).fetchone()
+        return row[0] if row else None
+
+    def set(self, key: str, value: str) -> None:
+        """Cache a value for `ttl` seconds."""
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO llm_responses VALUES (?, ?, ?)",
+                (key, value, time.time() + self.ttl),
+            )
+
+    def clear(self) -> None:
+        """Drop all cached values."""
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM llm_responses")
+
+
+class RedisResponseCache(ResponseCache):
+    """Cache on a Redis-protocol server, with server-side expiry."""
+
+    def __init__(self, ttl: float, url: str, prefix: str) -> None:
+        """Connect to the server at `url`."""
+        try:
+            import redis
+        except ImportError as e:
+            raise ImportError(
+                "The redis response cache backend requires the `redis` package"
+            ) from e
+
+        super().__init__(ttl)
+        self.prefix = prefix
+        self._client = redis.Redis.from_url(url, decode_responses=True)
+
+    def get(self, key: str) -> str | None:
+        """Get a cached value, or None if missing or expired."""
+        return self._client.get(self.prefix + key)
+
+    def set(self, key: str, value: str) -> None:
+        """Cache a value for `ttl` seconds."""
+        self._client.set(self.prefix + key, value, ex=int(self.ttl))
+
+    def clear(self) -> None:
+        """Drop all cached values under the prefix."""
+        keys = list(self._client.scan_iter(match=f"{self.prefix}*"))
+        if keys:
+            self._client.delete(*keys)
+
+
+def create_response_cache(config: dict) -> ResponseCache | None:
+    """Create the backend selected by the `response_cache` config."""
+    backend = config["backend"]
+    if backend == "none":
+        return None
+    if backend == "memory":
+        return MemoryResponseCache(config["ttl"], **config["memory"])
+    if backend == "sqlite":
+        return SQLiteResponseCache(config["ttl"], **config["sqlite"])
+    if backend == "redis":
+        return RedisResponseCache(config["ttl"], **config["redis"])
+    raise ValueError(f"Unknown response cache backend: {backend}")
+
+
+def _cache_key(role: str, prompt_value: PromptValue) -> str:
+    """Key a rendered prompt with the model parameters of the role."""
+    payload = {
+        "model": model_registry.spec(role),
+        "messages": messages_to_dict(prompt_value.to_messages()),
+    }
+    return hashlib.sha256(
+        json.dumps(payload, sort_keys=True, default=str).encode("utf-8")
+    ).hexdigest()
+
+
+def _cached_response(key: str) -> BaseMessage | None:
+    """Look up a response and update the counters.
+
+    A failing backend or an unreadable entry must not fail the call, it counts
+    as a miss.
+    """
+    try:
+        value = response_cache.get(key)
+        message = messages_from_dict(json.loads(value))[0] if value else None
+    except Exception as e:
+        logger.warning(f"⚠️ Could not read cached LLM response: {e}")
+        message = None
+    response_cache.record(hit=message is not None)
+    return message
+
+
+def _cache_response(key: str, message: BaseMessage) -> None:
+    """Store a response; a failing backend must not fail the call."""
+    if message.response_metadata.get(FALLBACK_METADATA_KEY):
+        # Keys are made from the role's model, not the fallback model
+        return
+    try:
+        response_cache.set(key, json.dumps(messages_to_dict([message])))
+    except Exception as e:
+        logger.warning(f"⚠️ Could not cache LLM response: {e}")
+
+
+def cached_chain(
+    prompt: BasePromptTemplate, role: str, timeout: float | None = None
+) -> Runnable:
+    """Build `prompt | model` for an agent role, caching the model responses.
+
+    Falls back to the plain chain when caching is disabled or the role is not
+    listed under `llm.response_cache.roles`.
+
+    Args:
+        prompt: Prompt template of the chain
+        role: Key under `llm.models` in the LLM config
+        timeout: Per-call timeout in seconds, see `ModelRegistry.get`
+    """
+    llm = get_chat_model(role, timeout=timeout)
+    if response_cache is None or role not in cache_config["roles"]:
+        return prompt | llm
+
+    def invoke(inputs: dict, config: RunnableConfig) -> BaseMessage:
+        prompt_value = prompt.invoke(inputs, config)
+        key = _cache_key(role, prompt_value)
+        cached = _cached_response(key)
+        if cached is not None:
+            logger.debug(f"✅ LLM response cache hit ({role})")
+            return cached
+
+        message = llm.invoke(prompt_value, config)
+        _cache_response(key, message)
+        return message
+
+    async def ainvoke(inputs: dict, config: RunnableConfig) -> BaseMessage:
+        prompt_value = await prompt.ainvoke(inputs, config)
+        key = _cache_key(role, prompt_value)
+        if response_cache.blocking:
+            cached = await asyncio.to_thread(_cached_response, key)
+        else:
+            cached = _cached_response(key)
+        if cached is not None:
+            logger.debug(f"✅ LLM response cache hit ({role})")
+            return cached
+
+        message = await llm.ainvoke(prompt_value, config)
+        if response_cache.blocking:
+            await asyncio.to_thread(_cache_response, key, message)
+        else:
+            _cache_response(key, message)
+        return message
+
+    return RunnableLambda(invoke, afunc=ainvoke, name=f"cached_{role}")
+
+
+cache_config = load_llm_config()["response_cache"]
+
+# Process-wide response cache, None when disabled
+response_cache = create_response_cache(cache_config)
@@ -0,0 +1,324 @@
+"""Offline stand-ins for the LLM provider.
+
+Used to run the whole pipeline without network access, e.g. to benchmark the
+agent's own overhead separately from provider latency (`llm.fake` in
+`configs/llm.yml`):
+
+- `FakeChatModel`: answers from scripted rules keyed on the prompt, after a
+  configurable latency; supports streaming and the JSON output mode
+- `HashingEmbeddings`: deterministic feature-hashing embeddings, so similar
+  texts get similar vectors (retrieval and the SQL cache behave plausibly)
+
+`scripts/fake_openai_server.py` serves the same responses over an
+OpenAI-compatible HTTP API, to also exercise the real client stack.
+"""
+
+import asyncio
+import hashlib
+import itertools
+import random
+import re
+import time
+from collections.abc import AsyncIterator, Iterator
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+import yaml
+from langchain_core.callbacks import (
+    AsyncCallbackManagerForLLMRun,
+    CallbackManagerForLLMRun,
+)
+from langchain_core.embeddings import Embeddings
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage
+from langchain_core.messages.ai import UsageMetadata
+from langchain_core.output_parsers import JsonOutputParser
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from langchain_core.runnables import Runnable
+from pydantic import ConfigDict
+
+from nl2sql.knowledge_base.schema_selection import estimate_tokens
+
+PLACEHOLDER_PATTERN = re.compile(r"\{(\w+)\}")
+WORD_PATTERN = re.compile(r"\w+")
+CHUNK_PATTERN = re.compile(r"\S+\s*|\s+")
+
+
+class FakeRule:
+    """A scripted response, given when its patterns match the prompt."""
+
+    def __init__(
+        self, response: str, system: str | None = None, user: str | None = None
+    ) -> None:
+        """Compile the rule's patterns (case-insensitive regular expressions).
+
+        Args:
+            response: Response text; `{name}` placeholders are replaced with the
+                named groups of the `user` pattern
+            system: Pattern searched in the system messages
+            user: Pattern searched in the last user message
+        """
+        self.response = response
+        self.system = re.compile(system, re.IGNORECASE) if system else None
+        self.user = re.compile(user, re.IGNORECASE) if user else None
+
+    def respond(self, system: str, user: str) -> str | None:
+        """The response to a prompt, or None if the rule doesn't match."""
+        if self.system is not None and not self.system.search(system):
+            return None
+
+        groups: dict[str, str] = {}
+        if self.user is not None:
+            match = self.user.search(user)
+            if match is None:
+                return None
+            groups = {k: v for k, v in match.groupdict().items() if v is not None}
+
+        return PLACEHOLDER_PATTERN.sub(
+            lambda m: groups.get(m.group(1), m.group(0)), self.response
+        )
+
+
+class FakeResponder:
+    """Rule-based responses, the first matching rule answers."""
+
+    def __init__(self, rules: list[FakeRule], default_response: str) -> None:
+        """Initialize with ordered rules and the response when none matches."""
+        self.rules = rules
+        self.default_response = default_response
+
+    @classmethod
+    def from_yaml(cls, file_path: str | Path) -> "FakeResponder":
+        """Load the rules of a YAML file (see `configs/fake_llm.yml`)."""
+        with open(file_path) as f:
+            config = yaml.safe_load(f)
+        return cls(
+            rules=[FakeRule(**rule) for rule in config["rules"]],
+            default_response=config["default_response"],
+        )
+
+    def respond(self, system: str, user: str) -> str:
+        """Respond to a prompt given its system and last user message."""
+        for rule in self.rules:
+            response = rule.respond(system, user)
+            if response is not None:
+                return response
+        return self.default_response
+
+    def respond_to_messages(self, messages: list[BaseMessage]) -> str:
+        """Respond to a chat prompt."""
+        system = "\n".join(m.text() for m in messages if m.type == "system")
+        user = next((m.text() for m in reversed(messages) if m.type == "human"), "")
+        return self.respond(system, user)
+
+
+def fake_delay(prompt: str, latency: float, jitter: float) -> float:
+    """Latency of a fake call, with a jitter that is deterministic per prompt."""
+    if not jitter:
+        return latency
+    seed = hashlib.sha256(prompt.encode("utf-8")).digest()
+    return latency + random.Random(seed).uniform(0, jitter)
+
+
+class FakeChatModel(BaseChatModel):
+    """Chat model answering from a `FakeResponder` after a simulated latency.
+
+    Call options (tools, timeouts, response formats) are accepted and ignored,
+    so the model drops in wherever a provider model is bound with them.
+    """
+
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    responder: FakeResponder
+    model: str = "fake"
+    # Seconds before the response (or its first streamed chunk)
+    latency: float = 0.0
+    # Up to this many extra seconds, deterministic per prompt
+    jitter: float = 0.0
+    # Seconds between streamed chunks
+    chunk_latency: float = 0.0
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake"
+
+    @property
+    def _identifying_params(self) -> dict[str, Any]:
+        return {"model": self.model}
+
+    def _get_ls_params(
+        self,
+        stop: list[str] | None = None,
+        **kwargs: Any,  # noqa: ANN401
+    ) -> dict[str, Any]:
+        """Tracing params, with the model name used in metrics."""
+        params = super()._get_ls_params(stop=stop, **kwargs)
+        params["ls_model_name"] = self.model
+        return params
+
+    def _respond(self, messages: list[BaseMessage]) -> tuple[str, float]:
+        """The response to a prompt and the delay before giving it."""
+        prompt = "\n".join(m.text() for m in messages)
+        delay = fake_delay(prompt, self.latency, self.jitter)
+        return self.responder.respond_to_messages(messages), delay
+
+    def _generate(
+        self,
+        messages: list[BaseMessage],
+        stop: list[str] | None = None,
+        run_manager: CallbackManagerForLLMRun | None = None,
+        **kwargs: Any,  # noqa: ANN401
+    ) -> ChatResult:
+        response, delay = self._respond(messages)
+        time.sleep(delay)
+        return _chat_result(messages, response)
+
+    async def _agenerate(
+        self,
+        messages: list[BaseMessage],
+        stop: list[str] | None = None,
+        run_manager: AsyncCallbackManagerForLLMRun | None = None,
+        **kwargs: Any,  # noqa: ANN401
+    ) -> ChatResult:
+        response, delay = self._respond(messages)
+        await asyncio.sleep(delay)
+        return _chat_result(messages, response)
+
+    def _stream(
+        self,
+        messages: list[BaseMessage],
+        stop: list[str] | None = None,
+        run_manager: CallbackManagerForLLMRun | None = None,
+        **kwargs: Any,  # noqa: ANN401
+    ) -> Iterator[ChatGenerationChunk]:
+        response, delay = self._respond(messages)
+        time.sleep(delay)
+        for i, chunk in enumerate(_chunks(messages, response)):
+            if i and self.chunk_latency:
+                time.sleep(self.chunk_latency)
+            if run_manager:
+                run_manager.on_llm_new_token(chunk.text, chunk=chunk)
+            yield chunk
+
+    async def _astream(
+        self,
+        messages: list[BaseMessage],
+        stop: list[str] | None = None,
+        run_manager: AsyncCallbackManagerForLLMRun | None = None,
+        **kwargs: Any,  # noqa: ANN401
+    ) -> AsyncIterator[ChatGenerationChunk]:
+        response, delay = self._respond(messages)
+        await asyncio.sleep(delay)
+        for i, chunk in enumerate(_chunks(messages, response)):
+            if i and self.chunk_latency:
+                await asyncio.sleep(self.chunk_latency)
+            if run_manager:
+                await run_manager.on_llm_new_token(chunk.text, chunk=chunk)
+            yield chunk
+
+    def bind_tools(
+        self,
+        tools: list,
+        **kwargs: Any,  # noqa: ANN401
+    ) -> Runnable:
+        """Accept tools for compatibility; the fake model never calls them."""
+        return self.bind(tools=tools, **kwargs)
+
+    def with_structured_output(
+        self,
+        schema: Any = None,  # noqa: ANN401
+        *,
+        method: str = "json_mode",
+        include_raw: bool = False,
+        **kwargs: Any,  # noqa: ANN401
+    ) -> Runnable:
+        """Parse the responses as JSON objects (`json_mode` only)."""
+        if method != "json_mode" or schema is not None or include_raw:
+            raise NotImplementedError("The fake chat model only supports json_mode")
+        return self.bind(**kwargs) | JsonOutputParser()
+
+
+def _usage(messages: list[BaseMessage], response: str) -> UsageMetadata:
+    """Estimated token usage of a fake call."""
+    input_tokens = sum(estimate_tokens(m.text()) for m in messages)
+    output_tokens = estimate_tokens(response)
+    return UsageMetadata(
+        input_tokens=input_tokens,
+        output_tokens=output_tokens,
+        total_tokens=input_tokens + output_tokens,
+    )
+
+
+def _chat_result(messages: list[BaseMessage], response: str) -> ChatResult:
+    """Wrap a response as a chat result."""
+    message = AIMessage(content=response, usage_metadata=_usage(messages, response))
+    return ChatResult(generations=[ChatGeneration(message=message)])
+
+
+def _chunks(messages: list[BaseMessage], response: str) -> list[ChatGenerationChunk]:
+    """Split a response into word chunks, the last one carrying the usage."""
+    pieces = CHUNK_PATTERN.findall(response) or [""]
+    chunks = [
+        ChatGenerationChunk(message=AIMessageChunk(content=piece)) for piece in pieces
+    ]
+    chunks[-1] = ChatGenerationChunk(
+        message=AIMessageChunk(
+            content=pieces[-1], usage_metadata=_usage(messages, response)
+        )
+    )
+    return chunks
+
+
+class HashingEmbeddings(Embeddings):
+    """Deterministic embeddings from hashed words and word pairs.
+
+    Texts sharing words get similar vectors, which keeps similarity search
+    meaningful without an embedding model. Vectors are unit length.
+    """
+
+    def __init__(self, size: int = 1536, latency: float = 0.0) -> None:
+        """Initialize the embeddings.
+
+        Args:
+            size: Number of dimensions
+            latency: Seconds per embedding call
+        """
+        self.size = size
+        self.latency = latency
+
+    def embed_text(self, text: str) -> list[float]:
+        """Embed a single text, without the simulated latency."""
+        words = WORD_PATTERN.findall(text.lower())
+        features = [*words, *(f"{a} {b}" for a, b in itertools.pairwise(words))]
+
+        vector = np.zeros(self.size, dtype=np.float32)
+        # Keeps empty texts off the zero vector, which has no direction
+        vector[0] = 1e-3
+        for feature in features:
+            digest = hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest()
+            value = int.from_bytes(digest, "little")
+            vector[value % self.size] += 1.0 if value >> 63 else -1.0
+
+        vector /= np.linalg.norm(vector)
+        return vector.tolist()
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        """Embed documents."""
+        time.sleep(self.latency)
+        return [self.embed_text(text) for text in texts]
+
+    def embed_query(self, text: str) -> list[float]:
+        """Embed a query."""
+        time.sleep(self.latency)
+        return self.embed_text(text)
+
+    async def aembed_documents(self, texts: list[str]) -> list[list[float]]:
+        """Embed documents (async)."""
+        await asyncio.sleep(self.latency)
+        return [self.embed_text(text) for text in texts]
+
+    async def aembed_query(self, text: str) -> list[float]:
+        """Embed a query (async)."""
+        await asyncio.sleep(self.latency)
+        return self.embed_text(text)
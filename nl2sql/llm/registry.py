@@ -0,0 +1,295 @@
+"""Process-wide registry of chat models.
+
+Chat models are built once per (model, provider, temperature, output mode,
+retries) and reused by every node and request. Models of providers that accept
+custom HTTP clients share a single keep-alive connection pool, so provider
+connections survive across calls instead of being set up per request.
+
+With `llm.resilience.enabled`, calls are retried, hedged and fall back to a
+cheaper model (see `nl2sql.llm.resilience`).
+
+With `llm.fake.enabled`, every role gets a `FakeChatModel` and the embeddings
+are `HashingEmbeddings` (see `nl2sql.llm.fake`).
+"""
+
+import threading
+from functools import partial
+
+import httpx
+from langchain.chat_models import init_chat_model
+from langchain.embeddings import init_embeddings
+from langchain_core.embeddings import Embeddings
+from langchain_core.language_models import BaseChatModel
+from langchain_core.runnables import Runnable
+from loguru import logger
+
+from nl2sql.config import load_llm_config
+from nl2sql.llm.fake import FakeChatModel, FakeResponder, HashingEmbeddings
+from nl2sql.llm.resilience import LatencyTracker, ResiliencePolicy, ResilientModel
+
+# Providers whose chat models accept `http_client` / `http_async_client`
+HTTP_CLIENT_PROVIDERS = {"openai"}
+
+# Providers that only report token usage of streamed responses on request
+STREAM_USAGE_PROVIDERS = {"openai"}
+
+
+class ModelRegistry:
+    """Build each chat model once and share it across requests.
+
+    Timeouts are applied per call, as a request option, rather than per model:
+    a model per distinct timeout would defeat the reuse (and each would get its
+    own HTTP client).
+    """
+
+    def __init__(self, config: dict) -> None:
+        """Initialize an empty registry from the LLM config."""
+        self.config = config
+        self._models: dict[tuple, Runnable] = {}
+        self._lock = threading.Lock()
+        self._http_client: httpx.Client | None = None
+        self._http_async_client: httpx.AsyncClient | None = None
+        self._fake_responder: FakeResponder | None = None
+
+        resilience_config = config.get("resilience", {})
+        self.resilience = (
+            ResiliencePolicy(resilience_config)
+            if resilience_config.get("enabled", False)
+            else None
+        )
+        self._latencies: dict[str, LatencyTracker] = {}
+
+    @property
+    def fake(self) -> bool:
+        """Whether the offline fake models replace the configured providers."""
+        return self.config.get("fake", {}).get("enabled", False)
+
+    def spec(self, role: str) -> dict:
+        """Model parameters of an agent role, with defaults filled in."""
+        spec = self.config["models"][role]
+        return {
+            "model": spec["model"],
+            # Fakes keep the model name, so metrics stay broken down per model
+            "provider": "fake" if self.fake else spec["provider"],
+            "temperature": spec.get("temperature", 0),
+            "output": spec.get("output", "text"),
+        }
+
+    def fallback_spec(self, role: str) -> dict | None:
+        """Parameters of the fallback model of an agent role, if it has one."""
+        fallback = self.resilience.fallbacks.get(role) if self.resilience else None
+        if fallback is None:
+            return None
+        spec = self.spec(role)
+        return {
+            **spec,
+            "model": fallback["model"],
+            "provider": "fake" if self.fake else fallback["provider"],
+            "temperature": fallback.get("temperature", spec["temperature"]),
+        }
+
+    def get(self, role: str, timeout: float | None = None) -> Runnable:
+        """Get the model configured for an agent role.
+
+        Args:
+            role: Key under `llm.models` in the LLM config
+            timeout: Per-call timeout in seconds. Calls with a timeout run under
+                a deadline and use a model without client retries, since each
+                retry would get the full timeout again.
+
+        Returns:
+            The chat model, or a runnable returning a dict for `json_mode` roles.
+            With resilience enabled, a `ResilientModel` wrapping them.
+        """
+        spec = self.spec(role)
+        if self.resilience is None:
+            max_retries = 0 if timeout is not None else self.config["max_retries"]
+            return self._get_for_spec(spec, timeout, max_retries=max_retries)
+
+        # Retries are made by the resilient model, not by the provider client
+        fallback = self.fallback_spec(role)
+        return ResilientModel(
+            role,
+            model=partial(self._get_for_spec, spec, max_retries=0),
+            policy=self.resilience,
+            latency=self._latency(role),
+            timeout=timeout,
+            fallback=(
+                partial(self._get_for_spec, fallback, max_retries=0)
+                if fallback is not None
+                else None
+            ),
+            fallback_after=(
+                self.resilience.fallbacks[role]["after"]
+                if fallback is not None
+                else None
+            ),
+        )
+
+    def _latency(self, role: str) -> LatencyTracker:
+        """Recent call latencies of an agent role."""
+        latency = self._latencies.get(role)
+        if latency is None:
+            with self._lock:
+                latency = self._latencies.setdefault(
+                    role, LatencyTracker(self.resilience.window)
+                )
+        return latency
+
+    def _get_for_spec(
+        self, spec: dict, timeout: float | None, max_retries: int
+    ) -> Runnable:
+        """Get the model of a spec, bound to a per-call timeout if given."""
+        key = (
+            spec["model"],
+            spec["provider"],
+            spec["temperature"],
+            spec["output"],
+            max_retries,
+        )
+        if timeout is None:
+            return self._get_or_build(key)
+
+        # Forwarded to the provider client as a per-request option
+        base_model = self._get_base_model(*key[:3], max_retries=key[4])
+        if key[3] == "json_mode":
+            return base_model.with_structured_output(
+                method="json_mode", timeout=timeout
+            )
+        return base_model.bind(timeout=timeout)
+
+    def _get_or_build(self, key: tuple) -> Runnable:
+        """Return the cached model for `key`, building it on first use."""
+        model = self._models.get(key)
+        if model is not None:
+            return model
+
+        model_name, provider, temperature, output, max_retries = key
+        base_model = self._get_base_model(
+            model_name, provider, temperature, max_retries=max_retries
+        )
+        if output == "json_mode":
+            # Returns the parsed JSON object as a dict
+            model = base_model.with_structured_output(method="json_mode")
+        else:
+            model = base_model
+        return self._models.setdefault(key, model)
+
+    def _get_base_model(
+        self, model: str, provider: str, temperature: float, max_retries: int
+    ) -> BaseChatModel:
+        """Return the cached chat model, building it on first use."""
+        key = (model, provider, temperature, "text", max_retries)
+        with self._lock:
+            if key not in self._models:
+                logger.debug(
+                    f"🔄 Building chat model {provider}:{model} (T={temperature})"
+                )
+                if provider == "fake":
+                    self._models[key] = self._build_fake_model(model)
+                    return self._models[key]
+                self._models[key] = init_chat_model(
+                    model=model,
+                    model_provider=provider,
+                    temperature=temperature,
+                    max_retries=max_retries,
+                    **self._http_clients(provider),
+                    **(
+                        {"stream_usage": True}
+                        if provider in STREAM_USAGE_PROVIDERS
+                        else {}
+                    ),
+                )
+            return self._models[key]
+
+    def _build_fake_model(self, model: str) -> FakeChatModel:
+        """Build an offline chat model. Called with the lock held."""
+        fake_config = self.config["fake"]
+        if self._fake_responder is None:
+            self._fake_responder = FakeResponder.from_yaml(
+                fake_config["responses_path"]
+            )
+        return FakeChatModel(
+            responder=self._fake_responder,
+            model=model,
+            latency=fake_config["latency"],
+            jitter=fake_config["jitter"],
+            chunk_latency=fake_config["chunk_latency"],
+        )
+
+    def _http_clients(self, provider: str) -> dict:
+        """Shared keep-alive HTTP clients for providers that accept them.
+
+        Called with the lock held.
+        """
+        if provider not in HTTP_CLIENT_PROVIDERS:
+            return {}
+
+        if self._http_client is None:
+            http_config = self.config["http"]
+            limits = httpx.Limits(
+                max_connections=http_config["max_connections"],
+                max_keepalive_connections=http_config["max_keepalive_connections"],
+                keepalive_expiry=http_config["keepalive_expiry"],
+            )
+            timeout = httpx.Timeout(http_config["timeout"])
+            self._http_client = httpx.Client(
+                limits=limits, timeout=timeout, follow_redirects=True
+            )
+            self._http_async_client = httpx.AsyncClient(
+                limits=limits, timeout=timeout, follow_redirects=True
+            )
+
+        return {
+            "http_client": self._http_client,
+            "http_async_client": self._http_async_client,
+        }
+
+    async def aclose(self) -> None:
+        """Close the shared HTTP clients and drop the cached models."""
+        with self._lock:
+            self._models.clear()
+            http_client, self._http_client = self._http_client, None
+            http_async_client, self._http_async_client = self._http_async_client, None
+
+        if http_client is not None:
+            http_client.close()
+        if http_async_client is not None:
+            await http_async_client.aclose()
+
+
+# Process-wide model registry
+model_registry = ModelRegistry(load_llm_config())
+
+
+def get_chat_model(role: str, timeout: float | None = None) -> Runnable:
+    """Get the shared model of an agent role (see `ModelRegistry.get`)."""
+    return model_registry.get(role, timeout=timeout)
+
+
+def create_embeddings(config: dict) -> Embeddings:
+    """Build the embedding model configured in the LLM config.
+
+    Args:
+        config: LLM config
+
+    Returns:
+        `HashingEmbeddings` when `fake.enabled`, otherwise the provider model
+    """
+    fake_config = config.get("fake", {})
+    if fake_config.get("enabled", False):
+        logger.warning("⚠️ Using fake embeddings, index the vector store with them")
+        return HashingEmbeddings(
+            size=fake_config["embedding_size"],
+            latency=fake_config["embedding_latency"],
+        )
+
+    embeddings_config = config["embeddings"]
+    return init_embeddings(
+        embeddings_config["model"], provider=embeddings_config["provider"]
+    )
+
+
+def get_embeddings() -> Embeddings:
+    """Build the embedding model of the process-wide LLM config."""
+    return create_embeddings(model_registry.config)
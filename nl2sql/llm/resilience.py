@@ -0,0 +1,662 @@
+"""Retries, hedged requests and fallback models for LLM calls.
+
+Provider latency has a long tail: most completions of a role take about the
+same time, a few take many times longer. `ResilientModel` wraps the model of an
+agent role and, within the timeout of the call:
+
+- retries failed attempts worth retrying (timeouts, connection errors, rate
+  limits, server errors) after an exponential backoff with full jitter
+- hedges: when the call has not responded after the role's recent latency
+  percentile, sends a duplicate request; the first response wins and the
+  other attempts are cancelled
+- falls back to a cheaper or faster model when the call has not responded
+  within a budget, or when the role's model fails for good
+
+For streamed calls the first token counts as the response, and only that
+attempt streams to the client: the handlers streaming to it (e.g. LangGraph's
+messages stream) are gated so that the tokens and answers of the other
+attempts are dropped. Sync calls run their attempts on worker threads of their
+own, where losing attempts cannot be interrupted: they finish in the
+background, within the timeout of the call, and their results are discarded.
+"""
+
+import asyncio
+import random
+import threading
+import time
+from collections import deque
+from collections.abc import Callable
+from concurrent.futures import Future
+from typing import Any
+
+import httpx
+import numpy as np
+from langchain_core.callbacks import (
+    AsyncCallbackHandler,
+    BaseCallbackHandler,
+    BaseCallbackManager,
+)
+from langchain_core.language_models import LanguageModelInput
+from langchain_core.messages import BaseMessage
+from langchain_core.outputs import LLMResult
+from langchain_core.runnables import Runnable, RunnableConfig
+from langchain_core.runnables.config import (
+    ContextThreadPoolExecutor,
+    ensure_config,
+    patch_config,
+)
+from langchain_core.tracers._streaming import _StreamingCallbackHandler
+from loguru import logger
+
+from nl2sql.metrics import LLM_ATTEMPTS
+
+# HTTP statuses of transient provider errors
+RETRYABLE_STATUS_CODES = frozenset({408, 409, 429, 500, 502, 503, 504})
+# Client errors raised without a status code (OpenAI-compatible clients)
+RETRYABLE_ERROR_NAMES = frozenset({"APIConnectionError", "APITimeoutError"})
+
+# Set in the response metadata of messages answered by the fallback model
+FALLBACK_METADATA_KEY = "llm_fallback"
+
+
+def is_retryable(error: BaseException) -> bool:
+    """Whether a failed attempt may succeed when tried again."""
+    if isinstance(error, TimeoutError | ConnectionError | httpx.TransportError):
+        return True
+    if getattr(error, "status_code", None) in RETRYABLE_STATUS_CODES:
+        return True
+    return any(cls.__name__ in RETRYABLE_ERROR_NAMES for cls in type(error).__mro__)
+
+
+def backoff_delay(retry: int, base_delay: float, max_delay: float) -> float:
+    """Exponential backoff with full jitter before the `retry`-th retry (from 0)."""
+    return random.uniform(0, min(max_delay, base_delay * 2**retry))
+
+
+class LatencyTracker:
+    """Latencies of the recent successful calls of a role."""
+
+    def __init__(self, window: int) -> None:
+        """Keep the last `window` latencies."""
+        self._latencies: deque[float] = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        """Number of recorded latencies."""
+        return len(self._latencies)
+
+    def record(self, seconds: float) -> None:
+        """Record the latency of a call."""
+        with self._lock:
+            self._latencies.append(seconds)
+
+    def percentile(self, q: float) -> float:
+        """The `q`-th percentile of the recorded latencies."""
+        with self._lock:
+            latencies = list(self._latencies)
+        return float(np.percentile(latencies, q)) if latencies else 0.0
+
+
+class ResiliencePolicy:
+    """Retry, hedging and fallback settings (`llm.resilience` config)."""
+
+    def __init__(self, config: dict) -> None:
+        """Read the settings from the resilience config."""
+        retry_config = config["retry"]
+        self.max_attempts: int = retry_config["max_attempts"]
+        self.base_delay: float = retry_config["base_delay"]
+        self.max_delay: float = retry_config["max_delay"]
+
+        hedging_config = config["hedging"]
+        self.hedge_roles: set[str] = set(hedging_config["roles"])
+        self.percentile: float = hedging_config["percentile"]
+        self.window: int = hedging_config["window"]
+        self.min_samples: int = hedging_config["min_samples"]
+        self.initial_delay: float = hedging_config["initial_delay"]
+        self.min_delay: float = hedging_config["min_delay"]
+        self.max_hedges: int = hedging_config["max_hedges"]
+
+        self.fallbacks: dict[str, dict] = config.get("fallbacks") or {}
+
+    def hedge_delay(self, role: str, latency: LatencyTracker) -> float | None:
+        """Seconds before a call of the role is hedged, None if never."""
+        if role not in self.hedge_roles or not self.max_hedges:
+            return None
+        if len(latency) < self.min_samples:
+            return self.initial_delay
+        return max(self.min_delay, latency.percentile(self.percentile))
+
+
+class _Attempt:
+    """An in-flight request of a call."""
+
+    def __init__(self, kind: str) -> None:
+        self.kind = kind
+        self.started = time.monotonic()
+
+
+class _CallState:
+    """Decides which attempts of a call to start, and when.
+
+    Times are `time.monotonic()` seconds. Not thread-safe: the drivers call it
+    from a single thread, except for `claim_stream`.
+    """
+
+    def __init__(
+        self,
+        policy: ResiliencePolicy,
+        timeout: float | None,
+        hedge_delay: float | None,
+        fallback_after: float | None,
+    ) -> None:
+        now = time.monotonic()
+        self.policy = policy
+        self.deadline = now + timeout if timeout is not None else None
+        self.hedge_delay = hedge_delay
+        self.hedge_at = now + hedge_delay if hedge_delay is not None else None
+        self.fallback_at = now + fallback_after if fallback_after is not None else None
+        self.retry_at: float | None = None
+        self.failures = 0
+        self.hedges = 0
+        self.error: BaseException | None = None
+        # Attempt whose tokens are being streamed, it wins unless it fails
+        self.streaming: _Attempt | None = None
+        self._stream_lock = threading.Lock()
+
+    def claim_stream(self, attempt: _Attempt) -> bool:
+        """Make `attempt` the streaming one, unless another already is."""
+        with self._stream_lock:
+            if self.streaming is None:
+                self.streaming = attempt
+                return True
+            return False
+
+    def remaining(self, now: float) -> float | None:
+        """Seconds left before the deadline, None if unbounded."""
+        return None if self.deadline is None else self.deadline - now
+
+    def due(self, now: float, in_flight: int) -> list[str]:
+        """Kinds of the attempts to start now."""
+        kinds = []
+        if self.retry_at is not None and now >= self.retry_at:
+            self.retry_at = None
+            kinds.append("retry")
+            # Give the retry the same head start as the first attempt
+            if self.hedge_at is not None:
+                self.hedge_at = max(self.hedge_at, now + self.hedge_delay)
+
+        # A streaming attempt has responded, nothing to race it with
+        if self.streaming is not None:
+            return kinds
+
+        if self.hedge_at is not None and now >= self.hedge_at and in_flight:
+            self.hedges += 1
+            self.hedge_at = (
+                now + self.hedge_delay if self.hedges < self.policy.max_hedges else None
+            )
+            kinds.append("hedge")
+        if self.fallback_at is not None and now >= self.fallback_at:
+            self.fallback_at = None
+            kinds.append("fallback")
+        return kinds
+
+    def wait_time(self, now: float, in_flight: int) -> float | None:
+        """Seconds until the next planned attempt or the deadline."""
+        times = [self.retry_at, self.deadline]
+        if self.streaming is None:
+            times.append(self.fallback_at)
+            # Hedges only duplicate attempts in flight
+            if in_flight:
+                times.append(self.hedge_at)
+        times = [t for t in times if t is not None]
+        return max(min(times) - now, 0) if times else None
+
+    def on_failure(self, attempt: _Attempt, error: BaseException, now: float) -> None:
+        """Plan a retry or the fallback after a failed attempt."""
+        self.error = error
+        if attempt is self.streaming:
+            self.streaming = None
+        # Another attempt is already answering
+        if self.streaming is not None or attempt.kind == "fallback":
+            return
+
+        self.failures += 1
+        if is_retryable(error) and self.failures < self.policy.max_attempts:
+            retry_at = now + backoff_delay(
+                self.failures - 1, self.policy.base_delay, self.policy.max_delay
+            )
+            if self.deadline is None or retry_at < self.deadline:
+                self.retry_at = min(self.retry_at or retry_at, retry_at)
+                return
+
+        # The role's model is out of tries, fall back right away
+        if self.fallback_at is not None:
+            self.fallback_at = now
+
+    def exhausted(self, in_flight: int, now: float) -> bool:
+        """Whether the call has nothing left to wait for."""
+        if self.deadline is not None and now >= self.deadline:
+            return True
+        return not in_flight and self.retry_at is None and self.fallback_at is None
+
+    def final_error(self, role: str) -> BaseException:
+        """The error to raise when the call is exhausted."""
+        return self.error or TimeoutError(f"LLM call ({role}) timed out")
+
+
+class _AttemptStream:
+    """Claims the stream of a call for an attempt, on its first output."""
+
+    def __init__(
+        self, attempt: _Attempt, state: _CallState, on_claim: Callable[[], None]
+    ) -> None:
+        self.attempt = attempt
+        self.state = state
+        self._on_claim = on_claim
+
+    def claim(self) -> bool:
+        """Claim the stream, unless another attempt holds it.
+
+        Returns:
+            Whether the attempt holds the stream
+        """
+        if self.state.claim_stream(self.attempt):
+            self._on_claim()
+        return self.holds()
+
+    def holds(self) -> bool:
+        """Whether the attempt holds the stream."""
+        return self.state.streaming is self.attempt
+
+
+class _FirstTokenHandler(BaseCallbackHandler):
+    """Calls back once, on the first non-empty streamed token."""
+
+    run_inline = True
+
+    def __init__(self, on_first_token: Callable[[], object]) -> None:
+        self._on_first_token = on_first_token
+        self._seen = False
+
+    def on_llm_new_token(self, token: str, **kwargs: object) -> None:
+        if token and not self._seen:
+            self._seen = True
+            self._on_first_token()
+
+
+class _StreamGate(BaseCallbackHandler, _StreamingCallbackHandler):
+    """Passes a streaming handler the output of the attempt holding the stream.
+
+    Other events are passed on as is. Tokens of the other attempts are
+    dropped, and so are their answers, which streaming handlers emit on
+    `on_llm_end` when they saw no tokens.
+    """
+
+    run_inline = True
+
+    def __init__(self, handler: BaseCallbackHandler, stream: _AttemptStream) -> None:
+        self.handler = handler
+        self.stream = stream
+        self.raise_error = handler.raise_error
+
+    @property
+    def ignore_llm(self) -> bool:
+        return self.handler.ignore_llm
+
+    @property
+    def ignore_chat_model(self) -> bool:
+        return self.handler.ignore_chat_model
+
+    @property
+    def ignore_chain(self) -> bool:
+        return self.handler.ignore_chain
+
+    def tap_output_aiter(self, run_id: Any, output: Any) -> Any:  # noqa: ANN401
+        return self.handler.tap_output_aiter(run_id, output)
+
+    def tap_output_iter(self, run_id: Any, output: Any) -> Any:  # noqa: ANN401
+        return self.handler.tap_output_iter(run_id, output)
+
+    def on_chat_model_start(self, *args: Any, **kwargs: Any) -> Any:  # noqa: ANN401
+        return self.handler.on_chat_model_start(*args, **kwargs)
+
+    def on_llm_start(self, *args: Any, **kwargs: Any) -> Any:  # noqa: ANN401
+        return self.handler.on_llm_start(*args, **kwargs)
+
+    def on_llm_new_token(self, token: str, **kwargs: Any) -> Any:  # noqa: ANN401
+        if (token and self.stream.claim()) or self.stream.holds():
+            return self.handler.on_llm_new_token(token, **kwargs)
+        return None
+
+    def on_llm_end(self, response: LLMResult, **kwargs: Any) -> Any:  # noqa: ANN401
+        # An attempt answering without streaming claims the stream too
+        if self.stream.claim():
+            return self.handler.on_llm_end(response, **kwargs)
+        # Lets the handler forget the run, without an answer to emit
+        return self.handler.on_llm_end(LLMResult(generations=[]), **kwargs)
+
+    def on_llm_error(self, *args: Any, **kwargs: Any) -> Any:  # noqa: ANN401
+        return self.handler.on_llm_error(*args, **kwargs)
+
+    def on_chain_start(self, *args: Any, **kwargs: Any) -> Any:  # noqa: ANN401
+        return self.handler.on_chain_start(*args, **kwargs)
+
+    def on_chain_end(self, *args: Any, **kwargs: Any) -> Any:  # noqa: ANN401
+        return self.handler.on_chain_end(*args, **kwargs)
+
+    def on_chain_error(self, *args: Any, **kwargs: Any) -> Any:  # noqa: ANN401
+        return self.handler.on_chain_error(*args, **kwargs)
+
+
+def _gate_handlers(
+    handlers: list[BaseCallbackHandler],
+    stream: _AttemptStream,
+    gates: dict[int, _StreamGate],
+) -> list[BaseCallbackHandler]:
+    """Gate the (sync) handlers streaming to the client, keep the others."""
+    return [
+        gates.setdefault(id(handler), _StreamGate(handler, stream))
+        if isinstance(handler, _StreamingCallbackHandler)
+        and not isinstance(handler, AsyncCallbackHandler)
+        else handler
+        for handler in handlers
+    ]
+
+
+def _attempt_config(
+    config: RunnableConfig, kind: str, stream: _AttemptStream
+) -> RunnableConfig:
+    """Config of an attempt: kind tag, first-token handler and stream gates."""
+    handler = _FirstTokenHandler(stream.claim)
+    gates: dict[int, _StreamGate] = {}
+    callbacks = config.get("callbacks")
+    if isinstance(callbacks, BaseCallbackManager):
+        callbacks = callbacks.copy()
+        callbacks.handlers = _gate_handlers(callbacks.handlers, stream, gates)
+        callbacks.inheritable_handlers = _gate_handlers(
+            callbacks.inheritable_handlers, stream, gates
+        )
+        callbacks.add_handler(handler, inherit=True)
+    else:
+        callbacks = [*_gate_handlers(callbacks or [], stream, gates), handler]
+    attempt_config = patch_config(config, callbacks=callbacks)
+    attempt_config["tags"] = [*attempt_config.get("tags", []), f"llm_attempt:{kind}"]
+    return attempt_config
+
+
+def _consume_result(future: Future | asyncio.Future) -> None:
+    """Retrieve the outcome of an abandoned attempt, so it isn't reported."""
+    if not future.cancelled():
+        future.exception()
+
+
+# Runs an attempt: (model, attempt kind, attempt stream) -> result
+Launch = Callable[[Runnable, str, _AttemptStream], Any]
+
+
+class _Race:
+    """Pending attempts of a call, run as threads or tasks by subclasses."""
+
+    def __init__(self, state: _CallState) -> None:
+        self.state = state
+        self.pending: dict[Future | asyncio.Task, _Attempt] = {}
+        # Streaming attempt the others were already cancelled for
+        self.handled_stream: _Attempt | None = None
+
+    def new_stream(self) -> bool:
+        """Whether an attempt started streaming since the last check."""
+        streaming = self.state.streaming
+        return streaming is not None and streaming is not self.handled_stream
+
+    def cancel(self, keep: _Attempt | None = None) -> list[_Attempt]:
+        """Abandon the pending attempts but `keep`, and return them."""
+        cancelled = []
+        for handle, attempt in list(self.pending.items()):
+            if attempt is not keep:
+                handle.cancel()
+                handle.add_done_callback(_consume_result)
+                cancelled.append(self.pending.pop(handle))
+        return cancelled
+
+    def finished(self) -> list[tuple[_Attempt, BaseException | None, Any]]:
+        """Pop the finished attempts with their error or result."""
+        finished = []
+        for handle, attempt in list(self.pending.items()):
+            if handle.done():
+                del self.pending[handle]
+                error = handle.exception()
+                finished.append((attempt, error, None if error else handle.result()))
+        # The streaming attempt's answer is the one the client has seen
+        return sorted(finished, key=lambda item: item[0] is not self.state.streaming)
+
+
+class _ThreadRace(_Race):
+    """Attempts of a sync call, on worker threads."""
+
+    def __init__(self, state: _CallState) -> None:
+        super().__init__(state)
+        self._changed = threading.Condition()
+        # Per call, so that abandoned attempts can't hold up other calls'
+        policy = state.policy
+        self._executor = ContextThreadPoolExecutor(
+            max_workers=policy.max_attempts + policy.max_hedges + 1,
+            thread_name_prefix="llm-attempt",
+        )
+
+    def _notify(self, *_: object) -> None:
+        with self._changed:
+            self._changed.notify_all()
+
+    def start(self, attempt: _Attempt, run: Callable[[_AttemptStream], Any]) -> None:
+        """Start an attempt, `run` runs it given its stream."""
+        future = self._executor.submit(
+            run, _AttemptStream(attempt, self.state, self._notify)
+        )
+        future.add_done_callback(self._notify)
+        self.pending[future] = attempt
+
+    def close(self) -> None:
+        """Let the worker threads exit once their attempts are done."""
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def wait(self) -> list[tuple[_Attempt, BaseException | None, Any]]:
+        """Wait for a finished or streaming attempt, or the next planned one."""
+        with self._changed:
+            self._changed.wait_for(
+                lambda: self.new_stream() or any(f.done() for f in self.pending),
+                timeout=self.state.wait_time(time.monotonic(), len(self.pending)),
+            )
+        return self.finished()
+
+
+class _TaskRace(_Race):
+    """Attempts of an async call, as tasks."""
+
+    def __init__(self, state: _CallState) -> None:
+        super().__init__(state)
+        self._loop = asyncio.get_running_loop()
+        self._streamed = asyncio.Event()
+
+    def start(self, attempt: _Attempt, run: Callable[[_AttemptStream], Any]) -> None:
+        """Start an attempt, `run` returns its coroutine given its stream."""
+        stream = _AttemptStream(
+            attempt,
+            self.state,
+            lambda: self._loop.call_soon_threadsafe(self._streamed.set),
+        )
+        self.pending[asyncio.create_task(run(stream))] = attempt
+
+    async def wait(self) -> list[tuple[_Attempt, BaseException | None, Any]]:
+        """Wait for a finished or streaming attempt, or the next planned one."""
+        stream_waiter = asyncio.create_task(self._streamed.wait())
+        try:
+            await asyncio.wait(
+                {*self.pending, stream_waiter},
+                timeout=self.state.wait_time(time.monotonic(), len(self.pending)),
+                return_when=asyncio.FIRST_COMPLETED,
+            )
+        finally:
+            stream_waiter.cancel()
+        # Only a wakeup, the race reads the streaming attempt from the state
+        self._streamed.clear()
+        return self.finished()
+
+
+class ResilientModel(Runnable[LanguageModelInput, Any]):
+    """Model of an agent role, called with retries, hedging and a fallback.
+
+    Extra invoke kwargs (e.g. bound tools) are passed on to every attempt.
+    """
+
+    def __init__(
+        self,
+        role: str,
+        model: Callable[[float | None], Runnable],
+        policy: ResiliencePolicy,
+        latency: LatencyTracker,
+        timeout: float | None = None,
+        fallback: Callable[[float | None], Runnable] | None = None,
+        fallback_after: float | None = None,
+    ) -> None:
+        """Initialize the model.
+
+        Args:
+            role: Agent role, for hedging settings, logs and metrics
+            model: Builds the role's model for an attempt with a timeout
+            policy: Retry, hedging and fallback settings
+            latency: Recent latencies of the role, updated by the calls
+            timeout: Seconds for the whole call, None if unbounded
+            fallback: Builds the fallback model for an attempt with a timeout
+            fallback_after: Seconds without a response before falling back
+        """
+        self.role = role
+        self.model = model
+        self.policy = policy
+        self.latency = latency
+        self.timeout = timeout
+        self.fallback = fallback
+        self.fallback_after = fallback_after
+
+    @property
+    def name(self) -> str:
+        """Run name, per role."""
+        return f"resilient_{self.role}"
+
+    def invoke(
+        self,
+        input: LanguageModelInput,
+        config: RunnableConfig | None = None,
+        **kwargs: Any,  # noqa: ANN401
+    ) -> Any:  # noqa: ANN401
+        """Call the model, racing attempts on worker threads."""
+        config = ensure_config(config)
+        race = _ThreadRace(self._call_state())
+
+        def launch(runnable: Runnable, kind: str, stream: _AttemptStream) -> Any:  # noqa: ANN401
+            attempt_config = _attempt_config(config, kind, stream)
+            return runnable.invoke(input, attempt_config, **kwargs)
+
+        try:
+            self._start(race, "primary", launch)
+            while True:
+                answered, result = self._settle(race, race.wait())
+                if answered:
+                    return result
+                self._advance(race, launch)
+        finally:
+            self._abandon(race)
+            race.close()
+
+    async def ainvoke(
+        self,
+        input: LanguageModelInput,
+        config: RunnableConfig | None = None,
+        **kwargs: Any,  # noqa: ANN401
+    ) -> Any:  # noqa: ANN401
+        """Call the model, racing attempts as tasks."""
+        config = ensure_config(config)
+        race = _TaskRace(self._call_state())
+
+        def launch(runnable: Runnable, kind: str, stream: _AttemptStream) -> Any:  # noqa: ANN401
+            attempt_config = _attempt_config(config, kind, stream)
+            return runnable.ainvoke(input, attempt_config, **kwargs)
+
+        try:
+            self._start(race, "primary", launch)
+            while True:
+                answered, result = self._settle(race, await race.wait())
+                if answered:
+                    return result
+                self._advance(race, launch)
+        finally:
+            self._abandon(race)
+
+    def _call_state(self) -> _CallState:
+        return _CallState(
+            self.policy,
+            self.timeout,
+            self.policy.hedge_delay(self.role, self.latency),
+            self.fallback_after if self.fallback is not None else None,
+        )
+
+    def _start(self, race: _ThreadRace | _TaskRace, kind: str, launch: Launch) -> None:
+        """Start an attempt, limited to the remaining time of the call."""
+        remaining = race.state.remaining(time.monotonic())
+        if remaining is not None and remaining <= 0:
+            return
+        if kind == "fallback":
+            logger.warning(f"⚠️ Falling back to the fallback model ({self.role})")
+            runnable = self.fallback(remaining)
+        else:
+            if kind != "primary":
+                logger.debug(f"🔄 Starting a {kind} request ({self.role})")
+            runnable = self.model(remaining)
+        race.start(_Attempt(kind), lambda stream: launch(runnable, kind, stream))
+
+    def _settle(
+        self,
+        race: _Race,
+        finished: list[tuple[_Attempt, BaseException | None, Any]],
+    ) -> tuple[bool, Any]:
+        """Account for streaming and finished attempts.
+
+        Returns:
+            Whether the call is answered, and the answer
+        """
+        if race.new_stream():
+            race.handled_stream = race.state.streaming
+            for attempt in race.cancel(keep=race.state.streaming):
+                self._count(attempt, "cancelled")
+
+        now = time.monotonic()
+        for attempt, error, result in finished:
+            if error is None:
+                if attempt.kind != "fallback":
+                    self.latency.record(now - attempt.started)
+                elif isinstance(result, BaseMessage):
+                    result.response_metadata[FALLBACK_METADATA_KEY] = True
+                self._count(attempt, "won")
+                self._abandon(race)
+                return True, result
+
+            logger.warning(
+                f"⚠️ LLM {attempt.kind} request failed ({self.role}): {error}"
+            )
+            self._count(attempt, "failed")
+            race.state.on_failure(attempt, error, now)
+        return False, None
+
+    def _advance(self, race: _ThreadRace | _TaskRace, launch: Launch) -> None:
+        """Start the attempts due, raise if the call has nothing left to try."""
+        for kind in race.state.due(time.monotonic(), len(race.pending)):
+            self._start(race, kind, launch)
+        if race.state.exhausted(len(race.pending), time.monotonic()):
+            raise race.state.final_error(self.role)
+
+    def _abandon(self, race: _Race) -> None:
+        """Cancel the pending attempts."""
+        for attempt in race.cancel():
+            self._count(attempt, "cancelled")
+
+    def _count(self, attempt: _Attempt, outcome: str) -> None:
+        LLM_ATTEMPTS.labels(role=self.role, kind=attempt.kind, outcome=outcome).inc()
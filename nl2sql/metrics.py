@@ -0,0 +1,252 @@
+"""Prometheus metrics of the NL2SQL agent.
+
+Metrics live on the default `prometheus_client` registry and are served by the
+API's `/metrics` endpoint. Each worker process keeps its own values, so scrape
+every worker (or aggregate them) when running several.
+
+Graph node and LLM call timings are recorded by `MetricsCallbackHandler`,
+which has to be attached to the run through `config["callbacks"]`. SQL
+validation, execution and fix-loop metrics are recorded by the nodes.
+"""
+
+import time
+from typing import Any
+from uuid import UUID
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.messages import BaseMessage
+from langchain_core.outputs import LLMResult
+from prometheus_client import Counter, Histogram
+
+# Node runs range from microseconds (routing) to minutes (LLM tool loops)
+LATENCY_BUCKETS = (
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+    30.0,
+    60.0,
+    120.0,
+)
+
+NODE_DURATION = Histogram(
+    "nl2sql_node_duration_seconds",
+    "Duration of graph node runs",
+    ["node"],
+    buckets=LATENCY_BUCKETS,
+)
+LLM_DURATION = Histogram(
+    "nl2sql_llm_request_duration_seconds",
+    "Duration of LLM calls",
+    ["model"],
+    buckets=LATENCY_BUCKETS,
+)
+LLM_TOKENS = Counter(
+    "nl2sql_llm_tokens",
+    "Tokens used by LLM calls",
+    ["model", "type"],
+)
+LLM_ATTEMPTS = Counter(
+    "nl2sql_llm_attempts",
+    "LLM requests by kind (primary, retry, hedge, fallback) and outcome",
+    ["role", "kind", "outcome"],
+)
+SQL_VALIDATION_DURATION = Histogram(
+    "nl2sql_sql_validation_duration_seconds",
+    "Duration of SQL syntax validations against the database",
+    buckets=LATENCY_BUCKETS,
+)
+SQL_LOCAL_CHECKS = Counter(
+    "nl2sql_sql_local_checks",
+    "Local SQL checks by outcome (passed, or the kind of error found)",
+    ["outcome"],
+)
+SQL_COST_DECISIONS = Counter(
+    "nl2sql_sql_cost_decisions",
+    "Cost guard decisions (approved, confirm, limited, rejected, unknown)",
+    ["decision"],
+)
+SQL_EXECUTION_DURATION = Histogram(
+    "nl2sql_sql_execution_duration_seconds",
+    "Duration of SQL query executions",
+    ["status"],
+    buckets=LATENCY_BUCKETS,
+)
+SQL_FIX_ATTEMPTS = Histogram(
+    "nl2sql_sql_fix_attempts",
+    "LLM fix attempts made by the SQL syntax validator per query",
+    ["outcome"],
+    buckets=(0, 1, 2, 3, 5),
+)
+
+
+def graph_node(tags: list[str] | None, metadata: dict[str, Any] | None) -> str | None:
+    """Name of the graph node a chain run is, or None for other runs.
+
+    Runs nested in a node inherit its metadata, but not the step tag LangGraph
+    puts on the node run itself.
+    """
+    node = (metadata or {}).get("langgraph_node")
+    if node is not None and any(tag.startswith("graph:step:") for tag in tags or []):
+        return node
+    return None
+
+
+class MetricsCallbackHandler(BaseCallbackHandler):
+    """Times the graph nodes and LLM calls of the runs it is attached to."""
+
+    # Recording is cheap, run on the caller's thread for accurate timings
+    run_inline = True
+
+    def __init__(self) -> None:
+        """Initialize the pending node and LLM runs."""
+        self._nodes: dict[UUID, tuple[str, float]] = {}
+        self._llm_calls: dict[UUID, tuple[str, float]] = {}
+
+    def on_chain_start(
+        self,
+        serialized: dict[str, Any] | None,
+        inputs: dict[str, Any],
+        *,
+        run_id: UUID,
+        tags: list[str] | None = None,
+        metadata: dict[str, Any] | None = None,
+        **kwargs: object,
+    ) -> None:
+        """Start timing a run if it is a graph node."""
+        node = graph_node(tags, metadata)
+        if node is not None:
+            self._nodes[run_id] = (node, time.perf_counter())
+
+    def on_chain_end(
+        self,
+        outputs: dict[str, Any],
+        *,
+        run_id: UUID,
+        **kwargs: object,
+    ) -> None:
+        """Record the duration of a finished node."""
+        self._end_node(run_id)
+
+    def on_chain_error(
+        self,
+        error: BaseException,
+        *,
+        run_id: UUID,
+        **kwargs: object,
+    ) -> None:
+        """Record the duration of a failed (or interrupted) node."""
+        self._end_node(run_id)
+
+    def on_chat_model_start(
+        self,
+        serialized: dict[str, Any],
+        messages: list[list[BaseMessage]],
+        *,
+        run_id: UUID,
+        metadata: dict[str, Any] | None = None,
+        **kwargs: object,
+    ) -> None:
+        """Start timing a chat model call."""
+        self._start_llm(run_id, metadata, kwargs)
+
+    def on_llm_start(
+        self,
+        serialized: dict[str, Any],
+        prompts: list[str],
+        *,
+        run_id: UUID,
+        metadata: dict[str, Any] | None = None,
+        **kwargs: object,
+    ) -> None:
+        """Start timing a completion model call."""
+        self._start_llm(run_id, metadata, kwargs)
+
+    def on_llm_end(
+        self,
+        response: LLMResult,
+        *,
+        run_id: UUID,
+        **kwargs: object,
+    ) -> None:
+        """Record the duration and token usage of a finished LLM call."""
+        model = self._end_llm(run_id)
+        if model is None:
+            return
+
+        input_tokens, output_tokens = _token_usage(response)
+        if input_tokens:
+            LLM_TOKENS.labels(model=model, type="prompt").inc(input_tokens)
+        if output_tokens:
+            LLM_TOKENS.labels(model=model, type="completion").inc(output_tokens)
+
+    def on_llm_error(
+        self,
+        error: BaseException,
+        *,
+        run_id: UUID,
+        **kwargs: object,
+    ) -> None:
+        """Record the duration of a failed LLM call."""
+        self._end_llm(run_id)
+
+    def _end_node(self, run_id: UUID) -> None:
+        """Observe the duration of a node run, if it was timed."""
+        entry = self._nodes.pop(run_id, None)
+        if entry is not None:
+            node, start = entry
+            NODE_DURATION.labels(node=node).observe(time.perf_counter() - start)
+
+    def _start_llm(
+        self, run_id: UUID, metadata: dict[str, Any] | None, kwargs: dict
+    ) -> None:
+        """Start timing an LLM call under its model name."""
+        params = kwargs.get("invocation_params") or {}
+        model = (
+            (metadata or {}).get("ls_model_name")
+            or params.get("model_name")
+            or params.get("model")
+            or "unknown"
+        )
+        self._llm_calls[run_id] = (model, time.perf_counter())
+
+    def _end_llm(self, run_id: UUID) -> str | None:
+        """Observe the duration of an LLM call and return its model name."""
+        entry = self._llm_calls.pop(run_id, None)
+        if entry is None:
+            return None
+        model, start = entry
+        LLM_DURATION.labels(model=model).observe(time.perf_counter() - start)
+        return model
+
+
+def _token_usage(response: LLMResult) -> tuple[int, int]:
+    """Prompt and completion tokens of an LLM result."""
+    input_tokens = output_tokens = 0
+    for generations in response.generations:
+        for generation in generations:
+            message = getattr(generation, "message", None)
+            usage = getattr(message, "usage_metadata", None)
+            if usage:
+                input_tokens += usage.get("input_tokens", 0)
+                output_tokens += usage.get("output_tokens", 0)
+    if input_tokens or output_tokens:
+        return input_tokens, output_tokens
+
+    # Providers reporting usage in the LLM output only
+    token_usage = (response.llm_output or {}).get("token_usage") or {}
+    return (
+        token_usage.get("prompt_tokens", 0),
+        token_usage.get("completion_tokens", 0),
+    )
+
+
+# Process-wide handler, attach with `config["callbacks"]`
+metrics_callback_handler = MetricsCallbackHandler()
@@ -0,0 +1,484 @@
+"""End-to-end latency benchmark of the NL2SQL agent graph.
+
+Replays the SQL example questions, plus a synthetic question set, through the
+compiled graph with the offline fake LLM and embeddings (`nl2sql.llm.fake`)
+and the local PostgreSQL database. Provider latency is then a fixed, known
+quantity, so the timings measure the agent's own overhead: prompt building,
+retrieval, validation, execution and checkpointing.
+
+For each concurrency level the benchmark reports end-to-end and per-node
+latency percentiles, throughput and memory high-water marks. Results are
+written as JSON for comparison across commits; `--baseline` compares a run
+with an earlier result and exits with an error on p95 regressions.
+
+The fake embeddings are indexed into a separate collection of the vector
+store, so the configured one is left untouched.
+
+Usage:
+    python scripts/benchmark.py --concurrency 1 4 16 --output benchmark.json
+    python scripts/benchmark.py --baseline benchmark.json --max-regression 0.2
+"""
+
+import argparse
+import asyncio
+import json
+import platform
+import random
+import resource
+import subprocess
+import sys
+import time
+import tracemalloc
+import uuid
+from collections import defaultdict
+from datetime import UTC, datetime
+from pathlib import Path
+from typing import Any
+from uuid import UUID
+
+import numpy as np
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.messages import HumanMessage
+from langgraph.checkpoint.memory import InMemorySaver
+from langgraph.checkpoint.postgres.aio import AsyncPostgresSaver
+from langgraph.graph.state import CompiledStateGraph
+from langgraph.types import Command
+from loguru import logger
+
+from nl2sql.agents.deadline import deadline_config
+from nl2sql.agents.graph import create_graph
+from nl2sql.agents.sql_cache import sql_cache
+from nl2sql.config import load_agent_config, load_api_config
+from nl2sql.database import PostgreSQLConnector
+from nl2sql.knowledge_base.data_dictionary import DataDictionary
+from nl2sql.knowledge_base.sql_examples import SQLExample
+from nl2sql.knowledge_base.vector_store import VectorStore
+from nl2sql.llm import model_registry, response_cache
+from nl2sql.metrics import graph_node
+
+DATA_DICTIONARY_PATH = "knowledge/data_dictionary.yml"
+SQL_EXAMPLES_PATH = "knowledge/sql_examples.yml"
+BENCHMARK_COLLECTION = "nl2sql_benchmark"
+PERCENTILES = (50, 95, 99)
+REQUEST_TIMEOUT = load_api_config()["request_timeout"]
+
+# Synthetic questions, filled in from the value lists below
+SYNTHETIC_TEMPLATES = [
+    "How many orders were delivered in {state} in {year}?",
+    "What is the average payment value for {payment_type} payments?",
+    "Which sellers in {state} have the most orders?",
+    "Show me the top {n} product categories by revenue in {year}",
+    "How many customers are there in {city}?",
+    "What is the average review score of orders shipped to {state}?",
+    "List the {n} most expensive products in the {category} category",
+    "How many marketing qualified leads came from {origin}?",
+    "Hello! What can you do?",
+    "Explain the last query",
+]
+SYNTHETIC_VALUES = {
+    "state": ["SP", "RJ", "MG", "RS", "PR", "BA"],
+    "year": ["2016", "2017", "2018"],
+    "payment_type": ["credit_card", "boleto", "voucher", "debit_card"],
+    "n": ["5", "10", "20"],
+    "city": ["sao paulo", "rio de janeiro", "curitiba", "salvador"],
+    "category": ["health_beauty", "watches_gifts", "bed_bath_table"],
+    "origin": ["organic_search", "paid_search", "social", "email"],
+}
+
+
+class NodeTimingHandler(BaseCallbackHandler):
+    """Collect the duration of every graph node run."""
+
+    run_inline = True
+
+    def __init__(self) -> None:
+        """Initialize empty timings."""
+        self.durations: dict[str, list[float]] = defaultdict(list)
+        self._pending: dict[UUID, tuple[str, float]] = {}
+
+    def on_chain_start(
+        self,
+        serialized: dict[str, Any] | None,
+        inputs: dict[str, Any],
+        *,
+        run_id: UUID,
+        tags: list[str] | None = None,
+        metadata: dict[str, Any] | None = None,
+        **kwargs: object,
+    ) -> None:
+        """Start timing a run if it is a graph node."""
+        node = graph_node(tags, metadata)
+        if node is not None:
+            self._pending[run_id] = (node, time.perf_counter())
+
+    def on_chain_end(
+        self, outputs: dict[str, Any], *, run_id: UUID, **kwargs: object
+    ) -> None:
+        """Record the duration of a finished node."""
+        self._end(run_id)
+
+    def on_chain_error(
+        self, error: BaseException, *, run_id: UUID, **kwargs: object
+    ) -> None:
+        """Record the duration of a failed (or interrupted) node."""
+        self._end(run_id)
+
+    def _end(self, run_id: UUID) -> None:
+        entry = self._pending.pop(run_id, None)
+        if entry is not None:
+            node, start = entry
+            self.durations[node].append(time.perf_counter() - start)
+
+
+def load_questions(synthetic: int, seed: int) -> list[str]:
+    """SQL example questions followed by `synthetic` generated ones."""
+    questions = [
+        example.question for example in SQLExample.from_yaml(SQL_EXAMPLES_PATH).values()
+    ]
+
+    rng = random.Random(seed)
+    for _ in range(synthetic):
+        template = rng.choice(SYNTHETIC_TEMPLATES)
+        values = {key: rng.choice(options) for key, options in SYNTHETIC_VALUES.items()}
+        questions.append(template.format(**values))
+    return questions
+
+
+def latency_summary(durations: list[float]) -> dict:
+    """Count, mean and percentiles of durations, in milliseconds."""
+    if not durations:
+        return {"count": 0}
+    values = np.asarray(durations) * 1000
+    return {
+        "count": len(values),
+        "mean_ms": round(float(values.mean()), 3),
+        **{f"p{p}_ms": round(float(np.percentile(values, p)), 3) for p in PERCENTILES},
+        "max_ms": round(float(values.max()), 3),
+    }
+
+
+def max_rss_mb() -> float:
+    """Peak resident set size of the process so far, in MB."""
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Reported in bytes on macOS and in kilobytes on Linux
+    return max_rss / 2**20 if sys.platform == "darwin" else max_rss / 2**10
+
+
+async def run_question(
+    graph: CompiledStateGraph, question: str, handler: NodeTimingHandler
+) -> dict:
+    """Run a question like the chat API does, approving the generated SQL."""
+    config = {
+        "configurable": {
+            "thread_id": f"benchmark_{uuid.uuid4().hex}",
+            **deadline_config(REQUEST_TIMEOUT),
+        },
+        "callbacks": [handler],
+    }
+    result = await graph.ainvoke(
+        {"messages": [HumanMessage(content=question)]}, config=config
+    )
+    if "__interrupt__" in result:
+        result = await graph.ainvoke(Command(resume="yes"), config=config)
+    return result
+
+
+async def run_level(
+    graph: CompiledStateGraph,
+    db_connector: PostgreSQLConnector,
+    questions: list[str],
+    concurrency: int,
+) -> dict:
+    """Run every question with up to `concurrency` graph runs at once.
+
+    Caches are cleared first, so every level starts from the same state.
+    """
+    if response_cache is not None:
+        response_cache.clear()
+    sql_cache.clear()
+    if db_connector.syntax_validator is not None:
+        db_connector.syntax_validator.clear()
+    if tracemalloc.is_tracing():
+        tracemalloc.reset_peak()
+
+    handler = NodeTimingHandler()
+    semaphore = asyncio.Semaphore(concurrency)
+    durations: list[float] = []
+    errors: dict[str, int] = defaultdict(int)
+
+    async def run(question: str) -> None:
+        async with semaphore:
+            start = time.perf_counter()
+            try:
+                await run_question(graph, question, handler)
+            except Exception as e:
+                errors[type(e).__name__] += 1
+                logger.warning(f"⚠️ Benchmark question failed: {question!r}: {e}")
+                return
+            durations.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(run(question) for question in questions))
+    wall_time = time.perf_counter() - start
+
+    memory = {"max_rss_mb": round(max_rss_mb(), 1)}
+    if tracemalloc.is_tracing():
+        memory["python_heap_peak_mb"] = round(
+            tracemalloc.get_traced_memory()[1] / 2**20, 1
+        )
+
+    return {
+        "concurrency": concurrency,
+        "requests": len(questions),
+        "errors": dict(errors),
+        "wall_time_s": round(wall_time, 3),
+        "throughput_rps": round(len(durations) / wall_time, 3),
+        "end_to_end": latency_summary(durations),
+        "nodes": {
+            node: latency_summary(values)
+            for node, values in sorted(handler.durations.items())
+        },
+        "memory": memory,
+    }
+
+
+def git_commit() -> str | None:
+    """Commit of the working tree, None outside a git checkout."""
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            check=True,
+            text=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(
+    result: dict, baseline: dict, max_regression: float, min_regression_ms: float
+) -> list[str]:
+    """Log p95 changes against a baseline and return the regressions.
+
+    A change is a regression when it exceeds both the relative and the absolute
+    threshold, so noise on sub-millisecond nodes doesn't fail the comparison.
+    """
+    baseline_levels = {level["concurrency"]: level for level in baseline["levels"]}
+    regressions = []
+    for level in result["levels"]:
+        base = baseline_levels.get(level["concurrency"])
+        if base is None:
+            continue
+        pairs = [("end_to_end", level["end_to_end"], base["end_to_end"])]
+        pairs += [
+            (node, summary, base["nodes"].get(node, {}))
+            for node, summary in level["nodes"].items()
+        ]
+        for name, current, previous in pairs:
+            if not previous.get("p95_ms") or not current.get("p95_ms"):
+                continue
+            change = current["p95_ms"] / previous["p95_ms"] - 1
+            delta_ms = current["p95_ms"] - previous["p95_ms"]
+            line = (
+                f"c={level['concurrency']} {name}: p95 {previous['p95_ms']:.1f} → "
+                f"{current['p95_ms']:.1f} ms ({change:+.1%})"
+            )
+            if change > max_regression and delta_ms > min_regression_ms:
+                regressions.append(line)
+                logger.warning(f"❌ {line}")
+            else:
+                logger.success(line)
+    return regressions
+
+
+def log_summary(level: dict) -> None:
+    """Log the headline numbers of a concurrency level."""
+    end_to_end = level["end_to_end"]
+    logger.success(
+        f"✅ c={level['concurrency']}: {level['throughput_rps']} req/s, "
+        f"p50 {end_to_end.get('p50_ms')} ms, p95 {end_to_end.get('p95_ms')} ms, "
+        f"p99 {end_to_end.get('p99_ms')} ms, errors {sum(level['errors'].values())}, "
+        f"max RSS {level['memory']['max_rss_mb']} MB"
+    )
+    for node, summary in level["nodes"].items():
+        logger.info(
+            f"   {node}: p50 {summary['p50_ms']} ms, p95 {summary['p95_ms']} ms "
+            f"({summary['count']} runs)"
+        )
+
+
+async def build_graph(
+    checkpointer: str,
+) -> tuple[CompiledStateGraph, PostgreSQLConnector, object]:
+    """Build the graph on the local database, with a benchmark vector store.
+
+    Returns:
+        The compiled graph, its database connector and the checkpointer pool to
+        close (or None)
+    """
+    db_connector = PostgreSQLConnector(config_path="configs/database.yml")
+
+    # Fake embeddings differ from the provider's, index them separately
+    vector_store = VectorStore(db_connector, collection_name=BENCHMARK_COLLECTION)
+    data_dictionary = DataDictionary.load(DATA_DICTIONARY_PATH)
+    vector_store.add_documents(
+        vector_store.get_documents_from_data_dictionary(data_dictionary)
+    )
+    vector_store.add_documents(
+        vector_store.get_documents_from_sql_examples(
+            SQLExample.from_yaml(SQL_EXAMPLES_PATH)
+        )
+    )
+
+    workflow = create_graph(
+        db_connector,
+        vector_store,
+        speculative_retrieval=load_agent_config()["speculation"]["retrieval"],
+    )
+    if checkpointer == "memory":
+        return workflow.compile(checkpointer=InMemorySaver()), db_connector, None
+
+    # Same checkpointer as the API
+    pool = db_connector.get_async_psycopg_pool(**load_api_config()["checkpointer"])
+    await pool.open(wait=True)
+    memory = AsyncPostgresSaver(conn=pool)
+    await memory.setup()
+    return workflow.compile(checkpointer=memory), db_connector, pool
+
+
+async def main(args: argparse.Namespace) -> int:
+    """Run the benchmark and return the exit code."""
+    # Node logs would dominate the output (and the timings) at INFO
+    logger.remove()
+    logger.add(
+        sys.stderr,
+        level=args.log_level,
+        format=(
+            "<green>{time:YYYY-MM-DD HH:mm:ss}</green> | "
+            "<level>{level}</level> | {message}"
+        ),
+    )
+
+    # Models and embeddings are built on first use, after this
+    fake_config = model_registry.config["fake"]
+    fake_config.update(
+        enabled=True,
+        latency=args.llm_latency,
+        jitter=args.llm_jitter,
+        embedding_latency=args.embedding_latency,
+    )
+
+    questions = load_questions(args.synthetic, args.seed)
+    logger.success(f"🔄 Benchmarking {len(questions)} questions per level")
+
+    graph, db_connector, pool = await build_graph(args.checkpointer)
+    try:
+        # Builds the models and opens connections outside the measurements
+        for question in questions[: args.warmup]:
+            await run_question(graph, question, NodeTimingHandler())
+
+        if args.tracemalloc:
+            tracemalloc.start()
+
+        levels = []
+        for concurrency in args.concurrency:
+            level = await run_level(graph, db_connector, questions, concurrency)
+            log_summary(level)
+            levels.append(level)
+    finally:
+        if pool is not None:
+            await pool.close()
+        db_connector.dispose()
+
+    result = {
+        "commit": git_commit(),
+        "timestamp": datetime.now(UTC).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "settings": {
+            "questions": len(questions),
+            "synthetic": args.synthetic,
+            "seed": args.seed,
+            "checkpointer": args.checkpointer,
+            "tracemalloc": args.tracemalloc,
+            "llm_latency": fake_config["latency"],
+            "llm_jitter": fake_config["jitter"],
+            "embedding_latency": fake_config["embedding_latency"],
+        },
+        "levels": levels,
+    }
+
+    Path(args.output).write_text(json.dumps(result, indent=2))
+    logger.success(f"Benchmark results written to {args.output}")
+
+    if args.baseline:
+        baseline = json.loads(Path(args.baseline).read_text())
+        if compare(result, baseline, args.max_regression, args.min_regression_ms):
+            logger.error(f"❌ p95 regressions above {args.max_regression:.0%}")
+            return 1
+    return 0
+
+
+def parse_args() -> argparse.Namespace:
+    """Parse the command line."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        nargs="+",
+        default=[1, 4, 16],
+        help="Concurrent graph runs of each level",
+    )
+    parser.add_argument(
+        "--synthetic",
+        type=int,
+        default=100,
+        help="Synthetic questions added to the SQL example questions",
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--warmup", type=int, default=3, help="Unmeasured runs before the levels"
+    )
+    parser.add_argument(
+        "--checkpointer",
+        choices=["postgres", "memory"],
+        default="postgres",
+        help="Graph checkpointer; postgres is what the API uses",
+    )
+    parser.add_argument(
+        "--llm-latency",
+        type=float,
+        default=0.0,
+        help="Seconds per fake LLM call, 0 to measure the agent's overhead only",
+    )
+    parser.add_argument("--llm-jitter", type=float, default=0.0)
+    parser.add_argument("--embedding-latency", type=float, default=0.0)
+    parser.add_argument(
+        "--tracemalloc",
+        action="store_true",
+        help="Also track the Python heap peak (slows the runs down)",
+    )
+    parser.add_argument("--output", default="benchmark.json", help="JSON results file")
+    parser.add_argument("--baseline", help="JSON results of an earlier run")
+    parser.add_argument(
+        "--max-regression",
+        type=float,
+        default=0.2,
+        help="Tolerated relative p95 increase over the baseline",
+    )
+    parser.add_argument(
+        "--min-regression-ms",
+        type=float,
+        default=5.0,
+        help="Tolerated absolute p95 increase over the baseline",
+    )
+    parser.add_argument(
+        "--log-level",
+        default="SUCCESS",
+        help="Log level; INFO also logs the per-node latencies and node runs",
+    )
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main(parse_args())))
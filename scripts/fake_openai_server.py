@@ -0,0 +1,250 @@
+"""OpenAI-compatible stand-in server for offline pipeline runs.
+
+Serves chat completions from the scripted responses of the fake LLM and
+deterministic hashing embeddings, so the real OpenAI client stack (HTTP
+connection pool, streaming, retries) can be exercised without provider access.
+Point the clients at it with:
+
+    OPENAI_BASE_URL=http://localhost:8001/v1 OPENAI_API_KEY=fake
+
+`OpenAIEmbeddings` tokenizes texts before sending them unless created with
+`check_embedding_ctx_length=False`; token ids are embedded as well, but their
+vectors don't match `HashingEmbeddings` of the same text.
+
+Usage:
+    python scripts/fake_openai_server.py --port 8001 --latency 0.5
+"""
+
+import argparse
+import asyncio
+import base64
+import json
+import time
+import uuid
+from collections.abc import AsyncIterator
+
+import numpy as np
+import uvicorn
+from fastapi import FastAPI
+from fastapi.responses import StreamingResponse
+from loguru import logger
+
+from nl2sql.knowledge_base.schema_selection import estimate_tokens
+from nl2sql.llm.fake import (
+    CHUNK_PATTERN,
+    FakeResponder,
+    HashingEmbeddings,
+    fake_delay,
+)
+
+
+def _text(content: str | list | None) -> str:
+    """Text of a message content, given as a string or a list of parts."""
+    if isinstance(content, list):
+        return "".join(part.get("text", "") for part in content)
+    return content or ""
+
+
+def _usage(prompt: str, completion: str) -> dict:
+    """Estimated token usage of a completion."""
+    prompt_tokens = estimate_tokens(prompt)
+    completion_tokens = estimate_tokens(completion)
+    return {
+        "prompt_tokens": prompt_tokens,
+        "completion_tokens": completion_tokens,
+        "total_tokens": prompt_tokens + completion_tokens,
+    }
+
+
+def _chat_completion(
+    completion_id: str, model: str, created: int, response: str, usage: dict
+) -> dict:
+    """Non-streamed chat completion."""
+    return {
+        "id": completion_id,
+        "object": "chat.completion",
+        "created": created,
+        "model": model,
+        "choices": [
+            {
+                "index": 0,
+                "message": {"role": "assistant", "content": response},
+                "finish_reason": "stop",
+            }
+        ],
+        "usage": usage,
+    }
+
+
+async def _chat_completion_events(
+    completion_id: str,
+    model: str,
+    created: int,
+    response: str,
+    usage: dict | None,
+    chunk_latency: float,
+) -> AsyncIterator[str]:
+    """Server-sent events of a streamed chat completion.
+
+    Args:
+        completion_id: ID shared by all chunks
+        model: Requested model name
+        created: Creation timestamp
+        response: Response text, streamed word by word
+        usage: Token usage sent in a final chunk, None to leave it out
+        chunk_latency: Seconds between content chunks
+    """
+
+    def event(choices: list, **extra: object) -> str:
+        payload = {
+            "id": completion_id,
+            "object": "chat.completion.chunk",
+            "created": created,
+            "model": model,
+            "choices": choices,
+            **extra,
+        }
+        return f"data: {json.dumps(payload)}\n\n"
+
+    yield event([{"index": 0, "delta": {"role": "assistant"}, "finish_reason": None}])
+    for i, piece in enumerate(CHUNK_PATTERN.findall(response)):
+        if i and chunk_latency:
+            await asyncio.sleep(chunk_latency)
+        yield event([{"index": 0, "delta": {"content": piece}, "finish_reason": None}])
+    yield event([{"index": 0, "delta": {}, "finish_reason": "stop"}])
+    if usage is not None:
+        yield event([], usage=usage)
+    yield "data: [DONE]\n\n"
+
+
+def _embedding_texts(inputs: str | list) -> list[str]:
+    """Texts of an embeddings request input.
+
+    Token id inputs (sent by clients that tokenize before embedding) are hashed
+    as text.
+    """
+    if isinstance(inputs, str) or (inputs and isinstance(inputs[0], int)):
+        inputs = [inputs]
+    return [
+        text if isinstance(text, str) else " ".join(map(str, text)) for text in inputs
+    ]
+
+
+def _encode_embedding(vector: list[float], encoding_format: str) -> list | str:
+    """Encode an embedding as floats or as base64 little-endian float32."""
+    if encoding_format == "base64":
+        encoded = np.asarray(vector, dtype="<f4").tobytes()
+        return base64.b64encode(encoded).decode("ascii")
+    return vector
+
+
+def create_app(
+    responder: FakeResponder,
+    embeddings: HashingEmbeddings,
+    latency: float = 0.0,
+    jitter: float = 0.0,
+    chunk_latency: float = 0.0,
+) -> FastAPI:
+    """Create the stand-in API.
+
+    Args:
+        responder: Scripted chat responses
+        embeddings: Embeddings served by `/v1/embeddings`
+        latency: Seconds before each chat response (or its first chunk)
+        jitter: Up to this many extra seconds, deterministic per prompt
+        chunk_latency: Seconds between streamed chunks
+
+    Returns:
+        The FastAPI app
+    """
+    app = FastAPI(title="Fake OpenAI API")
+
+    @app.get("/v1/models")
+    async def list_models() -> dict:
+        return {"object": "list", "data": []}
+
+    @app.post("/v1/chat/completions", response_model=None)
+    async def chat_completions(request: dict) -> dict | StreamingResponse:
+        messages = request.get("messages", [])
+        system = "\n".join(
+            _text(m.get("content"))
+            for m in messages
+            if m.get("role") in ("system", "developer")
+        )
+        user = next(
+            (
+                _text(m.get("content"))
+                for m in reversed(messages)
+                if m.get("role") == "user"
+            ),
+            "",
+        )
+        prompt = "\n".join(_text(m.get("content")) for m in messages)
+        response = responder.respond(system, user)
+        await asyncio.sleep(fake_delay(prompt, latency, jitter))
+
+        completion_id = f"chatcmpl-{uuid.uuid4().hex}"
+        model = request.get("model", "fake")
+        created = int(time.time())
+        usage = _usage(prompt, response)
+
+        if not request.get("stream"):
+            return _chat_completion(completion_id, model, created, response, usage)
+
+        include_usage = (request.get("stream_options") or {}).get("include_usage")
+        events = _chat_completion_events(
+            completion_id,
+            model,
+            created,
+            response,
+            usage if include_usage else None,
+            chunk_latency,
+        )
+        return StreamingResponse(events, media_type="text/event-stream")
+
+    @app.post("/v1/embeddings")
+    async def create_embeddings(request: dict) -> dict:
+        texts = _embedding_texts(request["input"])
+        vectors = await embeddings.aembed_documents(texts)
+        encoding_format = request.get("encoding_format", "float")
+        prompt_tokens = sum(estimate_tokens(text) for text in texts)
+        return {
+            "object": "list",
+            "data": [
+                {
+                    "object": "embedding",
+                    "index": i,
+                    "embedding": _encode_embedding(vector, encoding_format),
+                }
+                for i, vector in enumerate(vectors)
+            ],
+            "model": request.get("model", "fake"),
+            "usage": {"prompt_tokens": prompt_tokens, "total_tokens": prompt_tokens},
+        }
+
+    return app
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8001)
+    parser.add_argument("--responses", default="configs/fake_llm.yml")
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--jitter", type=float, default=0.0)
+    parser.add_argument("--chunk-latency", type=float, default=0.0)
+    parser.add_argument("--embedding-size", type=int, default=1536)
+    parser.add_argument("--embedding-latency", type=float, default=0.0)
+    args = parser.parse_args()
+
+    app = create_app(
+        responder=FakeResponder.from_yaml(args.responses),
+        embeddings=HashingEmbeddings(
+            size=args.embedding_size, latency=args.embedding_latency
+        ),
+        latency=args.latency,
+        jitter=args.jitter,
+        chunk_latency=args.chunk_latency,
+    )
+    logger.info(f"🔄 Serving fake OpenAI API on http://{args.host}:{args.port}/v1")
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
@@ -0,0 +1,36 @@
+"""Shared fixtures of the test suite.
+
+The tests run offline: every agent role gets the fake chat model and the
+embeddings are hashed locally (see `nl2sql.llm.fake`).
+"""
+
+from collections.abc import Iterator
+
+import pytest
+
+from nl2sql.knowledge_base.data_dictionary import DataDictionary
+from nl2sql.knowledge_base.sql_examples import SQLExample
+from nl2sql.llm.registry import model_registry
+
+
+@pytest.fixture(autouse=True, scope="session")
+def fake_models() -> Iterator[None]:
+    """Replace the configured providers with the offline fake models."""
+    fake_config = model_registry.config["fake"]
+    previous = dict(fake_config)
+    fake_config.update(enabled=True, latency=0.0, jitter=0.0, chunk_latency=0.0)
+    yield
+    fake_config.clear()
+    fake_config.update(previous)
+
+
+@pytest.fixture(scope="session")
+def data_dictionary() -> DataDictionary:
+    """Data dictionary shipped with the repository."""
+    return DataDictionary.load()
+
+
+@pytest.fixture(scope="session")
+def sql_examples() -> dict[str, SQLExample]:
+    """Few-shot SQL examples shipped with the repository."""
+    return SQLExample.from_yaml("knowledge/sql_examples.yml")
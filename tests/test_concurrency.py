@@ -0,0 +1,189 @@
+"""Tests of the API concurrency control (`nl2sql.api.concurrency`)."""
+
+import asyncio
+
+import pytest
+
+from nl2sql.api.concurrency import AdmissionController, OverloadedError, SessionLocks
+
+
+def test_session_runs_are_serialized() -> None:
+    """Runs of a session don't interleave, runs of other sessions do."""
+    locks = SessionLocks(max_pending=5, retry_after=1)
+    events: list[str] = []
+
+    async def run(session_id: str, name: str) -> None:
+        async with locks.hold(session_id):
+            events.append(f"start {name}")
+            await asyncio.sleep(0.01)
+            events.append(f"end {name}")
+
+    async def main() -> None:
+        await asyncio.gather(run("a", "a1"), run("a", "a2"), run("b", "b1"))
+
+    asyncio.run(main())
+
+    assert events.index("end a1") < events.index("start a2")
+    assert events.index("start b1") < events.index("end a1")
+    # Locks are dropped once no request holds or waits on them
+    assert len(locks) == 0
+
+
+def test_session_sheds_past_max_pending() -> None:
+    """Requests beyond the pending limit of a session are rejected."""
+    locks = SessionLocks(max_pending=1, retry_after=3)
+    release = asyncio.Event()
+
+    async def run() -> None:
+        async with locks.hold("a"):
+            await release.wait()
+
+    async def main() -> None:
+        running = asyncio.create_task(run())
+        waiting = asyncio.create_task(run())
+        await asyncio.sleep(0)
+        with pytest.raises(OverloadedError) as exc_info:
+            async with locks.hold("a"):
+                pass
+        assert exc_info.value.retry_after == 3
+
+        # Other sessions aren't affected
+        async with locks.hold("b"):
+            pass
+
+        release.set()
+        await asyncio.gather(running, waiting)
+
+    asyncio.run(main())
+    assert len(locks) == 0
+
+
+def test_admission_limits_in_flight() -> None:
+    """At most `max_in_flight` runs execute at once."""
+    controller = AdmissionController(
+        max_in_flight=2,
+        max_queue=10,
+        queue_timeout=1,
+        retry_after=1,
+        max_background=1,
+    )
+    peak = 0
+
+    async def run() -> None:
+        nonlocal peak
+        async with controller.admit():
+            peak = max(peak, controller.in_flight)
+            await asyncio.sleep(0.01)
+
+    async def main() -> None:
+        await asyncio.gather(*(run() for _ in range(6)))
+
+    asyncio.run(main())
+
+    assert peak == 2
+    assert controller.in_flight == 0
+    assert controller.queued == 0
+
+
+def test_admission_sheds_when_queue_is_full() -> None:
+    """Requests are rejected once the queue is full."""
+    controller = AdmissionController(
+        max_in_flight=2,
+        max_queue=1,
+        queue_timeout=1,
+        retry_after=2,
+        max_background=1,
+    )
+    release = asyncio.Event()
+
+    async def run() -> None:
+        async with controller.admit():
+            await release.wait()
+
+    async def main() -> None:
+        tasks = [asyncio.create_task(run()) for _ in range(3)]
+        await asyncio.sleep(0)
+        assert (controller.in_flight, controller.queued) == (2, 1)
+
+        with pytest.raises(OverloadedError, match="at capacity") as exc_info:
+            await run()
+        assert exc_info.value.retry_after == 2
+
+        release.set()
+        await asyncio.gather(*tasks)
+
+    asyncio.run(main())
+    assert (controller.in_flight, controller.queued) == (0, 0)
+
+
+def test_admission_sheds_after_queue_timeout() -> None:
+    """Queued requests are rejected once they waited `queue_timeout` seconds."""
+    controller = AdmissionController(
+        max_in_flight=2,
+        max_queue=5,
+        queue_timeout=0.01,
+        retry_after=1,
+        max_background=1,
+    )
+    release = asyncio.Event()
+
+    async def run() -> None:
+        async with controller.admit():
+            await release.wait()
+
+    async def main() -> None:
+        running = [asyncio.create_task(run()) for _ in range(2)]
+        await asyncio.sleep(0)
+        with pytest.raises(OverloadedError, match="Timed out"):
+            await run()
+        assert controller.queued == 0
+
+        release.set()
+        await asyncio.gather(*running)
+
+    asyncio.run(main())
+
+
+def test_background_runs_leave_slots() -> None:
+    """Background runs wait outside the queue, on part of the slots only."""
+    controller = AdmissionController(
+        max_in_flight=3,
+        max_queue=0,
+        queue_timeout=0.05,
+        retry_after=1,
+        max_background=2,
+    )
+    release = asyncio.Event()
+
+    async def run(shed: bool = True) -> None:
+        async with controller.admit(shed=shed):
+            await release.wait()
+
+    async def main() -> None:
+        background = [asyncio.create_task(run(shed=False)) for _ in range(5)]
+        await asyncio.sleep(0)
+        assert controller.in_flight == 2
+        assert (controller.queued, controller.background_queued) == (0, 3)
+
+        # Admitted right away, even with the queue disabled
+        interactive = asyncio.create_task(run())
+        await asyncio.sleep(0)
+        assert controller.in_flight == 3
+
+        release.set()
+        await asyncio.gather(*background, interactive)
+
+    asyncio.run(main())
+    assert (controller.in_flight, controller.background_queued) == (0, 0)
+
+
+def test_background_share_must_leave_slots() -> None:
+    """Background runs can't be allowed every slot."""
+    with pytest.raises(ValueError, match="max_background"):
+        AdmissionController(
+            max_in_flight=2,
+            max_queue=1,
+            queue_timeout=1,
+            retry_after=1,
+            max_background=2,
+        )
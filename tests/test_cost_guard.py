@@ -0,0 +1,209 @@
+"""Tests of the SQL cost guard (`sql_cost_guard` and `add_row_limit`)."""
+
+from collections.abc import Callable
+from types import SimpleNamespace
+
+import pytest
+from langchain_core.messages import HumanMessage
+
+from nl2sql.agents import nodes
+from nl2sql.agents.state import State
+from nl2sql.agents.utils import add_row_limit
+
+COST_GUARD_CONFIG = {
+    "enabled": True,
+    "auto_approve_max_cost": 1000,
+    "auto_approve_max_rows": 100,
+    "reject_max_cost": 100000,
+    "reject_max_rows": 10000,
+    "limit_rows": 50,
+}
+
+QUERY = "SELECT * FROM ecommerce.orders"
+
+
+def estimate(total_cost: float, plan_rows: int) -> dict:
+    """Successful cost estimate."""
+    return {
+        "success": True,
+        "total_cost": total_cost,
+        "plan_rows": plan_rows,
+        "error": None,
+    }
+
+
+FAILED_ESTIMATE = {
+    "success": False,
+    "total_cost": None,
+    "plan_rows": None,
+    "error": "couldn't get a connection after 5.00 sec",
+}
+
+
+@pytest.fixture(autouse=True)
+def cost_guard_config(monkeypatch: pytest.MonkeyPatch) -> dict:
+    """Cost guard limits of the tests."""
+    config = dict(COST_GUARD_CONFIG)
+    monkeypatch.setattr(nodes, "cost_guard_config", config)
+    return config
+
+
+@pytest.fixture
+def estimates(monkeypatch: pytest.MonkeyPatch) -> Callable[..., list[str]]:
+    """Script the estimates of the queries the cost guard plans.
+
+    Returns:
+        A function taking the estimates in order, returning the list the
+        estimated queries are appended to
+    """
+
+    def script(*results: dict) -> list[str]:
+        queue = list(results)
+        queries: list[str] = []
+
+        def estimate_sql_cost(query: str, db_conn: object) -> dict:
+            queries.append(query)
+            return queue.pop(0)
+
+        monkeypatch.setattr(nodes, "estimate_sql_cost", estimate_sql_cost)
+        return queries
+
+    return script
+
+
+def guard(query: str = QUERY) -> dict:
+    """Run the cost guard node on a query."""
+    state = State(
+        messages=[HumanMessage("Show all orders")],
+        user_query="Show all orders",
+        sql_query=query,
+    )
+    return nodes.sql_cost_guard(state, SimpleNamespace())
+
+
+@pytest.mark.parametrize(
+    ("query", "expected"),
+    [
+        (QUERY, f"{QUERY}\nLIMIT 50"),
+        (f"{QUERY};", f"{QUERY}\nLIMIT 50"),
+        (f"{QUERY}  ;  \n", f"{QUERY}\nLIMIT 50"),
+        (f"{QUERY} -- all of them", f"{QUERY}\nLIMIT 50"),
+        (f"{QUERY} /* all */;", f"{QUERY}\nLIMIT 50"),
+        (
+            "SELECT * FROM (SELECT * FROM ecommerce.orders LIMIT 5) o",
+            "SELECT * FROM (SELECT * FROM ecommerce.orders LIMIT 5) o\nLIMIT 50",
+        ),
+        ("SELECT 'limit' AS word", "SELECT 'limit' AS word\nLIMIT 50"),
+        (f"{QUERY} LIMIT 10", None),
+        (f"{QUERY} ORDER BY 1 limit 10 OFFSET 5;", None),
+        (f"{QUERY} FETCH FIRST 10 ROWS ONLY", None),
+    ],
+)
+def test_add_row_limit(query: str, expected: str | None) -> None:
+    """A LIMIT is appended unless the query has a top-level one."""
+    assert add_row_limit(query, 50) == expected
+
+
+@pytest.mark.parametrize(
+    ("total_cost", "plan_rows", "decision"),
+    [
+        (10, 1, "approved"),
+        (1000, 100, "approved"),
+        (1001, 1, "confirm"),
+        (10, 101, "confirm"),
+        (100000, 10000, "confirm"),
+        (100001, 1, "rejected"),
+        (10, 10001, "rejected"),
+    ],
+)
+def test_cost_decision(total_cost: float, plan_rows: int, decision: str) -> None:
+    """Estimates are approved, confirmed or rejected by both limits."""
+    assert nodes._cost_decision(estimate(total_cost, plan_rows)) == decision
+
+
+@pytest.mark.parametrize(
+    ("total_cost", "plan_rows", "status"),
+    [(10, 1, "approved"), (5000, 500, "confirm")],
+)
+def test_guard_decides_on_the_estimate(
+    estimates: Callable[..., list[str]],
+    total_cost: float,
+    plan_rows: int,
+    status: str,
+) -> None:
+    """Queries within the limits keep their SQL."""
+    estimates(estimate(total_cost, plan_rows))
+
+    assert guard() == {
+        "sql_cost_status": status,
+        "sql_cost_estimate": {"total_cost": total_cost, "plan_rows": plan_rows},
+    }
+
+
+def test_guard_limits_expensive_query(estimates: Callable[..., list[str]]) -> None:
+    """A rejected query is limited when that makes it cheap enough."""
+    queries = estimates(estimate(10**7, 10**6), estimate(500, 50))
+
+    update = guard()
+
+    assert queries == [QUERY, f"{QUERY}\nLIMIT 50"]
+    assert update == {
+        "sql_query": f"{QUERY}\nLIMIT 50",
+        "sql_cost_status": "confirm",
+        "sql_cost_estimate": {"total_cost": 500, "plan_rows": 50, "row_limit": 50},
+    }
+
+
+@pytest.mark.parametrize(
+    ("query", "limited_estimates"),
+    [
+        # Still too expensive with the limit (e.g. a large sort)
+        (QUERY, [estimate(10**7, 50)]),
+        # The limited query couldn't be estimated
+        (QUERY, [FAILED_ESTIMATE]),
+        # Already limited
+        (f"{QUERY} LIMIT 10", []),
+    ],
+)
+def test_guard_rejects_expensive_query(
+    estimates: Callable[..., list[str]], query: str, limited_estimates: list[dict]
+) -> None:
+    """A query that can't be made cheap enough is rejected."""
+    estimates(estimate(10**7, 10**6), *limited_estimates)
+
+    update = guard(query)
+
+    assert update["sql_cost_status"] == "rejected"
+    assert "sql_query" not in update
+    assert "too expensive" in update["messages"][0].content
+
+
+def test_guard_without_row_limit(
+    estimates: Callable[..., list[str]], cost_guard_config: dict
+) -> None:
+    """With `limit_rows` at 0, expensive queries are rejected right away."""
+    cost_guard_config["limit_rows"] = 0
+    queries = estimates(estimate(10**7, 10**6))
+
+    assert guard()["sql_cost_status"] == "rejected"
+    assert queries == [QUERY]
+
+
+def test_guard_leaves_unknown_cost_to_the_user(
+    estimates: Callable[..., list[str]],
+) -> None:
+    """A query that can't be estimated needs confirmation."""
+    estimates(FAILED_ESTIMATE)
+
+    assert guard() == {"sql_cost_status": "confirm", "sql_cost_estimate": None}
+
+
+def test_guard_disabled(
+    estimates: Callable[..., list[str]], cost_guard_config: dict
+) -> None:
+    """A disabled guard asks for confirmation without estimating."""
+    cost_guard_config["enabled"] = False
+    queries = estimates()
+
+    assert guard() == {"sql_cost_status": "confirm", "sql_cost_estimate": None}
+    assert queries == []
@@ -0,0 +1,207 @@
+"""Tests of the request deadlines (`nl2sql.agents.deadline`)."""
+
+import asyncio
+import time
+from collections.abc import Callable
+from types import SimpleNamespace
+
+import pytest
+from langchain_core.messages import HumanMessage
+from langchain_core.runnables.config import ensure_config, set_config_context
+from langchain_core.tools import StructuredTool
+
+from nl2sql.agents import nodes
+from nl2sql.agents.deadline import (
+    deadline_config,
+    deadline_exceeded,
+    guard_deadline,
+    llm_timeout,
+    remaining_time,
+)
+from nl2sql.agents.state import State
+from nl2sql.agents.tools import chat_tools
+from nl2sql.agents.tools.chat_tools import ChatAgentTools
+from nl2sql.api.routes import chat
+
+QUESTION = "How many orders are there?"
+
+
+def graph_config(timeout: float) -> dict:
+    """Graph config with a deadline `timeout` seconds from now."""
+    return {"configurable": {"thread_id": "test", **deadline_config(timeout)}}
+
+
+def state(sql_query: str | None = None) -> State:
+    """Graph state of a question."""
+    return State(
+        messages=[HumanMessage(QUESTION)], user_query=QUESTION, sql_query=sql_query
+    )
+
+
+def test_remaining_time() -> None:
+    """The remaining time counts down to 0, and is None without a deadline."""
+    assert remaining_time(None) is None
+    assert remaining_time({"configurable": {}}) is None
+    assert 9 < remaining_time(graph_config(10)) <= 10
+    assert remaining_time(graph_config(-5)) == 0
+
+    assert not deadline_exceeded(None)
+    assert not deadline_exceeded(graph_config(10))
+    assert deadline_exceeded(graph_config(-5))
+
+
+def test_llm_timeout() -> None:
+    """LLM timeouts are clamped to the remaining time, but stay positive."""
+    assert llm_timeout(None) is None
+    assert 0 < llm_timeout(graph_config(3)) <= 3
+    assert llm_timeout(graph_config(-5)) == 0.001
+
+
+class Node:
+    """Node recording its calls, optionally failing."""
+
+    def __init__(self, error: Exception | None = None, delay: float = 0.0) -> None:
+        """Initialize with the error to raise, if any, after `delay` seconds."""
+        self.error = error
+        self.delay = delay
+        self.calls = 0
+
+    def __call__(self, state: State, config: dict | None = None) -> dict:
+        """Answer with a SQL query."""
+        self.calls += 1
+        time.sleep(self.delay)
+        if self.error is not None:
+            raise self.error
+        return {"sql_query": "SELECT 1"}
+
+
+def guarded(node: Node, mode: str, include_sql: bool = False) -> Callable:
+    """Node guarded as a sync or async function."""
+    if mode == "sync":
+        return guard_deadline("generating the SQL query", include_sql)(node)
+
+    async def anode(state: State, config: dict | None = None) -> dict:
+        return node(state, config=config)
+
+    return guard_deadline("generating the SQL query", include_sql)(anode)
+
+
+def run(node: Callable, state: State, config: dict) -> dict:
+    """Run a guarded node, sync or async."""
+    result = node(state, config=config)
+    if asyncio.iscoroutine(result):
+        return asyncio.run(result)
+    return result
+
+
+@pytest.mark.parametrize("mode", ["sync", "async"])
+def test_expired_deadline_skips_the_node(mode: str) -> None:
+    """A node isn't run past the deadline, the run takes the timeout route."""
+    node = Node()
+
+    update = run(guarded(node, mode), state(), graph_config(-1))
+
+    assert node.calls == 0
+    assert update["deadline_exceeded"] is True
+    assert "ran out of time while generating the SQL query" in (
+        update["messages"][0].content
+    )
+    assert nodes.check_sql_generation(state().model_copy(update=update)) == "timeout"
+
+
+@pytest.mark.parametrize("mode", ["sync", "async"])
+def test_node_runs_before_the_deadline(mode: str) -> None:
+    """Within the deadline the node runs, and its errors are raised."""
+    assert run(guarded(Node(), mode), state(), graph_config(10)) == {
+        "sql_query": "SELECT 1"
+    }
+    assert run(guarded(Node(), mode), state(), {}) == {"sql_query": "SELECT 1"}
+
+    with pytest.raises(ValueError):
+        run(guarded(Node(ValueError("bad")), mode), state(), graph_config(10))
+
+
+@pytest.mark.parametrize("mode", ["sync", "async"])
+def test_error_after_the_deadline_is_a_timeout(mode: str) -> None:
+    """An error raised once the deadline passed ends the run with the SQL so far."""
+    node = Node(TimeoutError("read timeout"), delay=0.05)
+
+    update = run(
+        guarded(node, mode, include_sql=True), state("SELECT 1"), graph_config(0.01)
+    )
+
+    assert node.calls == 1
+    assert update["deadline_exceeded"] is True
+    assert "SELECT 1" in update["messages"][0].content
+
+
+def test_expired_deadline_skips_llm_calls() -> None:
+    """The SQL generator nodes return right away once the deadline passed."""
+    config = graph_config(-1)
+
+    update = nodes.sql_generator(state(), None, config=config)
+    assert update["deadline_exceeded"] is True
+
+    update = asyncio.run(nodes.asql_generator(state(), None, config=config))
+    assert update["deadline_exceeded"] is True
+
+
+class Graph:
+    """Compiled graph stand-in, answering after `delay` seconds."""
+
+    def __init__(self, delay: float) -> None:
+        """Initialize with the time the graph takes."""
+        self.delay = delay
+
+    async def ainvoke(self, graph_input: dict, config: dict) -> dict:
+        """Run the graph."""
+        await asyncio.sleep(self.delay)
+        return {"messages": [], "sql_query": "SELECT 2"}
+
+    async def aget_state(self, config: dict) -> SimpleNamespace:
+        """Last checkpoint of the run."""
+        return SimpleNamespace(values={"messages": [], "sql_query": "SELECT 1"})
+
+
+@pytest.mark.parametrize(
+    ("delay", "sql_query", "timed_out"),
+    [(0.0, "SELECT 2", False), (5.0, "SELECT 1", True)],
+)
+def test_ainvoke_with_deadline(
+    monkeypatch: pytest.MonkeyPatch, delay: float, sql_query: str, timed_out: bool
+) -> None:
+    """A graph run overrunning its deadline is answered from its checkpoint."""
+    monkeypatch.setattr(chat.components, "graph", Graph(delay))
+    monkeypatch.setitem(chat.api_config, "timeout_grace", 0.05)
+
+    started = time.monotonic()
+    result = asyncio.run(
+        chat._ainvoke_with_deadline({"messages": []}, graph_config(0.05))
+    )
+
+    assert time.monotonic() - started < 1
+    assert result["sql_query"] == sql_query
+    assert result.get("deadline_exceeded", False) is timed_out
+
+
+def test_query_explainer_timeout(monkeypatch: pytest.MonkeyPatch) -> None:
+    """The explainer tool's LLM call is bounded by the chat agent's deadline."""
+    timeouts = []
+
+    def cached_chain(prompt: object, role: str, timeout: float | None = None) -> None:
+        timeouts.append(timeout)
+        raise RuntimeError("no model")
+
+    monkeypatch.setattr(chat_tools, "cached_chain", cached_chain)
+    tool = StructuredTool.from_function(func=ChatAgentTools(None).explain_query)
+    assert "config" not in tool.args
+
+    # The agent runs tools without a config, inside the node's
+    with set_config_context(ensure_config(graph_config(5))) as context:
+        context.run(tool.run, {"sql_query": "SELECT 1"})
+    tool.invoke({"sql_query": "SELECT 1"}, graph_config(3))
+    tool.invoke({"sql_query": "SELECT 1"})
+
+    assert 4 < timeouts[0] <= 5
+    assert 2 < timeouts[1] <= 3
+    assert timeouts[2] is None
@@ -0,0 +1,111 @@
+"""Tests of the local intent classifier (`nl2sql.agents.intent`)."""
+
+import pytest
+
+from nl2sql.agents.intent import LocalIntentClassifier, ngrams, tokenize
+from nl2sql.knowledge_base.data_dictionary import DataDictionary
+from nl2sql.knowledge_base.sql_examples import SQLExample
+
+DATA_QUESTIONS = [
+    "How many customers are in each state?",
+    "Show the top 10 sellers by revenue",
+    "What is the average review score per product category?",
+    "What is the total payment value by payment type?",
+    "Which sellers have the most orders?",
+    "Count the reviews with a score of 5",
+]
+
+CHAT_MESSAGES = [
+    "Hello!",
+    "Good morning",
+    "thanks a lot",
+    "What can you do?",
+    "Who are you?",
+]
+
+# Questions about the schema or how to compute something; answering them with
+# a query is wrong, so they must never be decided as sql locally
+META_QUESTIONS = [
+    "What fields are in the order_payments table?",
+    "List the columns of the geolocation table",
+    "What data type is the order_purchase_timestamp column?",
+    "Which foreign keys link sellers and order_items?",
+    "Which tables are related to order_items?",
+    "Describe the sellers table",
+    "How can I count delivered orders per month?",
+    "How do I calculate revenue per seller?",
+    "how to compute the average delivery time?",
+]
+
+# Follow-ups referring back to the conversation
+FOLLOW_UPS = [
+    "Show the same for 2018",
+    "How many of those were delivered?",
+]
+
+
+@pytest.fixture
+def classifier(
+    data_dictionary: DataDictionary, sql_examples: dict[str, SQLExample]
+) -> LocalIntentClassifier:
+    """Classifier trained on the repository's knowledge base."""
+    return LocalIntentClassifier.from_knowledge(
+        data_dictionary, sql_examples, "knowledge/intent_examples.yml", 0.9
+    )
+
+
+def test_tokenize() -> None:
+    """Tokens are lowercased, plurals are stemmed and bigrams are added."""
+    assert tokenize("Orders by State") == ["order", "by", "state"]
+    assert ngrams(["order", "by", "state"]) == [
+        "order",
+        "by",
+        "state",
+        "order by",
+        "by state",
+    ]
+
+
+@pytest.mark.parametrize("message", DATA_QUESTIONS)
+def test_data_question(classifier: LocalIntentClassifier, message: str) -> None:
+    """Data questions are decided as sql locally."""
+    assert classifier.classify(message) == "sql"
+
+
+def test_sql_examples(
+    classifier: LocalIntentClassifier, sql_examples: dict[str, SQLExample]
+) -> None:
+    """The questions of the few-shot SQL examples are decided as sql."""
+    for name, example in sql_examples.items():
+        assert classifier.classify(example.question) == "sql", name
+
+
+@pytest.mark.parametrize("message", CHAT_MESSAGES)
+def test_chat_message(classifier: LocalIntentClassifier, message: str) -> None:
+    """Greetings and questions about the assistant are decided as chat."""
+    assert classifier.classify(message) == "chat"
+
+
+@pytest.mark.parametrize("message", META_QUESTIONS)
+def test_meta_question(classifier: LocalIntentClassifier, message: str) -> None:
+    """Schema and how-to questions go to chat or are left to the LLM."""
+    assert classifier.classify(message) != "sql"
+
+
+@pytest.mark.parametrize("message", FOLLOW_UPS)
+def test_follow_up(classifier: LocalIntentClassifier, message: str) -> None:
+    """Follow-ups referring to the conversation are left to the LLM."""
+    assert classifier.classify(message, has_history=True) is None
+
+
+def test_stats(classifier: LocalIntentClassifier) -> None:
+    """Local decisions and LLM fallbacks are counted."""
+    classifier.classify(DATA_QUESTIONS[0])
+    classifier.classify(CHAT_MESSAGES[0])
+    classifier.classify(FOLLOW_UPS[0], has_history=True)
+
+    assert classifier.stats() == {
+        "local": 2,
+        "llm": 1,
+        "local_fraction": pytest.approx(2 / 3),
+    }
@@ -0,0 +1,314 @@
+"""Tests of the resilient LLM calls (`nl2sql.llm.resilience`).
+
+Attempts are answered by the offline fake chat model, with a latency per
+attempt; failing attempts raise a scripted error.
+"""
+
+import asyncio
+import time
+from collections.abc import Callable
+from typing import Any
+
+import httpx
+import pytest
+from langchain_core.messages import AIMessage, HumanMessage
+from langchain_core.runnables import Runnable, RunnableLambda
+from langgraph.graph import END, START, MessagesState, StateGraph
+
+from nl2sql.llm.fake import FakeChatModel, FakeResponder
+from nl2sql.llm.resilience import (
+    FALLBACK_METADATA_KEY,
+    LatencyTracker,
+    ResiliencePolicy,
+    ResilientModel,
+    backoff_delay,
+    is_retryable,
+)
+
+POLICY_CONFIG = {
+    "retry": {"max_attempts": 3, "base_delay": 0.01, "max_delay": 0.02},
+    "hedging": {
+        "roles": ["hedged"],
+        "percentile": 95,
+        "window": 10,
+        "min_samples": 5,
+        "initial_delay": 0.1,
+        "min_delay": 0.05,
+        "max_hedges": 1,
+    },
+    "fallbacks": {},
+}
+
+
+class StatusError(Exception):
+    """Provider error with an HTTP status code."""
+
+    def __init__(self, status_code: int) -> None:
+        """Initialize with the status code."""
+        super().__init__(f"HTTP {status_code}")
+        self.status_code = status_code
+
+
+class APIConnectionError(Exception):
+    """Named like the OpenAI client's connection error."""
+
+
+def fake(response: str, latency: float = 0.0, chunk_latency: float = 0.0) -> Runnable:
+    """Fake model answering `response` after `latency` seconds."""
+    return FakeChatModel(
+        responder=FakeResponder([], response),
+        latency=latency,
+        chunk_latency=chunk_latency,
+    )
+
+
+def failing(error: Exception) -> Runnable:
+    """Model failing with `error`."""
+
+    def fail(_: Any, **kwargs: Any) -> None:  # noqa: ANN401
+        raise error
+
+    return RunnableLambda(fail)
+
+
+class Attempts:
+    """Model factory handing out one model per attempt."""
+
+    def __init__(self, *models: Runnable) -> None:
+        """Initialize with the models of the successive attempts."""
+        self._models = iter(models)
+        self.timeouts: list[float | None] = []
+
+    def __call__(self, timeout: float | None) -> Runnable:
+        """Model of the next attempt."""
+        self.timeouts.append(timeout)
+        return next(self._models)
+
+
+def resilient(
+    attempts: Attempts,
+    role: str = "plain",
+    timeout: float | None = None,
+    fallback: Attempts | None = None,
+    fallback_after: float | None = None,
+) -> ResilientModel:
+    """Resilient model of a role, hedged if the role is `hedged`."""
+    return ResilientModel(
+        role,
+        model=attempts,
+        policy=ResiliencePolicy(POLICY_CONFIG),
+        latency=LatencyTracker(10),
+        timeout=timeout,
+        fallback=fallback,
+        fallback_after=fallback_after,
+    )
+
+
+@pytest.fixture(params=["sync", "async"])
+def call(request: pytest.FixtureRequest) -> Callable[[ResilientModel], Any]:
+    """Call a model with `invoke` (on threads) or `ainvoke` (as tasks)."""
+
+    def call(model: ResilientModel) -> Any:  # noqa: ANN401
+        if request.param == "sync":
+            return model.invoke("How many orders are there?")
+        return asyncio.run(model.ainvoke("How many orders are there?"))
+
+    return call
+
+
+def test_is_retryable() -> None:
+    """Transient errors are retried, errors in the request aren't."""
+    assert is_retryable(TimeoutError())
+    assert is_retryable(ConnectionError())
+    assert is_retryable(httpx.ConnectTimeout("timed out"))
+    assert is_retryable(StatusError(429))
+    assert is_retryable(StatusError(503))
+    assert is_retryable(APIConnectionError())
+
+    assert not is_retryable(StatusError(400))
+    assert not is_retryable(ValueError("bad request"))
+
+
+def test_backoff_delay() -> None:
+    """Delays are jittered below an exponential bound, capped at `max_delay`."""
+    for retry, bound in [(0, 0.5), (1, 1.0), (2, 2.0), (6, 8.0)]:
+        delays = [backoff_delay(retry, 0.5, 8.0) for _ in range(100)]
+        assert all(0 <= delay <= bound for delay in delays)
+
+
+def test_latency_tracker() -> None:
+    """Percentiles are taken over the last `window` latencies."""
+    latency = LatencyTracker(window=4)
+    assert latency.percentile(95) == 0.0
+
+    for seconds in (100.0, 1.0, 2.0, 3.0, 4.0):
+        latency.record(seconds)
+
+    assert len(latency) == 4
+    assert latency.percentile(50) == 2.5
+
+
+def test_hedge_delay() -> None:
+    """Calls are hedged after the initial delay, then after a percentile."""
+    policy = ResiliencePolicy(POLICY_CONFIG)
+    latency = LatencyTracker(10)
+    assert policy.hedge_delay("plain", latency) is None
+    assert policy.hedge_delay("hedged", latency) == 0.1
+
+    for _ in range(5):
+        latency.record(0.01)
+    assert policy.hedge_delay("hedged", latency) == 0.05
+
+    for _ in range(5):
+        latency.record(0.5)
+    assert policy.hedge_delay("hedged", latency) == 0.5
+
+
+def test_first_attempt_answers(call: Callable[[ResilientModel], Any]) -> None:
+    """A prompt answer needs a single attempt."""
+    attempts = Attempts(fake("42"))
+    model = resilient(attempts, role="hedged")
+
+    assert call(model).content == "42"
+    assert attempts.timeouts == [None]
+    assert len(model.latency) == 1
+
+
+def test_hedge_wins(call: Callable[[ResilientModel], Any]) -> None:
+    """A slow call is duplicated, and the faster attempt answers."""
+    attempts = Attempts(fake("slow", latency=1.0), fake("hedge"))
+
+    started = time.monotonic()
+    assert call(resilient(attempts, role="hedged")).content == "hedge"
+    assert time.monotonic() - started < 0.5
+    assert len(attempts.timeouts) == 2
+
+
+def test_retry(call: Callable[[ResilientModel], Any]) -> None:
+    """Retryable failures are retried."""
+    attempts = Attempts(
+        failing(TimeoutError("timed out")), failing(StatusError(503)), fake("42")
+    )
+
+    assert call(resilient(attempts)).content == "42"
+    assert len(attempts.timeouts) == 3
+
+
+def test_retries_exhausted(call: Callable[[ResilientModel], Any]) -> None:
+    """The last error is raised once the attempts are used up."""
+    attempts = Attempts(*(failing(StatusError(503)) for _ in range(3)))
+
+    with pytest.raises(StatusError):
+        call(resilient(attempts))
+    assert len(attempts.timeouts) == 3
+
+
+def test_no_retry_of_bad_request(call: Callable[[ResilientModel], Any]) -> None:
+    """Errors in the request itself aren't retried."""
+    attempts = Attempts(failing(StatusError(400)), fake("42"))
+
+    with pytest.raises(StatusError):
+        call(resilient(attempts))
+    assert len(attempts.timeouts) == 1
+
+
+def test_fallback_after_failure(call: Callable[[ResilientModel], Any]) -> None:
+    """The fallback model answers once the role's model failed for good."""
+    attempts = Attempts(failing(StatusError(400)))
+    fallback = Attempts(fake("fallback"))
+    model = resilient(attempts, fallback=fallback, fallback_after=5)
+
+    response = call(model)
+
+    assert response.content == "fallback"
+    assert response.response_metadata[FALLBACK_METADATA_KEY] is True
+    # Fallback latencies say nothing about the role's model
+    assert len(model.latency) == 0
+
+
+def test_fallback_after_delay(call: Callable[[ResilientModel], Any]) -> None:
+    """The fallback model is also requested when the model is slow to answer."""
+    attempts = Attempts(fake("slow", latency=1.0))
+    fallback = Attempts(fake("fallback"))
+
+    started = time.monotonic()
+    response = call(resilient(attempts, fallback=fallback, fallback_after=0.05))
+
+    assert response.content == "fallback"
+    assert time.monotonic() - started < 0.5
+
+
+def test_primary_answer_isnt_marked(call: Callable[[ResilientModel], Any]) -> None:
+    """Answers of the role's model aren't marked as fallback answers."""
+    attempts = Attempts(fake("42"))
+    fallback = Attempts(fake("fallback"))
+
+    response = call(resilient(attempts, fallback=fallback, fallback_after=5))
+
+    assert FALLBACK_METADATA_KEY not in response.response_metadata
+    assert fallback.timeouts == []
+
+
+def test_deadline(call: Callable[[ResilientModel], Any]) -> None:
+    """A call raises `TimeoutError` at its deadline, attempts get the time left."""
+    attempts = Attempts(fake("slow", latency=1.0))
+
+    started = time.monotonic()
+    with pytest.raises(TimeoutError):
+        call(resilient(attempts, timeout=0.1))
+    assert time.monotonic() - started < 0.5
+    assert 0 < attempts.timeouts[0] <= 0.1
+
+
+def test_bound_kwargs_reach_every_attempt(
+    call: Callable[[ResilientModel], Any],
+) -> None:
+    """Kwargs bound to the model (e.g. tools) are passed to each attempt."""
+    received: list[dict] = []
+
+    def answer(_: Any, **kwargs: Any) -> AIMessage:  # noqa: ANN401
+        received.append(kwargs)
+        return AIMessage("42")
+
+    attempts = Attempts(failing(TimeoutError()), RunnableLambda(answer))
+
+    assert call(resilient(attempts).bind(tools=["search"])).content == "42"
+    assert received == [{"tools": ["search"]}]
+
+
+@pytest.mark.parametrize("mode", ["sync", "async"])
+def test_only_the_winner_is_streamed(mode: str) -> None:
+    """Tokens of a hedge that lost the race don't reach the graph's stream."""
+    # The primary streams from 0.3s; the hedge starts at 0.1s and would stream
+    # from 0.35s, interleaving with the primary's tokens
+    attempts = Attempts(
+        fake("p1 p2 p3 p4", latency=0.3, chunk_latency=0.05),
+        fake("h1 h2 h3 h4", latency=0.25, chunk_latency=0.05),
+    )
+    model = resilient(attempts, role="hedged")
+
+    graph = StateGraph(MessagesState)
+    if mode == "sync":
+        graph.add_node("answer", lambda s: {"messages": [model.invoke(s["messages"])]})
+    else:
+
+        async def answer(state: MessagesState) -> dict:
+            return {"messages": [await model.ainvoke(state["messages"])]}
+
+        graph.add_node("answer", answer)
+    graph.add_edge(START, "answer")
+    graph.add_edge("answer", END)
+
+    async def stream() -> list[str]:
+        tokens = []
+        async for message, _ in graph.compile().astream(
+            {"messages": [HumanMessage("How many orders are there?")]},
+            stream_mode="messages",
+        ):
+            tokens.append(message.content)
+        return tokens
+
+    tokens = asyncio.run(stream())
+
+    assert len(attempts.timeouts) == 2
+    assert "".join(tokens).split() == ["p1", "p2", "p3", "p4"]
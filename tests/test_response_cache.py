@@ -0,0 +1,221 @@
+"""Tests of the LLM response cache (`nl2sql.llm.cache`)."""
+
+import asyncio
+from pathlib import Path
+
+import pytest
+from langchain_core.messages import AIMessage, BaseMessage
+from langchain_core.prompts import ChatPromptTemplate
+from langchain_core.runnables import Runnable, RunnableLambda
+
+from nl2sql.llm import cache as cache_module
+from nl2sql.llm.cache import (
+    MemoryResponseCache,
+    ResponseCache,
+    SQLiteResponseCache,
+    cached_chain,
+    create_response_cache,
+)
+from nl2sql.llm.fake import FakeChatModel, FakeResponder
+from nl2sql.llm.resilience import FALLBACK_METADATA_KEY
+
+# Role listed under `llm.response_cache.roles`
+ROLE = "intent_classifier"
+
+PROMPT = ChatPromptTemplate.from_messages([("user", "{question}")])
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def backend(request: pytest.FixtureRequest, tmp_path: Path) -> ResponseCache:
+    """Local backend holding at most two entries (memory) for a minute."""
+    if request.param == "memory":
+        return MemoryResponseCache(ttl=60, max_entries=2)
+    return SQLiteResponseCache(ttl=60, path=tmp_path / "cache" / "responses.sqlite")
+
+
+class CountingResponder(FakeResponder):
+    """Fake responder counting the model calls."""
+
+    def __init__(self, response: str) -> None:
+        """Answer every prompt with `response`."""
+        super().__init__([], response)
+        self.calls = 0
+
+    def respond(self, system: str, user: str) -> str:
+        """Count the call and answer."""
+        self.calls += 1
+        return super().respond(system, user)
+
+
+@pytest.fixture
+def response_cache(monkeypatch: pytest.MonkeyPatch) -> MemoryResponseCache:
+    """Empty process-wide response cache."""
+    response_cache = MemoryResponseCache(ttl=60, max_entries=10)
+    monkeypatch.setattr(cache_module, "response_cache", response_cache)
+    return response_cache
+
+
+def use_model(monkeypatch: pytest.MonkeyPatch, model: Runnable) -> None:
+    """Make `model` the chat model of every role."""
+    monkeypatch.setattr(
+        cache_module, "get_chat_model", lambda role, timeout=None: model
+    )
+
+
+def test_set_and_get(backend: ResponseCache) -> None:
+    """Values are returned until cleared."""
+    assert backend.get("a") is None
+    backend.set("a", "1")
+    backend.set("a", "2")
+    assert backend.get("a") == "2"
+
+    backend.clear()
+    assert backend.get("a") is None
+
+
+def test_ttl(backend: ResponseCache, monkeypatch: pytest.MonkeyPatch) -> None:
+    """Expired values are missing."""
+    now = cache_module.time.time()
+    backend.set("a", "1")
+    monkeypatch.setattr(cache_module.time, "time", lambda: now + 61)
+
+    assert backend.get("a") is None
+
+
+def test_memory_lru_eviction() -> None:
+    """The least recently used value is evicted beyond `max_entries`."""
+    backend = MemoryResponseCache(ttl=60, max_entries=2)
+    backend.set("a", "1")
+    backend.set("b", "2")
+    # Makes "a" the most recently used
+    backend.get("a")
+    backend.set("c", "3")
+
+    assert backend.get("b") is None
+    assert (backend.get("a"), backend.get("c")) == ("1", "3")
+
+
+def test_sqlite_is_shared(tmp_path: Path) -> None:
+    """Values survive a reopen of the database, like another worker's."""
+    path = tmp_path / "responses.sqlite"
+    SQLiteResponseCache(ttl=60, path=path).set("a", "1")
+
+    assert SQLiteResponseCache(ttl=60, path=path).get("a") == "1"
+
+
+def test_counters(backend: ResponseCache) -> None:
+    """Hits and misses are counted."""
+    assert backend.stats() == {"hits": 0, "misses": 0, "hit_rate": 0.0}
+    backend.record(hit=True)
+    backend.record(hit=False)
+    backend.record(hit=False)
+
+    assert backend.stats() == {
+        "hits": 1,
+        "misses": 2,
+        "hit_rate": pytest.approx(1 / 3),
+    }
+
+
+def test_create_response_cache(tmp_path: Path) -> None:
+    """Backends are selected by the config."""
+    config = {
+        "backend": "memory",
+        "ttl": 60,
+        "memory": {"max_entries": 10},
+        "sqlite": {"path": tmp_path / "responses.sqlite"},
+    }
+    assert isinstance(create_response_cache(config), MemoryResponseCache)
+    config["backend"] = "sqlite"
+    assert isinstance(create_response_cache(config), SQLiteResponseCache)
+    config["backend"] = "none"
+    assert create_response_cache(config) is None
+    config["backend"] = "memcached"
+    with pytest.raises(ValueError, match="memcached"):
+        create_response_cache(config)
+
+
+@pytest.mark.parametrize("mode", ["sync", "async"])
+def test_hit_skips_the_model(
+    response_cache: MemoryResponseCache, monkeypatch: pytest.MonkeyPatch, mode: str
+) -> None:
+    """A repeated prompt is answered from the cache."""
+    responder = CountingResponder("chat")
+    use_model(monkeypatch, FakeChatModel(responder=responder))
+    chain = cached_chain(PROMPT, ROLE)
+
+    def invoke(question: str) -> BaseMessage:
+        if mode == "sync":
+            return chain.invoke({"question": question})
+        return asyncio.run(chain.ainvoke({"question": question}))
+
+    assert invoke("Hello!").content == "chat"
+    assert invoke("Hello!").content == "chat"
+    assert invoke("Hi!").content == "chat"
+
+    assert responder.calls == 2
+    assert (response_cache.hits, response_cache.misses) == (1, 2)
+
+
+def test_uncached_role(
+    response_cache: MemoryResponseCache, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """Roles not listed in the config always call the model."""
+    responder = CountingResponder("SELECT 1")
+    use_model(monkeypatch, FakeChatModel(responder=responder))
+    chain = cached_chain(PROMPT, "sql_generator")
+
+    chain.invoke({"question": "Hello!"})
+    chain.invoke({"question": "Hello!"})
+
+    assert responder.calls == 2
+    assert response_cache.stats()["misses"] == 0
+
+
+class FailingCache(MemoryResponseCache):
+    """Backend whose reads fail, like an unreachable server."""
+
+    def get(self, key: str) -> str | None:
+        """Fail the read."""
+        raise ConnectionError("cache server is unreachable")
+
+
+@pytest.mark.parametrize("broken", ["unreachable", "corrupt"])
+def test_read_failure_is_a_miss(monkeypatch: pytest.MonkeyPatch, broken: str) -> None:
+    """An unreadable cache answers with the model and counts a miss."""
+    response_cache = FailingCache(ttl=60, max_entries=10)
+    if broken == "corrupt":
+        response_cache = MemoryResponseCache(ttl=60, max_entries=10)
+        response_cache.set = lambda key, value: MemoryResponseCache.set(
+            response_cache, key, "not json"
+        )
+    monkeypatch.setattr(cache_module, "response_cache", response_cache)
+    responder = CountingResponder("chat")
+    use_model(monkeypatch, FakeChatModel(responder=responder))
+    chain = cached_chain(PROMPT, ROLE)
+
+    assert chain.invoke({"question": "Hello!"}).content == "chat"
+    assert chain.invoke({"question": "Hello!"}).content == "chat"
+
+    assert responder.calls == 2
+    assert (response_cache.hits, response_cache.misses) == (0, 2)
+
+
+def test_fallback_answers_arent_cached(
+    response_cache: MemoryResponseCache, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """Answers of the fallback model aren't stored under the role's model."""
+    calls = []
+
+    def answer(_: object) -> AIMessage:
+        calls.append(1)
+        return AIMessage("chat", response_metadata={FALLBACK_METADATA_KEY: True})
+
+    use_model(monkeypatch, RunnableLambda(answer))
+    chain = cached_chain(PROMPT, ROLE)
+
+    chain.invoke({"question": "Hello!"})
+    chain.invoke({"question": "Hello!"})
+
+    assert len(calls) == 2
+    assert response_cache.hits == 0
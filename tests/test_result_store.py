@@ -0,0 +1,149 @@
+"""Tests of the query result store (`nl2sql.agents.result_store`)."""
+
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy import create_engine, text
+
+from nl2sql.agents import result_store as result_store_module
+from nl2sql.agents.result_store import ResultStore, store_execution_result
+from nl2sql.agents.utils import execute_sql_query
+
+COLUMNS = ["id", "name"]
+
+
+def rows(count: int) -> list[dict]:
+    """Rows of a two-column result."""
+    return [{"id": i, "name": f"row {i}"} for i in range(count)]
+
+
+@pytest.fixture
+def store() -> ResultStore:
+    """Small store, so the caps are easy to reach."""
+    return ResultStore(ttl=60, max_entries=3, max_rows=10, max_total_rows=25)
+
+
+@pytest.fixture
+def db_conn() -> SimpleNamespace:
+    """Connector stand-in over an in-memory SQLite database with 30 rows."""
+    engine = create_engine("sqlite://")
+    with engine.begin() as conn:
+        conn.execute(text("CREATE TABLE t (id INTEGER, name TEXT)"))
+        conn.execute(
+            text("INSERT INTO t VALUES (:id, :name)"),
+            [{"id": i, "name": f"row {i}"} for i in range(30)],
+        )
+    return SimpleNamespace(engine=engine)
+
+
+def test_put_and_page(store: ResultStore) -> None:
+    """Stored rows are paged and projected by handle."""
+    stored = store.put("SELECT 1", COLUMNS, rows(5))
+
+    fetched = store.get(stored.handle)
+    assert fetched is stored
+    assert fetched.row_count == 5
+    assert fetched.truncated is False
+    assert fetched.page(1, 2) == rows(5)[1:3]
+    assert fetched.page(3, 10, columns=["name"]) == [
+        {"name": "row 3"},
+        {"name": "row 4"},
+    ]
+    assert store.get("unknown") is None
+
+
+def test_truncation(store: ResultStore) -> None:
+    """Rows beyond `max_rows`, or cut short at fetch time, are flagged."""
+    stored = store.put("SELECT 1", COLUMNS, rows(12))
+    assert (len(stored.rows), stored.row_count, stored.truncated) == (10, 12, True)
+
+    stored = store.put("SELECT 1", COLUMNS, rows(3), truncated=True)
+    assert (len(stored.rows), stored.truncated) == (3, True)
+
+
+def test_ttl(store: ResultStore, monkeypatch: pytest.MonkeyPatch) -> None:
+    """Expired results are dropped."""
+    stored = store.put("SELECT 1", COLUMNS, rows(5))
+    expired = stored.expires_at + 1
+    monkeypatch.setattr(result_store_module.time, "time", lambda: expired)
+
+    assert store.get(stored.handle) is None
+    assert store.stats() == {"entries": 0, "rows": 0}
+
+
+def test_entry_cap(store: ResultStore) -> None:
+    """The least recently used result is evicted beyond `max_entries`."""
+    handles = [store.put("SELECT 1", COLUMNS, rows(1)).handle for _ in range(3)]
+    # Makes the first result the most recently used
+    store.get(handles[0])
+    store.put("SELECT 1", COLUMNS, rows(1))
+
+    assert store.get(handles[1]) is None
+    assert store.get(handles[0]) is not None
+    assert len(store) == 3
+
+
+def test_row_cap(store: ResultStore) -> None:
+    """Results are evicted until the store holds at most `max_total_rows` rows."""
+    first = store.put("SELECT 1", COLUMNS, rows(10))
+    second = store.put("SELECT 1", COLUMNS, rows(10))
+    third = store.put("SELECT 1", COLUMNS, rows(10))
+
+    assert store.get(first.handle) is None
+    assert store.get(second.handle) is not None
+    assert store.get(third.handle) is not None
+    assert store.stats() == {"entries": 2, "rows": 20}
+
+
+def test_store_execution_result(
+    store: ResultStore, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """Successful results keep a preview inline and the rows under a handle."""
+    monkeypatch.setattr(result_store_module, "result_store", store)
+    execution_result = {
+        "success": True,
+        "data": rows(8),
+        "columns": COLUMNS,
+        "row_count": 8,
+        "truncated": True,
+        "error": None,
+        "query_executed": "SELECT * FROM t",
+    }
+
+    stored = store_execution_result(execution_result, preview_rows=3)
+
+    assert stored["data"] == rows(3)
+    assert stored["row_count"] == 8
+    assert stored["truncated"] is True
+    assert store.get(stored["handle"]).rows == rows(8)
+
+    failed = {**execution_result, "success": False, "data": None}
+    assert store_execution_result(failed, preview_rows=3) is failed
+
+
+def test_execute_fetches_at_most_max_rows(db_conn: SimpleNamespace) -> None:
+    """Only `max_rows` rows are fetched, and a longer result is flagged."""
+    result = execute_sql_query("SELECT id, name FROM t ORDER BY id", db_conn)
+    assert (result["success"], result["row_count"]) == (True, 30)
+    assert result["truncated"] is False
+
+    result = execute_sql_query(
+        "SELECT id, name FROM t ORDER BY id", db_conn, max_rows=10
+    )
+    assert result["success"] is True
+    assert result["columns"] == COLUMNS
+    assert result["data"] == rows(10)
+    assert result["truncated"] is True
+
+    result = execute_sql_query("SELECT id FROM t WHERE id < 5", db_conn, max_rows=5)
+    assert result["row_count"] == 5
+    assert result["truncated"] is False
+
+
+def test_execute_reports_errors(db_conn: SimpleNamespace) -> None:
+    """Failed queries are reported in the result."""
+    result = execute_sql_query("SELECT missing FROM t", db_conn, max_rows=10)
+
+    assert result["success"] is False
+    assert "missing" in result["error"]
+    assert result["data"] is None
@@ -0,0 +1,76 @@
+"""Tests of the question-specific schema subsets (`schema_selection`)."""
+
+from nl2sql.knowledge_base.data_dictionary import DataDictionary, TableKey
+from nl2sql.knowledge_base.schema_selection import SchemaSelector, estimate_tokens
+
+ORDERS = ("olist_ecommerce", "ecommerce", "orders")
+ORDER_ITEMS = ("olist_ecommerce", "ecommerce", "order_items")
+SELLERS = ("olist_ecommerce", "ecommerce", "sellers")
+GEOLOCATION = ("olist_ecommerce", "ecommerce", "geolocation")
+CLOSED_DEALS = ("olist_ecommerce", "marketing", "closed_deals")
+
+
+def tokens(data_dictionary: DataDictionary, table_keys: list[TableKey]) -> int:
+    """Estimated tokens of the formatted tables."""
+    return sum(
+        estimate_tokens(
+            data_dictionary.databases[database_name]
+            .schemas[schema_name]
+            .tables[table_name]
+            .format_context()
+        )
+        for database_name, schema_name, table_name in table_keys
+    )
+
+
+def test_fk_neighbours(data_dictionary: DataDictionary) -> None:
+    """Tables joined to the retrieved ones are selected, across schemas."""
+    selector = SchemaSelector(data_dictionary, token_budget=100_000)
+
+    assert set(selector.select([SELLERS])) == {SELLERS, ORDER_ITEMS, CLOSED_DEALS}
+    # Tables without foreign keys come alone
+    assert selector.select([GEOLOCATION]) == [GEOLOCATION]
+
+
+def test_fk_neighbours_disabled(data_dictionary: DataDictionary) -> None:
+    """Only the retrieved tables are selected without the neighbours."""
+    selector = SchemaSelector(
+        data_dictionary, token_budget=100_000, include_fk_neighbours=False
+    )
+
+    assert selector.select([SELLERS]) == [SELLERS]
+
+
+def test_token_budget(data_dictionary: DataDictionary) -> None:
+    """Tables beyond the budget are dropped, retrieved ones first."""
+    budget = tokens(data_dictionary, [ORDER_ITEMS, ORDERS])
+    selector = SchemaSelector(data_dictionary, token_budget=budget)
+
+    # Of the neighbours of order_items (orders, products and sellers), only
+    # the first one fits
+    selected = selector.select([ORDER_ITEMS])
+    assert selected == [ORDER_ITEMS, ORDERS]
+    assert tokens(data_dictionary, selected) <= budget
+
+    # Retrieved tables take the budget before the neighbours
+    selected = selector.select([SELLERS, ORDER_ITEMS])
+    assert selected == [ORDER_ITEMS, SELLERS]
+    assert tokens(data_dictionary, selected) <= budget
+
+
+def test_top_table_kept_over_budget(data_dictionary: DataDictionary) -> None:
+    """The top ranked table is kept even when it alone exceeds the budget."""
+    selector = SchemaSelector(data_dictionary, token_budget=1)
+
+    assert selector.select([CLOSED_DEALS, SELLERS]) == [CLOSED_DEALS]
+
+
+def test_order_and_unknown_tables(data_dictionary: DataDictionary) -> None:
+    """Tables come in data dictionary order and unknown ones are ignored."""
+    selector = SchemaSelector(
+        data_dictionary, token_budget=100_000, include_fk_neighbours=False
+    )
+    retrieved = [SELLERS, ("olist_ecommerce", "ecommerce", "dropped"), ORDERS]
+
+    assert selector.select(retrieved) == [ORDERS, SELLERS]
+    assert selector.select(reversed(retrieved)) == [ORDERS, SELLERS]
@@ -0,0 +1,100 @@
+"""Tests of speculative retrieval (`nl2sql.agents.speculation`)."""
+
+import asyncio
+
+import pytest
+
+from nl2sql.agents.nodes import _speculative_retrieval
+from nl2sql.agents.speculation import SpeculativeTasks, speculation_key
+
+RETRIEVED = ([0.1, 0.2], ([], []))
+
+
+async def retrieve() -> tuple:
+    """Speculative retrieval answering right away."""
+    return RETRIEVED
+
+
+async def fail() -> tuple:
+    """Speculative retrieval failing like an unreachable vector store."""
+    raise ConnectionError("pgvector is unreachable")
+
+
+async def hang() -> tuple:
+    """Speculative retrieval that never finishes."""
+    await asyncio.sleep(60)
+    return RETRIEVED
+
+
+def test_speculation_key() -> None:
+    """Work is keyed on the run's thread and question."""
+    config = {"configurable": {"thread_id": "t1"}}
+    assert speculation_key(config, "q") == ("t1", "q")
+    assert speculation_key(None, "q") == (None, "q")
+
+
+def test_tasks_are_taken_once() -> None:
+    """A started task is handed out once, and replaced by a newer one."""
+
+    async def main() -> None:
+        tasks = SpeculativeTasks(ttl=60)
+        first = tasks.start("key", hang())
+        second = tasks.start("key", retrieve())
+        await asyncio.sleep(0)
+
+        assert first.cancelled()
+        assert tasks.pop("key") is second
+        assert tasks.pop("key") is None
+        assert await second == RETRIEVED
+
+    asyncio.run(main())
+
+
+def test_stale_tasks_are_cancelled() -> None:
+    """Tasks nobody picked up are cancelled after `ttl` seconds."""
+
+    async def main() -> None:
+        tasks = SpeculativeTasks(ttl=0)
+        stale = tasks.start("stale", hang())
+        await asyncio.sleep(0.01)
+        tasks.start("fresh", retrieve())
+        await asyncio.sleep(0)
+
+        assert stale.cancelled()
+        assert len(tasks) == 1
+        await tasks.pop("fresh")
+
+    asyncio.run(main())
+
+
+@pytest.mark.parametrize("outcome", ["answered", "failed", "cancelled", "none"])
+def test_speculative_retrieval(outcome: str) -> None:
+    """A failed or cancelled retrieval is retrieved again, not raised."""
+
+    async def main() -> tuple | None:
+        if outcome == "none":
+            return await _speculative_retrieval(None)
+        coro = {"answered": retrieve, "failed": fail, "cancelled": hang}[outcome]
+        task = asyncio.create_task(coro())
+        if outcome == "cancelled":
+            await asyncio.sleep(0)
+            task.cancel()
+        return await _speculative_retrieval(task)
+
+    expected = RETRIEVED if outcome == "answered" else None
+    assert asyncio.run(main()) == expected
+
+
+def test_node_cancellation_is_kept() -> None:
+    """Cancelling the node while it waits for the retrieval still cancels it."""
+
+    async def main() -> None:
+        waiting = asyncio.create_task(
+            _speculative_retrieval(asyncio.create_task(hang()))
+        )
+        await asyncio.sleep(0.01)
+        waiting.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiting
+
+    asyncio.run(main())
@@ -0,0 +1,192 @@
+"""Tests of the semantic SQL cache (`nl2sql.agents.sql_cache`)."""
+
+import pytest
+from langchain_core.messages import AIMessage, HumanMessage
+
+from nl2sql.agents import nodes
+from nl2sql.agents.sql_cache import (
+    CachedSQL,
+    SemanticSQLCache,
+    normalize_question,
+    question_literals,
+)
+from nl2sql.agents.state import State
+from nl2sql.knowledge_base.data_dictionary import DataDictionary
+from nl2sql.llm.fake import HashingEmbeddings
+
+QUESTION = "How many orders were placed in 2017?"
+SQL_QUERY = (
+    "SELECT COUNT(*) FROM ecommerce.orders "
+    "WHERE EXTRACT(YEAR FROM order_purchase_timestamp) = 2017"
+)
+
+embeddings = HashingEmbeddings(size=256)
+
+
+def embed(question: str) -> list[float]:
+    """Embedding of a question."""
+    return embeddings.embed_query(question)
+
+
+@pytest.fixture
+def cache() -> SemanticSQLCache:
+    """Cache holding the SQL of `QUESTION`, with a loose threshold.
+
+    Questions differing in a single word are above the threshold, so hits are
+    decided by the literals.
+    """
+    cache = SemanticSQLCache(similarity_threshold=0.8, ttl=60, max_entries=10)
+    cache.put(QUESTION, embed(QUESTION), "v1", SQL_QUERY, "Orders of 2017")
+    return cache
+
+
+def lookup(
+    cache: SemanticSQLCache, question: str, schema_version: str = "v1"
+) -> CachedSQL | None:
+    """Look up a question, with its embedding."""
+    return cache.lookup(question, embed(question), schema_version)
+
+
+def test_normalize_question() -> None:
+    """Case and whitespace are ignored."""
+    assert normalize_question("  How many\tOrders? ") == "how many orders?"
+
+
+def test_question_literals() -> None:
+    """Quoted strings, numbers and upper-case codes are literals."""
+    assert question_literals(
+        "Top 5 cities in SP with status 'delivered' and more than 1,000.5 BRL"
+    ) == ("'delivered'", "1,000.5", "5", "BRL", "SP")
+    assert question_literals("How many orders are there?") == ()
+
+
+def test_exact_hit(cache: SemanticSQLCache) -> None:
+    """The same question up to case and whitespace is a hit."""
+    match = lookup(cache, "  how many ORDERS were placed in 2017? ")
+
+    assert match is not None
+    assert match.sql_query == SQL_QUERY
+    assert match.sql_explanation == "Orders of 2017"
+    assert cache.stats()["hits"] == 1
+
+
+def test_near_duplicate_hit(cache: SemanticSQLCache) -> None:
+    """A similar question with the same literals is a hit."""
+    match = lookup(cache, "How many orders were placed in 2017 overall?")
+
+    assert match is not None
+    assert match.sql_query == SQL_QUERY
+
+
+@pytest.mark.parametrize(
+    "question",
+    [
+        "How many orders were placed in 2018?",
+        "How many orders were placed in 2017 in SP?",
+        "How many orders were placed?",
+    ],
+)
+def test_literal_mismatch_miss(cache: SemanticSQLCache, question: str) -> None:
+    """A similar question with other literals is a miss."""
+    assert lookup(cache, question) is None
+    assert cache.stats()["misses"] == 1
+
+
+def test_unrelated_question_miss(cache: SemanticSQLCache) -> None:
+    """A question below the similarity threshold is a miss."""
+    assert lookup(cache, "Which sellers have the most reviews?") is None
+
+
+def test_schema_change_clears(cache: SemanticSQLCache) -> None:
+    """Entries of another schema version are dropped."""
+    assert lookup(cache, QUESTION, schema_version="v2") is None
+
+    stats = cache.stats()
+    assert stats["invalidations"] == 1
+    assert stats["size"] == 0
+
+
+def test_ttl(cache: SemanticSQLCache, monkeypatch: pytest.MonkeyPatch) -> None:
+    """Expired entries are evicted."""
+    expired = cache._entries[normalize_question(QUESTION)].expires_at + 1
+    monkeypatch.setattr("nl2sql.agents.sql_cache.time.time", lambda: expired)
+
+    assert lookup(cache, QUESTION) is None
+    assert cache.stats()["evictions"] == 1
+
+
+def test_lru_eviction() -> None:
+    """The least recently used entry is evicted beyond `max_entries`."""
+    cache = SemanticSQLCache(similarity_threshold=0.95, ttl=60, max_entries=2)
+    questions = [f"How many orders have {n} items?" for n in (1, 2, 3)]
+    cache.put(questions[0], embed(questions[0]), "v1", "SELECT 1")
+    cache.put(questions[1], embed(questions[1]), "v1", "SELECT 2")
+    # Makes the first question the most recently used
+    assert lookup(cache, questions[0]) is not None
+    cache.put(questions[2], embed(questions[2]), "v1", "SELECT 3")
+
+    assert lookup(cache, questions[1]) is None
+    assert lookup(cache, questions[0]) is not None
+    assert lookup(cache, questions[2]) is not None
+    assert cache.stats()["evictions"] == 1
+
+
+def test_update_and_discard(cache: SemanticSQLCache) -> None:
+    """Cached SQL can be replaced after a fix, or dropped."""
+    cache.update(QUESTION, "SELECT 2017")
+    assert lookup(cache, QUESTION).sql_query == "SELECT 2017"
+
+    cache.discard(QUESTION)
+    assert lookup(cache, QUESTION) is None
+    assert cache.stats()["size"] == 0
+
+
+def test_fix_of_follow_up_keeps_cached_sql(
+    cache: SemanticSQLCache, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """A fixed follow-up query doesn't replace the SQL of a standalone question."""
+    monkeypatch.setattr(nodes, "sql_cache", cache)
+    monkeypatch.setitem(
+        nodes.agent_config,
+        "sql_cache",
+        {**nodes.agent_config["sql_cache"], "enabled": True, "standalone_only": True},
+    )
+    follow_up = State(
+        messages=[
+            HumanMessage("How many customers are there?"),
+            AIMessage("There are 99441 customers."),
+            HumanMessage(QUESTION),
+        ],
+        user_query=QUESTION,
+    )
+    nodes._update_cached_sql(follow_up, "SELECT 'follow-up'")
+    assert lookup(cache, QUESTION).sql_query == SQL_QUERY
+
+    standalone = State(messages=[HumanMessage(QUESTION)], user_query=QUESTION)
+    nodes._update_cached_sql(standalone, "SELECT 'fixed'")
+    assert lookup(cache, QUESTION).sql_query == "SELECT 'fixed'"
+
+
+def test_data_dictionary_change_invalidates(
+    data_dictionary: DataDictionary, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """Cached SQL is dropped once the data dictionary content changes."""
+    cache = SemanticSQLCache(similarity_threshold=0.95, ttl=60, max_entries=10)
+    dictionary = data_dictionary.model_copy(deep=True)
+    monkeypatch.setattr(nodes, "sql_cache", cache)
+    monkeypatch.setattr(nodes, "data_dictionary", dictionary)
+    monkeypatch.setitem(
+        nodes.agent_config,
+        "sql_cache",
+        {**nodes.agent_config["sql_cache"], "enabled": True},
+    )
+    state = State(messages=[HumanMessage(QUESTION)], user_query=QUESTION)
+    nodes._cache_sql_generation(state, embed(QUESTION), {"sql_query": SQL_QUERY})
+    assert nodes._cached_sql_generation(state, embed(QUESTION)) is not None
+
+    database = next(iter(dictionary.databases.values()))
+    table = next(iter(next(iter(database.schemas.values())).tables.values()))
+    table.description = "Renamed table"
+
+    assert nodes._cached_sql_generation(state, embed(QUESTION)) is None
+    assert cache.stats()["invalidations"] == 1
@@ -0,0 +1,227 @@
+"""Tests of the local SQL checks (`nl2sql.agents.sql_checker`)."""
+
+import pytest
+
+from nl2sql.agents.sql_checker import LocalSQLChecker
+from nl2sql.knowledge_base.data_dictionary import DataDictionary
+from nl2sql.knowledge_base.sql_examples import SQLExample
+
+# Valid PostgreSQL queries the checker must let through: a false positive sends
+# the query to the LLM fixer
+VALID_QUERIES = [
+    """
+    SELECT DATE_TRUNC('month', o."order_purchase_timestamp") AS "month",
+        ROUND(SUM(p."payment_value")::numeric, 2) AS "revenue"
+    FROM "ecommerce"."orders" o
+    JOIN "ecommerce"."order_payments" p ON p."order_id" = o."order_id"
+    WHERE o."order_status" = 'delivered'
+        AND o."order_purchase_timestamp" >= NOW() - INTERVAL '1 year'
+    GROUP BY 1 ORDER BY 1
+    """,
+    """
+    WITH seller_sales AS (
+        SELECT oi."seller_id", SUM(oi."price") AS total
+        FROM "ecommerce"."order_items" oi GROUP BY oi."seller_id"
+    ), ranked AS (
+        SELECT s."seller_state", ss.total,
+            RANK() OVER (PARTITION BY s."seller_state" ORDER BY ss.total DESC) AS rnk
+        FROM seller_sales ss JOIN "ecommerce"."sellers" s USING ("seller_id")
+    )
+    SELECT * FROM ranked WHERE rnk <= 3
+    """,
+    """
+    SELECT c.customer_state,
+        COUNT(DISTINCT c.customer_unique_id)
+            FILTER (WHERE o.order_status = 'canceled') AS canceled
+    FROM ecommerce.customers c
+    LEFT JOIN ecommerce.orders o ON o.customer_id = c.customer_id
+    GROUP BY c.customer_state HAVING COUNT(*) > 10
+    ORDER BY canceled DESC NULLS LAST
+    """,
+    """
+    SELECT p.product_category_name, t.product_category_name_english,
+        AVG(r.review_score) avg_score
+    FROM ecommerce.products p
+    JOIN ecommerce.product_category_name_translations t
+        ON t.product_category_name = p.product_category_name
+    JOIN ecommerce.order_items oi ON oi.product_id = p.product_id
+    JOIN ecommerce.order_reviews r ON r.order_id = oi.order_id
+    GROUP BY 1, 2 ORDER BY avg_score DESC LIMIT 5
+    """,
+    """
+    SELECT o.order_id FROM ecommerce.orders o
+    WHERE EXISTS (
+        SELECT 1 FROM ecommerce.order_reviews r
+        WHERE r.order_id = o.order_id AND r.review_score = 1
+    ) AND o.customer_id IN (
+        SELECT customer_id FROM ecommerce.customers WHERE customer_state = 'SP'
+    )
+    """,
+    """
+    SELECT EXTRACT(EPOCH FROM (
+            o.order_delivered_customer_date - o.order_purchase_timestamp
+        )) / 86400 AS days,
+        EXTRACT(DOW FROM o.order_purchase_timestamp) AS dow
+    FROM ecommerce.orders o
+    """,
+    """
+    SELECT AVG(order_delivered_customer_date::date - order_purchase_timestamp::date)
+    FROM ecommerce.orders WHERE order_delivered_customer_date IS NOT NULL
+    """,
+    """
+    SELECT payment_type,
+        percentile_cont(0.5) WITHIN GROUP (ORDER BY payment_value) AS median
+    FROM ecommerce.order_payments GROUP BY payment_type
+    UNION ALL
+    SELECT 'all', percentile_cont(0.5) WITHIN GROUP (ORDER BY payment_value)
+    FROM ecommerce.order_payments
+    """,
+    """
+    SELECT cd.business_segment, COUNT(*) AS deals, AVG(cd.declared_monthly_revenue)
+    FROM marketing.closed_deals cd
+    JOIN marketing.marketing_qualified_leads mql ON mql.mql_id = cd.mql_id
+    WHERE mql.origin IS NOT NULL GROUP BY cd.business_segment
+    """,
+    """
+    SELECT seller_city, CASE WHEN COUNT(*) > 100 THEN 'big' ELSE 'small' END size
+    FROM ecommerce.sellers GROUP BY seller_city
+    """,
+    """
+    SELECT x.month, x.n, LAG(x.n) OVER w AS prev
+    FROM (
+        SELECT to_char(order_purchase_timestamp, 'YYYY-MM') AS month, COUNT(*) n
+        FROM ecommerce.orders GROUP BY 1
+    ) x
+    WINDOW w AS (ORDER BY x.month)
+    """,
+    """
+    SELECT COALESCE(NULLIF(TRIM(review_comment_title), ''), 'none') title,
+        LENGTH(review_comment_message)
+    FROM ecommerce.order_reviews
+    WHERE review_creation_date
+        BETWEEN DATE '2018-01-01' AND TIMESTAMP '2018-06-30 23:59'
+    LIMIT 10;
+    """,
+    """
+    SELECT g.geolocation_state, COUNT(*) FROM ecommerce.geolocation AS g
+    GROUP BY g.geolocation_state ORDER BY 2 DESC FETCH FIRST 5 ROWS ONLY
+    """,
+    """
+    SELECT s.seller_id, d.day
+    FROM ecommerce.sellers s CROSS JOIN generate_series(1, 7) AS d(day)
+    """,
+    """
+    SELECT products.product_id, products.product_weight_g / 1000.0 AS kg
+    FROM ecommerce.products WHERE products.product_weight_g > 0
+    """,
+    """
+    SELECT o.*, c.customer_city
+    FROM ecommerce.orders AS o
+    INNER JOIN ecommerce.customers AS c ON (o.customer_id = c.customer_id)
+    WHERE o.order_status NOT IN ('canceled', 'unavailable')
+    """,
+    """
+    SELECT COUNT(*) AS "Total Orders" FROM "ecommerce"."orders"
+    ORDER BY "Total Orders"
+    """,
+    """
+    SELECT SUBSTRING(customer_zip_code_prefix FROM 1 FOR 2) AS region, COUNT(*)
+    FROM ecommerce.customers GROUP BY region
+    """,
+    """
+    SELECT order_id, price,
+        SUM(price) OVER (
+            PARTITION BY order_id ORDER BY order_item_id
+            ROWS BETWEEN UNBOUNDED PRECEDING AND CURRENT ROW
+        ) running
+    FROM ecommerce.order_items
+    """,
+    """
+    SELECT string_agg(DISTINCT seller_state, ', ' ORDER BY seller_state)
+    FROM ecommerce.sellers
+    """,
+    """
+    SELECT CAST(review_score AS DECIMAL(3,1)) AS score,
+        review_creation_date AT TIME ZONE 'UTC'
+    FROM ecommerce.order_reviews
+    """,
+    """
+    SELECT oi.order_id, lat.max_price
+    FROM ecommerce.order_items oi
+    LEFT JOIN LATERAL (
+        SELECT MAX(price) AS max_price FROM ecommerce.order_items i2
+        WHERE i2.order_id = oi.order_id
+    ) lat ON TRUE
+    """,
+    """
+    SELECT COUNT(*) FILTER (WHERE payment_installments > 1)::float / COUNT(*) AS share
+    FROM ecommerce.order_payments
+    """,
+    """
+    select distinct on (customer_state) customer_state, customer_city
+    from ecommerce.customers order by customer_state, customer_city
+    """,
+    """
+    SELECT date_part('year', order_purchase_timestamp) AS yr, count(1)
+    FROM ecommerce.orders GROUP BY yr
+    """,
+    """
+    SELECT total
+    FROM (SELECT COUNT(*) AS total FROM ecommerce.orders) t
+    """,
+    'SELECT "order_status" FROM orders -- trailing comment',
+]
+
+# Invalid queries, with the error type and a part of the message
+INVALID_QUERIES = [
+    ("", "syntax", "empty query"),
+    ("SELECT 1; SELECT 2", "syntax", "multiple statements"),
+    ("SELECT order_id, FROM ecommerce.orders", "syntax", "remove the comma"),
+    ("SELECT COUNT(* FROM ecommerce.orders", "syntax", "unclosed parenthesis"),
+    ("SELECT order_id FROM ecommerce.orders WHERE)", "syntax", "unmatched"),
+    ("SELECT 'abc FROM ecommerce.orders", "syntax", "unterminated"),
+    ("SELECT * FROM ecommerce.order", "table", '"ecommerce"."orders"'),
+    ("SELECT order_idd FROM ecommerce.orders", "column", '"order_id"'),
+    ("SELECT x.order_id FROM ecommerce.orders o", "column", "missing FROM-clause"),
+    (
+        "SELECT c.customer_idx FROM ecommerce.orders o "
+        "JOIN ecommerce.customers c ON o.customer_id = c.customer_id",
+        "column",
+        '"customer_id"',
+    ),
+]
+
+
+@pytest.fixture(scope="module")
+def checker(data_dictionary: DataDictionary) -> LocalSQLChecker:
+    """Checker of the repository's data dictionary."""
+    return LocalSQLChecker(data_dictionary)
+
+
+@pytest.mark.parametrize("query", VALID_QUERIES)
+def test_valid_query(checker: LocalSQLChecker, query: str) -> None:
+    """Valid queries pass the checks."""
+    assert checker.check(query) == {
+        "valid_syntax": True,
+        "error": None,
+        "error_type": None,
+    }
+
+
+def test_sql_examples(
+    checker: LocalSQLChecker, sql_examples: dict[str, SQLExample]
+) -> None:
+    """The few-shot SQL examples pass the checks."""
+    for name, example in sql_examples.items():
+        assert checker.check(example.sql)["valid_syntax"], name
+
+
+@pytest.mark.parametrize(("query", "error_type", "message"), INVALID_QUERIES)
+def test_invalid_query(
+    checker: LocalSQLChecker, query: str, error_type: str, message: str
+) -> None:
+    """Invalid queries are reported with the type of the error and a hint."""
+    result = checker.check(query)
+    assert result["valid_syntax"] is False
+    assert result["error_type"] == error_type
+    assert message in result["error"]